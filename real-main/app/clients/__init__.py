@@ -4,22 +4,25 @@ __all__ = [
     'AppSyncClient',
     'CloudFrontClient',
     'CognitoClient',
+    'DynamoCallTracer',
     'DynamoClient',
     'ElasticSearchClient',
     'FacebookClient',
     'GoogleClient',
+    'LocalWorkQueueClient',
     'MediaConvertClient',
     'PinpointClient',
     'PostVerificationClient',
     'S3Client',
     'SecretsManagerClient',
+    'WorkQueueClient',
 ]
 from .apple import AppleClient
 from .appstore import AppStoreClient
 from .appsync import AppSyncClient
 from .cloudfront import CloudFrontClient
 from .cognito import CognitoClient
-from .dynamo import DynamoClient
+from .dynamo import DynamoCallTracer, DynamoClient
 from .elasticsearch import ElasticSearchClient
 from .facebook import FacebookClient
 from .google import GoogleClient
@@ -28,3 +31,4 @@ from .pinpoint import PinpointClient
 from .post_verification import PostVerificationClient
 from .s3 import S3Client
 from .secretsmanager import SecretsManagerClient
+from .work_queue import LocalWorkQueueClient, WorkQueueClient
@@ -1,6 +1,5 @@
 import json
 
-import jwt
 import requests
 
 # https://developer.apple.com/documentation/sign_in_with_apple/
@@ -14,6 +13,8 @@ class AppleClient:
         self.audience = audience
 
     def get_public_key(self, kid, alg):
+        import jwt.algorithms  # deferred, jwt pulls in cryptography
+
         # would be good to cache this info but have to be careful not to cache it too long
         payload = requests.get(self.public_key_url).json()
         for key in payload['keys']:
@@ -22,6 +23,8 @@ class AppleClient:
         raise ValueError(f'No Apple public key with kid `{kid}` and alg `{alg}` found')
 
     def get_verified_email(self, id_token):
+        import jwt  # deferred, as above
+
         header = jwt.get_unverified_header(id_token)
         public_key = self.get_public_key(header['kid'], header['alg'])
         # To avoid expired signature when testing: jwt.decode(... options={'verify_exp': False})
@@ -2,7 +2,6 @@ import logging
 import os
 
 import boto3
-import gql.transport.requests
 import requests_aws4auth
 
 APPSYNC_GRAPHQL_URL = os.environ.get('APPSYNC_GRAPHQL_URL')
@@ -22,8 +21,7 @@ class AppSyncClient:
         self.appsync_graphql_url = appsync_graphql_url
 
     def fire_notification(self, user_id, notification_type, **extra):
-        mutation = gql.gql(
-            f'''
+        mutation = f'''
             mutation TriggerNotification ($input: NotificationInput!) {{
                 triggerNotification (input: $input) {{
                     userId
@@ -32,7 +30,6 @@ class AppSyncClient:
                 }}
             }}
         '''
-        )
         input_obj = {
             'userId': user_id,
             'type': notification_type,
@@ -41,6 +38,11 @@ class AppSyncClient:
         self.send(mutation, {'input': input_obj})
 
     def send(self, query, variables):
+        "Send the graphql `query` string to appsync"
+        # gql and its graphql dependencies are slow to import, and only needed when actually sending
+        import gql
+        import gql.transport.requests
+
         aws_session = boto3.session.Session()
         creds = aws_session.get_credentials().get_frozen_credentials()
         auth = requests_aws4auth.AWS4Auth(
@@ -53,6 +55,6 @@ class AppSyncClient:
         transport = gql.transport.requests.RequestsHTTPTransport(
             url=self.appsync_graphql_url, use_json=True, headers=self.headers, auth=auth,
         )
-        resp = transport.execute(query, variables)
+        resp = transport.execute(gql.gql(query), variables)
         if resp.errors:
             raise Exception(f'Appsync resp error: `{resp.errors}` from query `{query}`, variables `{variables}`')
@@ -1,26 +1,35 @@
 import base64
+import collections
 import json
 import os
+import threading
 import urllib
 
 import botocore
 import pendulum
-from cryptography.hazmat import backends
-from cryptography.hazmat.primitives.asymmetric.padding import PKCS1v15
-from cryptography.hazmat.primitives.hashes import SHA1
-from cryptography.hazmat.primitives.serialization import load_pem_private_key
 
 CLOUDFRONT_UPLOADS_DOMAIN = os.environ.get('CLOUDFRONT_UPLOADS_DOMAIN')
 
 
 class CloudFrontClient:
+    """
+    Presigned urls are signed to expire at the end of the expiry window they are generated in, plus
+    the lifetime. Within a window the same url is handed out for the same path and methods, which spares
+    the RSA signature and lets clients and the CDN cache what is behind the url.
+    """
 
     lifetime = pendulum.duration(hours=48)
+    expiry_window = pendulum.duration(hours=6)
+    # max number of presigned urls kept, least recently used are evicted first
+    url_cache_size = 10000
 
     def __init__(self, key_pair_getter, domain=CLOUDFRONT_UPLOADS_DOMAIN):
         assert domain, "CloudFront domain is required"
         self.domain = domain
         self.key_pair_getter = key_pair_getter
+        # {(path, methods): (expires_at, url)}, least recently used first
+        self.url_cache = collections.OrderedDict()
+        self.url_cache_lock = threading.Lock()
 
     def get_key_pair(self):
         if not hasattr(self, '_key_pair'):
@@ -30,6 +39,10 @@ class CloudFrontClient:
     def get_private_key(self):
         "A PrivateKey object ready to use to .sign()"
         if not hasattr(self, '_private_key'):
+            # cryptography is slow to import, and only needed by the lambdas that sign urls
+            from cryptography.hazmat import backends
+            from cryptography.hazmat.primitives.serialization import load_pem_private_key
+
             private_key = self.get_key_pair()['privateKey']
 
             # the private key format requires newlines after the header and before the footer
@@ -40,23 +53,62 @@ class CloudFrontClient:
             self._private_key = load_pem_private_key(pk_raw, password=None, backend=backend)
         return self._private_key
 
+    def sign_message(self, msg):
+        "Sign with our private key, as cloudfront expects"
+        from cryptography.hazmat.primitives.asymmetric.padding import PKCS1v15
+        from cryptography.hazmat.primitives.hashes import SHA1
+
+        return self.get_private_key().sign(msg, PKCS1v15(), SHA1())
+
     def get_cloudfront_signer(self):
         if not hasattr(self, '_cfsigner'):
             key_id = self.get_key_pair()['keyId']
-            pk = self.get_private_key()
-
-            def sign(msg):
-                return pk.sign(msg, PKCS1v15(), SHA1())
-
-            self._cfsigner = botocore.signers.CloudFrontSigner(key_id, sign)
+            self._cfsigner = botocore.signers.CloudFrontSigner(key_id, self.sign_message)
         return self._cfsigner
 
     def generate_unsigned_url(self, path):
         return f'https://{self.domain}/{path}'
 
+    def get_expires_at(self, now=None):
+        "The end of the expiry window `now` falls in, plus the lifetime"
+        now = now or pendulum.now('utc')
+        window_seconds = int(self.expiry_window.total_seconds())
+        window_end = (now.int_timestamp // window_seconds + 1) * window_seconds
+        return pendulum.from_timestamp(window_end) + self.lifetime
+
     def generate_presigned_url(self, path, methods, expires_at=None):
+        "Urls with an explicit `expires_at` are always freshly signed, the rest come from the cache if possible"
+        if expires_at:
+            return self.sign_url(path, methods, expires_at)
+        expires_at = self.get_expires_at()
+        return self.cached((path, tuple(methods)), expires_at, lambda: self.sign_url(path, methods, expires_at))
+
+    def generate_presigned_urls(self, path_prefix, filenames, methods):
+        """
+        Presigned urls for many files under the same `path_prefix`, in the order of `filenames`.
+        Each url gets its own canned signature, which covers its `Method` params, so that a read url
+        can't be turned into a write url. A path prefix signature would leave those params unsigned.
+        """
+        return [self.generate_presigned_url(f'{path_prefix}/{filename}', methods) for filename in filenames]
+
+    def cached(self, key, expires_at, sign):
+        "Get the signed value for `key` from the cache if it expires at `expires_at`, else `sign()` and cache it"
+        with self.url_cache_lock:
+            cached = self.url_cache.get(key)
+            if cached and cached[0] == expires_at:
+                self.url_cache.move_to_end(key)
+                return cached[1]
+
+        value = sign()
+        with self.url_cache_lock:
+            self.url_cache[key] = (expires_at, value)
+            self.url_cache.move_to_end(key)
+            while len(self.url_cache) > self.url_cache_size:
+                self.url_cache.popitem(last=False)
+        return value
+
+    def sign_url(self, path, methods, expires_at):
         # https://boto3.amazonaws.com/v1/documentation/api/latest/reference/services/cloudfront.html#examples
-        expires_at = expires_at or pendulum.now('utc') + self.lifetime
         qs = urllib.parse.urlencode([('Method', m) for m in methods])
         url = f'https://{self.domain}/{path}?{qs}'
         return self.get_cloudfront_signer().generate_presigned_url(url, date_less_than=expires_at)
@@ -66,7 +118,7 @@ class CloudFrontClient:
         expires_at = expires_at or pendulum.now('utc') + self.lifetime
         url = self.generate_unsigned_url(path)
         policy = self.generate_cookie_policy(url, expires_at)
-        signature = self.get_private_key().sign(policy, PKCS1v15(), SHA1())
+        signature = self.sign_message(policy)
         return {
             'ExpiresAt': expires_at.to_iso8601_string(),
             'CloudFront-Policy': self._encode(policy),
@@ -1,16 +1,45 @@
 import base64
+import collections
+import contextlib
+import contextvars
+import copy
+import itertools
 import json
 import logging
 import os
+import queue
+import random
 import re
+import threading
+import time
+import weakref
+from concurrent.futures import ThreadPoolExecutor
 
 import boto3
+from boto3.dynamodb.types import TypeDeserializer, TypeSerializer
 
 DYNAMO_TABLE = os.environ.get('DYNAMO_TABLE')
 logger = logging.getLogger()
 
+# https://stackoverflow.com/a/46738251
+deserialize = TypeDeserializer().deserialize
+serialize = TypeSerializer().serialize
+
 
 class DynamoClient:
+
+    batch_get_max_keys = 100
+    batch_get_max_attempts = 8
+    batch_write_max_items = 25
+    batch_write_max_attempts = 8
+    batch_write_max_workers = 8
+    backoff_base_seconds = 0.05
+    backoff_max_seconds = 2
+    transact_write_max_items = 100
+    transact_write_max_attempts = 8
+    parallel_scan_max_workers = 16
+    parallel_scan_queued_pages = 2  # per worker, bounds memory use when the consumer is slower than the scan
+
     def __init__(self, table_name=DYNAMO_TABLE, create_table_schema=None):
         """
         If create_table_schema is not None, then the table will be created
@@ -25,9 +54,155 @@ class DynamoClient:
             create_table_schema['TableName'] = table_name
             boto3_resource.create_table(**create_table_schema)
 
-        self.table = boto3_resource.Table(table_name)
+        # event handlers go on every boto3 client used to call dynamo, see register_event()
+        self.event_handlers = []
+        self.event_clients = weakref.WeakSet()
+        self.event_lock = threading.Lock()
+        # boto3 resources are not thread safe, so each thread gets its own Table resource, see `table`
+        self.thread_tables = threading.local()
+        self.thread_tables.table = boto3_resource.Table(table_name)
+        self.add_event_client(self.thread_tables.table.meta.client)
         self.boto3_client = boto3.client('dynamodb')
+        self.add_event_client(self.boto3_client)
         self.exceptions = self.boto3_client.exceptions
+        # identity map of {(partitionKey, sortKey): item}, only populated inside `item_cache()`
+        self.cache = None
+        # net deltas of {(partitionKey, sortKey, attributeName): delta}, only populated inside `counter_batch()`
+        self.counters = None
+        # the stream processor may update counters from several threads at once
+        self.counters_lock = threading.Lock()
+        # deltas deferred by the current listener call, only set inside `counter_call()`
+        self.call_counters = contextvars.ContextVar(f'call_counters_{id(self)}', default=None)
+        # set to a DynamoCallTracer to record every call made to dynamo
+        self.tracer = None
+        self.register_event('provide-client-params.dynamodb', self.on_provide_client_params)
+        self.register_event('after-call.dynamodb', self.on_after_call)
+
+    @property
+    def table(self):
+        "The Table resource of the calling thread, created upon first use by threads other than the creating one"
+        table = getattr(self.thread_tables, 'table', None)
+        if table is None:
+            table = self.thread_tables.table = self.segment_table()
+        return table
+
+    @table.setter
+    def table(self, table):
+        self.thread_tables.table = table
+
+    def register_event(self, event_name, handler):
+        """
+        Register a botocore event handler with the boto3 client and the clients of the Table resources,
+        those of threads yet to have one included.
+        """
+        with self.event_lock:
+            self.event_handlers.append((event_name, handler))
+            boto3_clients = list(self.event_clients)
+        for boto3_client in boto3_clients:
+            boto3_client.meta.events.register(event_name, handler)
+
+    def add_event_client(self, boto3_client):
+        with self.event_lock:
+            self.event_clients.add(boto3_client)
+            event_handlers = list(self.event_handlers)
+        for event_name, handler in event_handlers:
+            boto3_client.meta.events.register(event_name, handler)
+
+    def on_provide_client_params(self, params, model, context, **kwargs):
+        if self.tracer is None or model.name not in DynamoCallTracer.traced_operations:
+            return
+        params['ReturnConsumedCapacity'] = 'TOTAL'
+        context['dynamoCall'] = self.tracer.start_call(self.table_name, model.name, params)
+
+    def on_after_call(self, parsed, model, context, **kwargs):
+        call = context.get('dynamoCall')
+        if self.tracer is None or call is None:
+            return
+        self.tracer.finish_call(call, parsed)
+
+    @contextlib.contextmanager
+    def item_cache(self):
+        """
+        Context manager that enables a read-through identity map of items by primary key.
+        Meant to wrap a single handler invocation: the cache is dropped when the outermost context exits.
+        Writes made through this client invalidate or refresh the affected entries.
+        """
+        if self.cache is not None:
+            yield self.cache
+            return
+        self.cache = {}
+        try:
+            yield self.cache
+        finally:
+            self.cache = None
+
+    @contextlib.contextmanager
+    def counter_batch(self):
+        """
+        Context manager that coalesces deferrable counter updates, see increment_count().
+        Meant to wrap processing of a batch of records: when the outermost context exits the net delta
+        of each (key, attribute) is written with a single update.
+        """
+        if self.counters is not None:
+            yield self.counters
+            return
+        self.counters = collections.defaultdict(int)
+        try:
+            yield self.counters
+        finally:
+            counters, self.counters = self.counters, None
+            self.flush_counts(counters)
+
+    @contextlib.contextmanager
+    def counter_call(self):
+        """
+        Context manager that buffers the counter updates deferred by one listener call in a counter_batch().
+        They are added to the batch's net deltas only if the call completes without raising, so that a
+        failed call, which gets retried, does not have its updates written twice.
+        """
+        if self.counters is None:
+            yield
+            return
+        parent = self.call_counters.get()
+        buffer = collections.defaultdict(int)
+        token = self.call_counters.set(buffer)
+        try:
+            yield
+        finally:
+            self.call_counters.reset(token)
+        # not reached if the call raised
+        with self.counters_lock:
+            target = self.counters if parent is None else parent
+            for counter_key, delta in buffer.items():
+                target[counter_key] += delta
+
+    def flush_counts(self, counters):
+        "Write the net deltas accumulated by counter_batch(). Failures are logged, not raised."
+        for (pk, sk, attribute_name), delta in counters.items():
+            key = {'partitionKey': pk, 'sortKey': sk}
+            try:
+                self.add_count(key, attribute_name, delta)
+            except Exception as err:
+                logger.exception(f'Failed to add {delta} to {attribute_name} for key `{key}`: {err}')
+
+    def defer_count(self, key, attribute_name, delta):
+        "Add `delta` to the net delta of a counter in the current counter_call(), or else counter_batch()"
+        counters = self.call_counters.get()
+        with self.counters_lock:
+            (self.counters if counters is None else counters)[(*self.cache_key(key), attribute_name)] += delta
+
+    def cache_key(self, key):
+        "From a key or item, in either plain or typed format, to a key of the identity map"
+        pk, sk = key['partitionKey'], key['sortKey']
+        return (pk['S'] if isinstance(pk, dict) else pk, sk['S'] if isinstance(sk, dict) else sk)
+
+    def cache_set(self, key, item):
+        if self.cache is not None:
+            self.cache[self.cache_key(key)] = item
+
+    def cache_invalidate(self, key):
+        if self.cache is not None:
+            self.cache.pop(self.cache_key(key), None)
 
     def add_item(self, query_kwargs):
         "Put an item and return what was putted"
@@ -36,29 +211,135 @@ class DynamoClient:
         if 'ConditionExpression' in query_kwargs:
             cond_exp += ' and (' + query_kwargs['ConditionExpression'] + ')'
         query_kwargs['ConditionExpression'] = cond_exp
+        self.cache_invalidate(query_kwargs['Item'])
         self.table.put_item(**query_kwargs)
         return query_kwargs.get('Item')
 
+    def put_item(self, item):
+        "Put an item, replacing any existing item with the same primary key"
+        self.cache_invalidate(item)
+        self.table.put_item(Item=item)
+        return item
+
     def get_item(self, pk, **kwargs):
-        "Get an item by its primary key"
-        return self.table.get_item(Key=pk, **kwargs).get('Item')
+        """
+        Get an item by its primary key.
+        If the item cache is enabled, plain reads are served from it. Strongly consistent
+        reads always go to dynamo, and refresh the cache with what they find.
+        """
+        consistent_read = kwargs.get('ConsistentRead', False)
+        cacheable = self.cache is not None and not set(kwargs) - {'ConsistentRead'}
+        if cacheable and not consistent_read:
+            cache_key = self.cache_key(pk)
+            if cache_key in self.cache:
+                item = self.cache[cache_key]
+                return copy.deepcopy(item) if item else None
+        item = self.table.get_item(Key=pk, **kwargs).get('Item')
+        if cacheable:
+            self.cache_set(pk, copy.deepcopy(item))
+        return item
 
     def get_typed_item(self, typed_pk, **kwargs):
         "Get an typed version of the item by its typed primary key"
         return self.boto3_client.get_item(Key=typed_pk, TableName=self.table_name, **kwargs).get('Item')
 
-    def batch_get_items(self, typed_keys, projection_expression=None):
+    def batch_get_items(self, typed_keys, projection_expression=None, consistent_read=False):
         """
-        Get a bunch of items in one batch request.
+        Get a bunch of items in batch requests.
         Both the input `typed_keys` and the return value should/will be in
         verbose format, with types.
-        Order *not* maintained.
+        Order *not* maintained. Duplicate keys are fetched once.
+        Keys are chunked into requests of at most 100, and UnprocessedKeys are retried
+        with jittered exponential backoff.
+        If the item cache is enabled and no projection is requested, cached items are
+        not re-fetched and fetched items are added to the cache. Strongly consistent
+        reads always go to dynamo, as with get_item().
+        """
+        use_cache = self.cache is not None and not projection_expression
+        typed_items, keys_to_fetch = [], {}
+        for typed_key in typed_keys:
+            cache_key = self.cache_key(typed_key)
+            if use_cache and not consistent_read and cache_key in self.cache:
+                if self.cache[cache_key]:
+                    typed_items.append({k: serialize(v) for k, v in self.cache[cache_key].items()})
+            else:
+                keys_to_fetch.setdefault(cache_key, typed_key)
+        typed_keys = list(keys_to_fetch.values())
+
+        for i in range(0, len(typed_keys), self.batch_get_max_keys):
+            chunk_keys = typed_keys[i : i + self.batch_get_max_keys]
+            chunk_items = self.batch_get_chunk(
+                chunk_keys, projection_expression=projection_expression, consistent_read=consistent_read
+            )
+            if use_cache:
+                for typed_key in chunk_keys:
+                    self.cache_set(typed_key, None)
+                for typed_item in chunk_items:
+                    self.cache_set(typed_item, {k: deserialize(v) for k, v in typed_item.items()})
+            typed_items.extend(chunk_items)
+        return typed_items
+
+    def batch_get_chunk(self, typed_keys, projection_expression=None, consistent_read=False):
+        "A single BatchGetItem call of at most 100 keys, retrying any UnprocessedKeys"
+        assert len(typed_keys) <= self.batch_get_max_keys, "Max 100 items per batch get request"
+        request = {'Keys': typed_keys}
+        if projection_expression:
+            request['ProjectionExpression'] = projection_expression
+        if consistent_read:
+            request['ConsistentRead'] = True
+        typed_items = []
+        for attempt in range(self.batch_get_max_attempts):
+            if attempt:
+                self.backoff(attempt)
+            resp = self.boto3_client.batch_get_item(RequestItems={self.table_name: request})
+            typed_items.extend(resp['Responses'].get(self.table_name, []))
+            request = resp.get('UnprocessedKeys', {}).get(self.table_name)
+            if not request:
+                return typed_items
+        raise Exception(f'Failed to get {len(request["Keys"])} unprocessed keys after {attempt + 1} attempts')
+
+    def backoff(self, attempt):
+        "Sleep for a randomized, exponentially increasing, amount of time (full jitter)"
+        time.sleep(random.uniform(0, min(self.backoff_max_seconds, self.backoff_base_seconds * 2 ** attempt)))
+
+    def get_many(self, keys, projection_expression=None, consistent_read=False):
+        """
+        Get many items by their primary keys with batch requests, rather than one GetItem each.
+        Both `keys` and the returned items are in the plain (un-typed) format. The returned
+        list is in the same order as `keys`, with None in place of any item that does not exist.
         """
-        assert len(typed_keys) <= 100, "Max 100 items per batch get request"
-        kwargs = {'RequestItems': {self.table_name: {'Keys': typed_keys}}}
+        keys = list(keys)
+        typed_keys = [{k: serialize(v) for k, v in key.items()} for key in keys]
         if projection_expression:
-            kwargs['RequestItems'][self.table_name]['ProjectionExpression'] = projection_expression
-        return self.boto3_client.batch_get_item(**kwargs)['Responses'][self.table_name]
+            # the key attributes are needed to put the items back in order
+            attrs = [attr.strip() for attr in projection_expression.split(',')]
+            projection_expression = ', '.join([a for a in ('partitionKey', 'sortKey') if a not in attrs] + attrs)
+        items = {}
+        typed_items = self.batch_get_items(
+            typed_keys, projection_expression=projection_expression, consistent_read=consistent_read
+        )
+        for typed_item in typed_items:
+            item = {k: deserialize(v) for k, v in typed_item.items()}
+            items[self.cache_key(item)] = item
+        ordered_items, seen = [], set()
+        for cache_key in map(self.cache_key, keys):
+            # keys may be repeated, in which case each is given its own copy of the item
+            item = items.get(cache_key)
+            ordered_items.append(copy.deepcopy(item) if cache_key in seen else item)
+            seen.add(cache_key)
+        return ordered_items
+
+    def generate_many(self, key_generator, projection_expression=None):
+        """
+        Return a generator of the items for the keys yielded by `key_generator`, in the same order.
+        Keys are consumed lazily and coalesced into batch requests of up to 100 keys.
+        """
+        key_generator = iter(key_generator)
+        while True:
+            keys = list(itertools.islice(key_generator, self.batch_get_max_keys))
+            if not keys:
+                return
+            yield from self.get_many(keys, projection_expression=projection_expression)
 
     def update_item(self, query_kwargs, failure_warning=None):
         """
@@ -71,12 +352,16 @@ class DynamoClient:
             cond_exp += ' and (' + query_kwargs['ConditionExpression'] + ')'
         query_kwargs['ConditionExpression'] = cond_exp
         query_kwargs['ReturnValues'] = 'ALL_NEW'
+        self.cache_invalidate(query_kwargs['Key'])
         try:
-            return self.table.update_item(**query_kwargs).get('Attributes')
+            item = self.table.update_item(**query_kwargs).get('Attributes')
         except self.exceptions.ConditionalCheckFailedException:
             if failure_warning is None:
                 raise
             logger.warning(failure_warning)
+            return None
+        self.cache_set(query_kwargs['Key'], copy.deepcopy(item))
+        return item
 
     def set_attributes(self, key, **attributes):
         """
@@ -90,10 +375,19 @@ class DynamoClient:
             'ExpressionAttributeValues': {f':{k}': v for k, v in attributes.items()},
             'ReturnValues': 'ALL_NEW',
         }
-        return self.table.update_item(**kwargs).get('Attributes')
+        self.cache_invalidate(key)
+        item = self.table.update_item(**kwargs).get('Attributes')
+        self.cache_set(key, copy.deepcopy(item))
+        return item
 
-    def increment_count(self, key, attribute_name):
-        "Best-effort attempt to increment a counter. Logs a WARNING upon failure."
+    def increment_count(self, key, attribute_name, deferrable=False):
+        """
+        Best-effort attempt to increment a counter. Logs a WARNING upon failure.
+        Set `deferrable` if the caller does not use the returned item: inside a `counter_batch()`
+        the increment is then coalesced with others to the same counter and None is returned.
+        """
+        if deferrable and self.counters is not None:
+            return self.defer_count(key, attribute_name, 1)
         query_kwargs = {
             'Key': key,
             'UpdateExpression': 'ADD #attrName :one',
@@ -104,8 +398,10 @@ class DynamoClient:
         failure_warning = f'Failed to increment {attribute_name} for key `{key}`'
         return self.update_item(query_kwargs, failure_warning=failure_warning)
 
-    def decrement_count(self, key, attribute_name):
-        "Best-effort attempt to decrement a counter. Logs a WARNING upon failure."
+    def decrement_count(self, key, attribute_name, deferrable=False):
+        "Best-effort attempt to decrement a counter. Logs a WARNING upon failure. See increment_count()."
+        if deferrable and self.counters is not None:
+            return self.defer_count(key, attribute_name, -1)
         query_kwargs = {
             'Key': key,
             'UpdateExpression': 'ADD #attrName :neg_one',
@@ -116,11 +412,62 @@ class DynamoClient:
         failure_warning = f'Failed to decrement {attribute_name} for key `{key}`'
         return self.update_item(query_kwargs, failure_warning=failure_warning)
 
-    def batch_put_items(self, generator):
-        "Batch put the items yielded by `generator`. Returns count of how many puts requested."
+    def add_count(self, key, attribute_name, delta, deferrable=False):
+        """
+        Best-effort attempt to add `delta` to a counter. Logs a WARNING upon failure.
+        Like decrement_count(), a counter is never taken below zero: a negative delta larger than
+        the counter clamps it to zero. See increment_count() for `deferrable`.
+        """
+        if deferrable and self.counters is not None:
+            return self.defer_count(key, attribute_name, delta)
+        if delta == 0:
+            return None
+        if delta == 1:
+            return self.increment_count(key, attribute_name)
+        if delta == -1:
+            return self.decrement_count(key, attribute_name)
+        if delta > 0:
+            query_kwargs = {
+                'Key': key,
+                'UpdateExpression': 'ADD #attrName :delta',
+                'ExpressionAttributeNames': {'#attrName': attribute_name},
+                'ExpressionAttributeValues': {':delta': delta},
+                'ConditionExpression': 'attribute_exists(partitionKey)',
+            }
+            failure_warning = f'Failed to add {delta} to {attribute_name} for key `{key}`'
+            return self.update_item(query_kwargs, failure_warning=failure_warning)
+        query_kwargs = {
+            'Key': key,
+            'UpdateExpression': 'ADD #attrName :delta',
+            'ExpressionAttributeNames': {'#attrName': attribute_name},
+            'ExpressionAttributeValues': {':delta': delta, ':min': -delta},
+            'ConditionExpression': 'attribute_exists(partitionKey) AND #attrName >= :min',
+        }
+        try:
+            return self.update_item(query_kwargs)
+        except self.exceptions.ConditionalCheckFailedException:
+            logger.warning(f'Failed to add {delta} to {attribute_name} for key `{key}`, clamping to zero')
+        query_kwargs = {
+            'Key': key,
+            'UpdateExpression': 'SET #attrName = :zero',
+            'ExpressionAttributeNames': {'#attrName': attribute_name},
+            'ExpressionAttributeValues': {':zero': 0},
+            'ConditionExpression': 'attribute_exists(partitionKey) AND #attrName > :zero',
+        }
+        failure_warning = f'Failed to decrement {attribute_name} for key `{key}`'
+        return self.update_item(query_kwargs, failure_warning=failure_warning)
+
+    def batch_put_items(self, generator, parallel=False):
+        """
+        Batch put the items yielded by `generator`. Returns count of how many puts requested.
+        Set `parallel` for large fan-outs, see parallel_batch_write().
+        """
+        if parallel:
+            return self.parallel_batch_write({'PutRequest': {'Item': item}} for item in generator)
         cnt = 0
         with self.table.batch_writer() as batch:
             for item in generator:
+                self.cache_invalidate(item)
                 batch.put_item(Item=item)
                 cnt += 1
         return cnt
@@ -128,23 +475,76 @@ class DynamoClient:
     def delete_item(self, pk, **kwargs):
         "Delete an item and return what was deleted"
         return_values = kwargs.pop('ReturnValues', 'ALL_OLD')
+        self.cache_invalidate(pk)
         # return None if nothing was deleted, rather than an empty dict
         return self.table.delete_item(Key=pk, ReturnValues=return_values, **kwargs).get('Attributes') or None
 
-    def batch_delete_items(self, generator):
+    def batch_delete_items(self, generator, parallel=False):
         "Batch delete the items or keys yielded by `generator`. Returns count of how many deletes requested."
         key_generator = ({k: item[k] for k in ('partitionKey', 'sortKey')} for item in generator)
-        return self.batch_delete(key_generator)
+        return self.batch_delete(key_generator, parallel=parallel)
 
-    def batch_delete(self, key_generator):
-        "Batch delete items by keys yielded by `generator`. Returns count of how many deletes requested."
+    def batch_delete(self, key_generator, parallel=False):
+        """
+        Batch delete items by keys yielded by `generator`. Returns count of how many deletes requested.
+        Set `parallel` for large fan-outs, see parallel_batch_write().
+        """
+        if parallel:
+            return self.parallel_batch_write({'DeleteRequest': {'Key': key}} for key in key_generator)
         cnt = 0
         with self.table.batch_writer() as batch:
             for key in key_generator:
+                self.cache_invalidate(key)
                 batch.delete_item(Key=key)
                 cnt += 1
         return cnt
 
+    def parallel_batch_write(self, request_generator):
+        """
+        Send the PutRequests & DeleteRequests yielded by `request_generator` as BatchWriteItem calls
+        of up to 25 requests each, spread across a pool of `batch_write_max_workers` threads.
+        At most two calls per worker are queued or in flight at once, so the generator is consumed
+        only as fast as the writes complete. UnprocessedItems are retried with jittered backoff.
+        Returns count of how many writes were completed.
+        """
+        in_flight = threading.BoundedSemaphore(self.batch_write_max_workers * 2)
+        futures = []
+
+        def release(future):
+            in_flight.release()
+
+        with ThreadPoolExecutor(max_workers=self.batch_write_max_workers) as executor:
+            request_generator = iter(request_generator)
+            while True:
+                requests = list(itertools.islice(request_generator, self.batch_write_max_items))
+                if not requests:
+                    break
+                for request in requests:
+                    operation = list(request.values()).pop()
+                    self.cache_invalidate(operation.get('Key') or operation['Item'])
+                in_flight.acquire()
+                future = executor.submit(self.batch_write_chunk, requests)
+                future.add_done_callback(release)
+                futures.append(future)
+        return sum(future.result() for future in futures)
+
+    def batch_write_chunk(self, requests):
+        "A single BatchWriteItem call of at most 25 (un-typed) requests, retrying any UnprocessedItems"
+        assert len(requests) <= self.batch_write_max_items, 'Max 25 requests per batch write'
+        typed_requests = [
+            {name: {k: {a: serialize(v) for a, v in kv.items()} for k, kv in op.items()}}
+            for request in requests
+            for name, op in request.items()
+        ]
+        for attempt in range(self.batch_write_max_attempts):
+            if attempt:
+                self.backoff(attempt)
+            resp = self.boto3_client.batch_write_item(RequestItems={self.table_name: typed_requests})
+            typed_requests = resp.get('UnprocessedItems', {}).get(self.table_name)
+            if not typed_requests:
+                return len(requests)
+        raise Exception(f'Failed to write {len(typed_requests)} unprocessed items after {attempt + 1} attempts')
+
     def encode_pagination_token(self, last_evaluated_key):
         "From a LastEvaluatedKey to a obfucated string"
         # https://docs.aws.amazon.com/amazondynamodb/latest/developerguide/Query.html#Query.Pagination
@@ -154,8 +554,25 @@ class DynamoClient:
         "From a obfucated string to a ExclusiveStartKey"
         return json.loads(base64.b64decode(token.encode('ascii')).decode('utf-8'))
 
-    def query(self, query_kwargs, limit=None, next_token=None):
+    def project(self, kwargs, projection):
+        """
+        Return a copy of query or scan `kwargs` that asks dynamo for only the attributes in `projection`.
+
+        Attribute names are always escaped, so reserved words and names with special characters are safe.
+        Any ExpressionAttributeNames already present in `kwargs` are preserved.
+        """
+        names = dict(kwargs.get('ExpressionAttributeNames', {}))
+        placeholders = []
+        for i, attribute_name in enumerate(dict.fromkeys(projection)):
+            placeholder = f'#proj{i}'
+            names[placeholder] = attribute_name
+            placeholders.append(placeholder)
+        return {**kwargs, 'ProjectionExpression': ', '.join(placeholders), 'ExpressionAttributeNames': names}
+
+    def query(self, query_kwargs, limit=None, next_token=None, projection=None):
         "Query the table and return items & pagination token from the result"
+        if projection:
+            query_kwargs = self.project(query_kwargs, projection)
         if limit:
             query_kwargs['Limit'] = limit
         if next_token:
@@ -176,8 +593,15 @@ class DynamoClient:
         resp = self.table.query(**query_kwargs)
         return resp['Items'][0] if resp['Items'] else None
 
-    def generate_all_query(self, query_kwargs):
-        "Return a generator that iterates over all results of the query"
+    def generate_all_query(self, query_kwargs, projection=None):
+        """
+        Return a generator that iterates over all results of the query.
+
+        If `projection` is provided, it should be an iterable of attribute names and only those
+        attributes will be returned for each item (or fewer, if an item lacks an attribute).
+        """
+        if projection:
+            query_kwargs = self.project(query_kwargs, projection)
         last_key = False
         while last_key is not None:
             start_kwargs = {'ExclusiveStartKey': last_key} if last_key else {}
@@ -186,15 +610,93 @@ class DynamoClient:
                 yield item
             last_key = resp.get('LastEvaluatedKey')
 
-    def generate_all_scan(self, scan_kwargs):
-        "Return a generator that iterates over all results of the scan"
-        last_key = False
+    def generate_all_scan(
+        self, scan_kwargs, total_segments=1, max_workers=None, checkpoint=None, projection=None
+    ):
+        """
+        Return a generator that iterates over all results of the scan.
+
+        If `total_segments` is more than one, the table is scanned as that many segments in parallel
+        on a thread pool of (at most) `max_workers` threads, and results are yielded in no particular order.
+
+        If `checkpoint` is provided, it should be a dict. As items are consumed it is updated to map
+        each segment number to its LastEvaluatedKey, or to None once that segment is complete.
+        Persist it and pass it back in (with the same `total_segments`) to resume an interrupted scan.
+        Items of the page in flight at interruption will be yielded again on resume.
+
+        If `projection` is provided, it behaves as with generate_all_query().
+        """
+        if projection:
+            scan_kwargs = self.project(scan_kwargs, projection)
+        if total_segments > 1:
+            yield from self.generate_parallel_scan(scan_kwargs, total_segments, max_workers, checkpoint)
+            return
+
+        checkpoint = {} if checkpoint is None else checkpoint
+        last_key = checkpoint.get(0, False)
         while last_key is not None:
             start_kwargs = {'ExclusiveStartKey': last_key} if last_key else {}
             resp = self.table.scan(**scan_kwargs, **start_kwargs)
             for item in resp['Items']:
                 yield item
-            last_key = resp.get('LastEvaluatedKey')
+            last_key = checkpoint[0] = resp.get('LastEvaluatedKey')
+
+    def generate_parallel_scan(self, scan_kwargs, total_segments, max_workers=None, checkpoint=None):
+        "See generate_all_scan()"
+        checkpoint = {} if checkpoint is None else checkpoint
+        segments = [segment for segment in range(total_segments) if checkpoint.get(segment, False) is not None]
+        if not segments:
+            return
+        max_workers = min(max_workers or self.parallel_scan_max_workers, len(segments))
+        pages = queue.Queue(maxsize=max_workers * self.parallel_scan_queued_pages)
+        stopped = threading.Event()
+
+        def put(entry):
+            # block while the queue is full (back-pressure), unless the consumer has gone away
+            while not stopped.is_set():
+                try:
+                    return pages.put(entry, timeout=0.1)
+                except queue.Full:
+                    pass
+
+        def scan_segment(segment):
+            error = None
+            try:
+                table = self.segment_table()
+                last_key = checkpoint.get(segment, False)
+                while last_key is not None and not stopped.is_set():
+                    start_kwargs = {'ExclusiveStartKey': last_key} if last_key else {}
+                    segment_kwargs = {'Segment': segment, 'TotalSegments': total_segments}
+                    resp = table.scan(**scan_kwargs, **segment_kwargs, **start_kwargs)
+                    last_key = resp.get('LastEvaluatedKey')
+                    put((segment, resp['Items'], last_key))
+            except Exception as err:
+                error = err
+            put((segment, None, error))
+
+        executor = ThreadPoolExecutor(max_workers=max_workers)
+        try:
+            for segment in segments:
+                executor.submit(scan_segment, segment)
+            remaining = len(segments)
+            while remaining:
+                segment, items, last_key_or_error = pages.get()
+                if items is None:
+                    if last_key_or_error is not None:
+                        raise last_key_or_error
+                    remaining -= 1
+                    continue
+                yield from items
+                checkpoint[segment] = last_key_or_error
+        finally:
+            stopped.set()
+            executor.shutdown(wait=True)
+
+    def segment_table(self):
+        "A Table resource for use by a single worker thread, as boto3 resources are not thread safe"
+        table = boto3.session.Session().resource('dynamodb').Table(self.table_name)
+        self.add_event_client(table.meta.client)
+        return table
 
     def transact_write_items(self, transact_items, transact_exceptions=None):
         """
@@ -213,7 +715,9 @@ class DynamoClient:
             assert len(transact_items) == len(transact_exceptions)
 
         for ti in transact_items:
-            list(ti.values()).pop()['TableName'] = self.table_name
+            operation = list(ti.values()).pop()
+            operation['TableName'] = self.table_name
+            self.cache_invalidate(operation.get('Key') or operation['Item'])
 
         try:
             self.boto3_client.transact_write_items(TransactItems=transact_items)
@@ -228,3 +732,184 @@ class DynamoClient:
                     if transact_exception is not None:
                         raise transact_exception from err
             raise err
+
+    def pipeline_write_items(self, transact_items, parallel=False):
+        """
+        Apply many independent write operations, in the same format as transact_write_items(), with
+        as few round trips as possible by grouping them into TransactWriteItems calls of up to 100.
+        Unlike transact_write_items(), the operations as a whole are not atomic: meant for best-effort
+        fan-outs where each operation stands on its own. Set `parallel` to submit chunks concurrently.
+
+        Returns a list in the same order as `transact_items`, with None for each operation that was
+        applied and the cancellation reason (ex: 'ConditionalCheckFailed') for each that was not.
+        """
+        for ti in transact_items:
+            operation = list(ti.values()).pop()
+            operation['TableName'] = self.table_name
+            self.cache_invalidate(operation.get('Key') or operation['Item'])
+
+        # a transaction may not include more than one operation on the same item
+        chunks, chunk, chunk_keys = [], [], set()
+        for index, ti in enumerate(transact_items):
+            operation = list(ti.values()).pop()
+            key = self.cache_key(operation.get('Key') or operation['Item'])
+            if len(chunk) == self.transact_write_max_items or key in chunk_keys:
+                chunks.append(chunk)
+                chunk, chunk_keys = [], set()
+            chunk.append(index)
+            chunk_keys.add(key)
+        if chunk:
+            chunks.append(chunk)
+
+        failures = [None] * len(transact_items)
+
+        def write_chunk(indexes):
+            for index, reason in self.transact_write_chunk([transact_items[i] for i in indexes]).items():
+                failures[indexes[index]] = reason
+
+        if parallel and len(chunks) > 1:
+            with ThreadPoolExecutor(max_workers=min(self.batch_write_max_workers, len(chunks))) as executor:
+                list(executor.map(write_chunk, chunks))
+        else:
+            for indexes in chunks:
+                write_chunk(indexes)
+        return failures
+
+    def transact_write_chunk(self, transact_items):
+        """
+        A single TransactWriteItems call of at most 100 operations. If the transaction is cancelled, the
+        operations that did not cause the cancellation are resubmitted, with jittered backoff if the
+        cancellation was due to contention. Returns a dict of {index: cancellation_reason} for the
+        operations that could not be applied.
+        """
+        assert len(transact_items) <= self.transact_write_max_items, 'Max 100 operations per transaction'
+        failures = {}
+        indexes = list(range(len(transact_items)))
+        for attempt in range(self.transact_write_max_attempts):
+            if not indexes:
+                break
+            try:
+                self.boto3_client.transact_write_items(TransactItems=[transact_items[i] for i in indexes])
+                return failures
+            except self.boto3_client.exceptions.TransactionCanceledException as err:
+                reasons = self.cancellation_reasons(err)
+            retry_indexes, contended = [], False
+            for index, reason in zip(indexes, reasons):
+                if reason == 'None':
+                    retry_indexes.append(index)
+                elif reason in ('TransactionConflict', 'ThrottlingError', 'ProvisionedThroughputExceeded'):
+                    retry_indexes.append(index)
+                    contended = True
+                else:
+                    failures[index] = reason
+            indexes = retry_indexes
+            if contended:
+                self.backoff(attempt + 1)
+        else:
+            for index in indexes:
+                failures[index] = 'TransactionConflict'
+        return failures
+
+    def cancellation_reasons(self, err):
+        "From a TransactionCanceledException to a list of the cancellation reason code of each operation"
+        if 'CancellationReasons' in err.response:
+            return [reason.get('Code', 'None') for reason in err.response['CancellationReasons']]
+        # older versions of botocore do not parse the CancellationReasons
+        # https://github.com/aws/aws-sdk-go/issues/2318#issuecomment-443039745
+        return re.search(r'\[(.*)\]$', err.response['Error']['Message']).group(1).split(', ')
+
+
+class DynamoCallTracer:
+    """
+    Records every call made to dynamo by the DynamoClients it is attached to, grouped by handler invocation.
+    Meant for finding N+1 query patterns and enforcing round-trip budgets in the test suite.
+    """
+
+    traced_operations = {
+        'BatchGetItem',
+        'BatchWriteItem',
+        'DeleteItem',
+        'GetItem',
+        'PutItem',
+        'Query',
+        'Scan',
+        'TransactGetItems',
+        'TransactWriteItems',
+        'UpdateItem',
+    }
+
+    def __init__(self):
+        # {invocation_name: [call, ...]}, calls outside of any invocation are recorded under None
+        self.invocations = collections.defaultdict(list)
+        self.invocation_name = None
+
+    @contextlib.contextmanager
+    def invocation(self, name):
+        "Group calls made within this context under `name`"
+        prev_name, self.invocation_name = self.invocation_name, name
+        try:
+            yield self.invocations[name]
+        finally:
+            self.invocation_name = prev_name
+
+    def start_call(self, table_name, operation, params):
+        key = params.get('Key') or params.get('Item')
+        call = {
+            'operation': operation,
+            'table': table_name,
+            'index': params.get('IndexName'),
+            'keyPrefix': self.key_prefix(key) if key else None,
+            'key': self.key_tuple(key) if key else None,
+            'consistentRead': params.get('ConsistentRead', False),
+            'itemCount': None,
+            'consumedCapacity': None,
+        }
+        self.invocations[self.invocation_name].append(call)
+        return call
+
+    def finish_call(self, call, parsed):
+        if 'Items' in parsed:
+            call['itemCount'] = len(parsed['Items'])
+        elif 'Item' in parsed:
+            call['itemCount'] = 1
+        elif 'Responses' in parsed:
+            call['itemCount'] = sum(len(items) for items in parsed['Responses'].values())
+        elif call['operation'] == 'GetItem':
+            call['itemCount'] = 0
+        capacity = parsed.get('ConsumedCapacity')
+        if capacity:
+            capacities = capacity if isinstance(capacity, list) else [capacity]
+            call['consumedCapacity'] = sum(c.get('CapacityUnits', 0) for c in capacities)
+
+    @staticmethod
+    def key_tuple(key):
+        return tuple(v['S'] if isinstance(v, dict) else v for v in (key.get('partitionKey'), key.get('sortKey')))
+
+    @classmethod
+    def key_prefix(cls, key):
+        "Eg: ('user', 'profile') for the key of a user profile item"
+        return tuple(part.split('/')[0] if isinstance(part, str) else None for part in cls.key_tuple(key))
+
+    def calls(self, invocation_name=None):
+        return self.invocations.get(invocation_name, [])
+
+    def all_calls(self):
+        return [call for calls in self.invocations.values() for call in calls]
+
+    def repeated_get_items(self, invocation_name=None):
+        "Return {(table, key): count} for non-consistent GetItems repeated within the invocation"
+        counter = collections.Counter(
+            (call['table'], call['key'])
+            for call in self.calls(invocation_name)
+            if call['operation'] == 'GetItem' and not call['consistentRead']
+        )
+        return {table_key: count for table_key, count in counter.items() if count > 1}
+
+    def summary(self, invocation_name=None):
+        "Return {(operation, table, index, keyPrefix): count} for the invocation"
+        return dict(
+            collections.Counter(
+                (call['operation'], call['table'], call['index'], call['keyPrefix'])
+                for call in self.calls(invocation_name)
+            )
+        )
@@ -1,7 +1,5 @@
 import cachecontrol
 import requests
-from google.auth.transport import requests as google_requests
-from google.oauth2 import id_token as google_id_token
 
 
 class GoogleClient:
@@ -20,6 +18,10 @@ class GoogleClient:
         # https://developers.google.com/oauthplayground/
         # https://developers.google.com/identity/sign-in/web/backend-auth#calling-the-tokeninfo-endpoint
         # https://googleapis.dev/python/google-auth/latest/reference/google.oauth2.id_token.html
+        # google-auth pulls in cryptography, which is slow to import and only needed here
+        from google.auth.transport import requests as google_requests
+        from google.oauth2 import id_token as google_id_token
+
         # raises ValueError on expired token
         info = google_id_token.verify_oauth2_token(id_token, google_requests.Request(session=self.cached_session))
         if info.get('aud') not in self.client_ids.values():
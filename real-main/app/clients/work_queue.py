@@ -0,0 +1,174 @@
+import collections
+import json
+import logging
+import os
+import time
+import uuid
+
+import boto3
+
+WORK_QUEUE_URL = os.environ.get('WORK_QUEUE_URL')
+
+logger = logging.getLogger()
+
+
+class WorkQueueClient:
+    """
+    A queue of tasks that are worked in chunks, backed by an SQS FIFO queue.
+
+    A task is a dict of {'name': ..., 'key': ..., 'args': {...}, 'cursor': ...}, with json-serializable args.
+    The function registered under a task's name is called as `func(**args, cursor=cursor)` to work
+    one chunk of the task, and returns the cursor to continue from, or None once the task is done.
+
+    Tasks with the same `key` are worked one at a time, in the order they were sent. A task that is not
+    done when its time slice runs out is held back in dynamo with its cursor, along with the tasks with the
+    same key that are delivered while it is held. A resume task is sent so the held tasks are worked on even
+    if nothing else is sent with that key, and any delivery with that key works the held tasks first.
+    """
+
+    # limit of SendMessageBatch
+    max_batch_size = 10
+    # the name of the task that works the tasks held back for its key, and nothing else
+    resume_task_name = 'workQueue.resume'
+
+    def __init__(self, dynamo_client, queue_url=WORK_QUEUE_URL):
+        self.dynamo_client = dynamo_client
+        self.queue_url = queue_url
+        self.funcs = {}
+        self.boto3_client = boto3.client('sqs')
+
+    def register(self, name, func):
+        self.funcs[name] = func
+
+    def send_tasks(self, tasks):
+        "Send the tasks to the queue, returns how many were sent"
+        tasks = list(tasks)
+        for start in range(0, len(tasks), self.max_batch_size):
+            entries = [
+                {
+                    'Id': str(idx),
+                    'MessageBody': json.dumps(task),
+                    'MessageGroupId': task['key'],
+                    'MessageDeduplicationId': str(uuid.uuid4()),
+                }
+                for idx, task in enumerate(tasks[start : start + self.max_batch_size])
+            ]
+            resp = self.boto3_client.send_message_batch(QueueUrl=self.queue_url, Entries=entries)
+            if resp.get('Failed'):
+                raise Exception(f'Failed to send tasks to work queue: `{resp["Failed"]}`')
+        return len(tasks)
+
+    def run_task(self, task, deadline=None):
+        """
+        Work chunks of the task until it is done, or until `deadline` (in time.monotonic() terms) has passed.
+        Returns the task to continue with later, or None if it is done.
+        """
+        func = self.funcs[task['name']]
+        cursor = task.get('cursor')
+        while True:
+            cursor = func(**task['args'], cursor=cursor)
+            if cursor is None:
+                return None
+            if deadline is not None and time.monotonic() >= deadline:
+                return {**task, 'cursor': cursor}
+
+    def held_pk(self, key):
+        return {'partitionKey': f'workQueueHeld/{key}', 'sortKey': '-'}
+
+    def get_held_tasks(self, key):
+        item = self.dynamo_client.get_item(self.held_pk(key), ConsistentRead=True)
+        # stored as json, as args don't survive the round trip through dynamo's number type
+        return json.loads(item['tasks']) if item else []
+
+    def set_held_tasks(self, key, tasks, held):
+        "Replace the tasks `held` back for the key with `tasks`"
+        if tasks == held:
+            return
+        if tasks:
+            self.dynamo_client.put_item({**self.held_pk(key), 'tasks': json.dumps(tasks)})
+        else:
+            self.dynamo_client.delete_item(self.held_pk(key))
+
+    def work_message(self, message, deadline=None):
+        "Work the task of an SQS message, after any tasks held back for its key"
+        task = json.loads(message['body'])
+        key = task['key']
+        held = self.get_held_tasks(key)
+        own_tasks = [] if task['name'] == self.resume_task_name else [task]
+        tasks = collections.deque(held + own_tasks)
+        try:
+            while tasks:
+                if deadline is not None and time.monotonic() >= deadline:
+                    break
+                continuation = self.run_task(tasks[0], deadline=deadline)
+                if continuation:
+                    tasks[0] = continuation
+                    break
+                tasks.popleft()
+        except Exception:
+            # the message's own task is not done, and comes back with the message when it is delivered again
+            self.set_held_tasks(key, list(tasks)[: len(tasks) - len(own_tasks)], held)
+            raise
+        self.set_held_tasks(key, list(tasks), held)
+        # a resume task is outstanding for as long as there are held tasks
+        if tasks and (not held or not own_tasks):
+            self.send_tasks([{'name': self.resume_task_name, 'key': key, 'args': {}}])
+
+    def work_messages(self, messages, deadline=None):
+        """
+        Work the tasks of a batch of SQS messages as delivered to lambda, with tasks not done by `deadline`
+        held back to be continued. Returns the messageIds of the messages that failed.
+
+        Once a message fails the rest of the batch is failed with it, as FIFO queues require to keep order.
+        """
+        failed_message_ids = []
+        for message in messages:
+            if failed_message_ids:
+                failed_message_ids.append(message['messageId'])
+                continue
+            try:
+                self.work_message(message, deadline=deadline)
+            except Exception as err:
+                logger.exception(f'Failed to work message `{message["messageId"]}`: {err}')
+                failed_message_ids.append(message['messageId'])
+        return failed_message_ids
+
+
+class LocalWorkQueueClient(WorkQueueClient):
+    """
+    An in-process stand-in for WorkQueueClient, for tests and for when no queue is configured.
+    Sent tasks are worked to completion right away, unless `deferred`, in which case they are
+    held until `work()` is called.
+    """
+
+    def __init__(self, deferred=False):
+        self.deferred = deferred
+        self.funcs = {}
+        self.tasks = collections.deque()
+        self.working = False
+
+    def send_tasks(self, tasks):
+        # round trip through json, as sending to a real queue would
+        tasks = [json.loads(json.dumps(task)) for task in tasks]
+        self.tasks.extend(tasks)
+        if not self.deferred:
+            self.work()
+        return len(tasks)
+
+    def work(self, deadline=None):
+        "Work queued tasks, continuations included, until the queue is empty or `deadline` has passed"
+        # tasks sent while working are picked up by the outermost call
+        if self.working:
+            return
+        self.working = True
+        try:
+            while self.tasks:
+                continuation = self.run_task(self.tasks.popleft(), deadline=deadline)
+                if continuation:
+                    # ahead of any tasks sent since, as they may have the same key
+                    self.tasks.appendleft(continuation)
+                    break
+                if deadline is not None and time.monotonic() >= deadline:
+                    break
+        finally:
+            self.working = False
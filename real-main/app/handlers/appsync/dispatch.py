@@ -2,6 +2,7 @@
 import logging
 import os
 
+from app.handlers import warmup
 from app.logging import LogLevelContext, handler_logging
 
 from . import routes
@@ -14,6 +15,10 @@ route_path = os.environ.get('APPSYNC_ROUTE_AUTODISCOVERY_PATH', 'app.handlers.ap
 if route_path:
     routes.discover(route_path)
 
+# one-time costs paid ahead of the first request, on init under provisioned concurrency or on a warm-up event
+WARMUP_STEPS = ['cloudfront_key', 'dynamo_connection', 's3_connection', 'image_libraries', 'text_image_font']
+warmup.prime_on_init(WARMUP_STEPS)
+
 
 def get_client_details(event):
     headers = event['headers']  # most of the request headers
@@ -36,40 +41,111 @@ def get_gql_details(event):
 
 
 def event_to_extras(event):
+    if isinstance(event, list):
+        # a BatchInvoke, the events of which all come from the same graphql request
+        extras = event_to_extras(event[0]) if event else {}
+        return {**extras, 'batchSize': len(event)}
     client = get_client_details(event)
     gql = get_gql_details(event)
     return {'gq': gql, 'client': client}
 
 
-@handler_logging(event_to_extras=event_to_extras)
-def dispatch(event, context):
-    "Top-level dispatch of appsync event to the correct handler"
-    # it is a sin that python has no dictionary destructing asignment
-    client = get_client_details(event)
+def event_to_request(event):
+    "The parts of an event a batch handler needs to resolve it"
     gql = get_gql_details(event)
-    field = gql.get('field')
-    caller_user_id = gql.get('callerUserId')
-    arguments = gql.get('arguments')
-    source = gql.get('source')
+    return {
+        'caller_user_id': gql.get('callerUserId'),
+        'arguments': gql.get('arguments'),
+        'source': gql.get('source'),
+        'client': get_client_details(event),
+        'selection_set': event.get('selectionSetList'),
+    }
+
 
+def client_error(err):
+    msg = 'ClientError: ' + str(err)
+    logger.warning(msg)
+    return {'error': {'message': msg, 'data': err.data, 'info': err.info}}
+
+
+def get_route(field):
     handler = routes.get_handler(field)
     if not handler:
         # should not be able to get here
         msg = f'No handler for field `{field}` found'
         logger.exception(msg)
         raise Exception(msg)
+    return handler
+
+
+@warmup.handle_warmup(WARMUP_STEPS)
+@handler_logging(event_to_extras=event_to_extras)
+def dispatch(event, context):
+    """
+    Top-level dispatch of appsync event to the correct handler.
+
+    Fields resolved with a BatchInvoke come in as a list of events, which gets a list of responses.
+    """
+    if isinstance(event, list):
+        return dispatch_batch(event, context)
+
+    field = event['field']
+    handler = get_route(field)
 
     # we suppress INFO logging, except this message
     with LogLevelContext(logger, logging.INFO):
         logger.info(f'Handling AppSync GQL resolution of `{field}`')
 
+    if routes.is_batch(field):
+        return resolve_batch(handler, [event], context)[0]
+    return resolve(handler, event, context)
+
+
+def dispatch_batch(events, context):
+    if not events:
+        return []
+    field = events[0]['field']
+    handler = get_route(field)
+
+    # we suppress INFO logging, except this message
+    with LogLevelContext(logger, logging.INFO):
+        logger.info(f'Handling AppSync GQL batch resolution of `{field}` for {len(events)} sources')
+
+    if not routes.is_batch(field):
+        return [resolve(handler, event, context) for event in events]
+    return resolve_batch(handler, events, context)
+
+
+def resolve(handler, event, context):
+    # it is a sin that python has no dictionary destructing asignment
+    client = get_client_details(event)
+    gql = get_gql_details(event)
+    caller_user_id = gql.get('callerUserId')
+    arguments = gql.get('arguments')
+    source = gql.get('source')
+    # None, which selects everything, for fields whose request template doesn't pass it along
+    selection_set = event.get('selectionSetList')
+
     try:
         # Once support for direct-to-lambda resolvers lands, would be good to simplify this interface
         # to match that. https://github.com/sid88in/serverless-appsync-plugin/pull/350
-        resp = handler(caller_user_id, arguments, source=source, context=context, client=client)
+        resp = handler(
+            caller_user_id, arguments, source=source, context=context, client=client, selection_set=selection_set
+        )
     except ClientException as err:
-        msg = 'ClientError: ' + str(err)
-        logger.warning(msg)
-        return {'error': {'message': msg, 'data': err.data, 'info': err.info}}
+        return client_error(err)
 
     return {'success': resp}
+
+
+def resolve_batch(handler, events, context):
+    field = events[0]['field']
+    try:
+        results = handler([event_to_request(event) for event in events], context=context)
+    except ClientException as err:
+        return [client_error(err)] * len(events)
+
+    if len(results) != len(events):
+        raise Exception(f'Batch handler for `{field}` returned {len(results)} results for {len(events)} events')
+    # a batch handler fails individual sources by returning a ClientException in their place
+    return [client_error(res) if isinstance(res, ClientException) else {'success': res} for res in results]
@@ -1,9 +1,7 @@
 import logging
-import os
 
 import pendulum
 
-from app import clients, models
 from app.mixins.flag.enums import FlagStatus
 from app.mixins.flag.exceptions import FlagException
 from app.models.album.exceptions import AlbumException
@@ -26,56 +24,71 @@ from app.models.user.exceptions import UserException
 from app.utils import image_size
 
 from .. import xray
+from ..registry import Registry
 from . import routes
 from .exceptions import ClientException
 
-S3_UPLOADS_BUCKET = os.environ.get('S3_UPLOADS_BUCKET')
-S3_PLACEHOLDER_PHOTOS_BUCKET = os.environ.get('S3_PLACEHOLDER_PHOTOS_BUCKET')
-
 logger = logging.getLogger()
 xray.patch_all()
 
-secrets_manager_client = clients.SecretsManagerClient()
-clients = {
-    'apple': clients.AppleClient(),
-    'appstore': clients.AppStoreClient(),
-    'appsync': clients.AppSyncClient(),
-    'cloudfront': clients.CloudFrontClient(secrets_manager_client.get_cloudfront_key_pair),
-    'cognito': clients.CognitoClient(),
-    'dynamo': clients.DynamoClient(),
-    'facebook': clients.FacebookClient(),
-    'google': clients.GoogleClient(secrets_manager_client.get_google_client_ids),
-    'pinpoint': clients.PinpointClient(),
-    'post_verification': clients.PostVerificationClient(secrets_manager_client.get_post_verification_api_creds),
-    's3_uploads': clients.S3Client(S3_UPLOADS_BUCKET),
-    's3_placeholder_photos': clients.S3Client(S3_PLACEHOLDER_PHOTOS_BUCKET),
-}
-
-# shared hash table of all managers, enables inter-manager communication
-managers = {}
-appstore_manager = managers.get('appstore') or models.AppStoreManager(clients, managers=managers)
-album_manager = managers.get('album') or models.AlbumManager(clients, managers=managers)
-block_manager = managers.get('block') or models.BlockManager(clients, managers=managers)
-card_manager = managers.get('card') or models.CardManager(clients, managers=managers)
-chat_manager = managers.get('chat') or models.ChatManager(clients, managers=managers)
-chat_message_manager = managers.get('chat_message') or models.ChatMessageManager(clients, managers=managers)
-comment_manager = managers.get('comment') or models.CommentManager(clients, managers=managers)
-follower_manager = managers.get('follower') or models.FollowerManager(clients, managers=managers)
-like_manager = managers.get('like') or models.LikeManager(clients, managers=managers)
-post_manager = managers.get('post') or models.PostManager(clients, managers=managers)
-user_manager = managers.get('user') or models.UserManager(clients, managers=managers)
+registry = Registry(
+    [
+        'apple',
+        'appstore',
+        'appsync',
+        'cloudfront',
+        'cognito',
+        'dynamo',
+        'facebook',
+        'google',
+        'pinpoint',
+        'post_verification',
+        's3_uploads',
+        's3_placeholder_photos',
+        'work_queue',
+    ]
+)
+clients = registry.clients
+managers = registry.managers
+appstore_manager = registry.manager('appstore')
+album_manager = registry.manager('album')
+block_manager = registry.manager('block')
+card_manager = registry.manager('card')
+chat_manager = registry.manager('chat')
+chat_message_manager = registry.manager('chat_message')
+comment_manager = registry.manager('comment')
+follower_manager = registry.manager('follower')
+like_manager = registry.manager('like')
+post_manager = registry.manager('post')
+user_manager = registry.manager('user')
+
+
+def serialize_image_urls(get_urls):
+    "The url fields of an Image, given a function that maps a list of image sizes to their urls"
+    fields = {
+        'url': image_size.NATIVE,
+        'url64p': image_size.P64,
+        'url480p': image_size.P480,
+        'url1080p': image_size.P1080,
+        'url4k': image_size.K4,
+    }
+    return dict(zip(fields.keys(), get_urls(list(fields.values()))))
 
 
 def validate_caller(func):
-    "Decorator that inits a caller_user model and verifies the caller is ACTIVE"
+    """
+    Decorator that inits a caller_user model and verifies the caller is ACTIVE.
+    Dynamo reads by primary key are served from an identity map for the rest of the invocation.
+    """
 
     def wrapper(caller_user_id, arguments, **kwargs):
-        caller_user = user_manager.get_user(caller_user_id)
-        if not caller_user:
-            raise ClientException(f'User `{caller_user_id}` does not exist')
-        if caller_user.status != UserStatus.ACTIVE:
-            raise ClientException(f'User `{caller_user_id}` is not ACTIVE')
-        return func(caller_user, arguments, **kwargs)
+        with clients['dynamo'].item_cache():
+            caller_user = user_manager.get_user(caller_user_id)
+            if not caller_user:
+                raise ClientException(f'User `{caller_user_id}` does not exist')
+            if caller_user.status != UserStatus.ACTIVE:
+                raise ClientException(f'User `{caller_user_id}` is not ACTIVE')
+            return func(caller_user, arguments, **kwargs)
 
     return wrapper
 
@@ -92,7 +105,7 @@ def update_last_client(func):
 
 
 @routes.register('Mutation.createCognitoOnlyUser')
-def create_cognito_only_user(caller_user_id, arguments, client=None, **kwargs):
+def create_cognito_only_user(caller_user_id, arguments, client=None, selection_set=None, **kwargs):
     username = arguments['username']
     full_name = arguments.get('fullName')
     try:
@@ -100,11 +113,11 @@ def create_cognito_only_user(caller_user_id, arguments, client=None, **kwargs):
     except UserException as err:
         raise ClientException(str(err)) from err
     user.set_last_client(client)
-    return user.serialize(caller_user_id)
+    return user.serialize(caller_user_id, selection_set=selection_set)
 
 
 @routes.register('Mutation.createAppleUser')
-def create_apple_user(caller_user_id, arguments, client=None, **kwargs):
+def create_apple_user(caller_user_id, arguments, client=None, selection_set=None, **kwargs):
     username = arguments['username']
     full_name = arguments.get('fullName')
     apple_token = arguments['appleIdToken']
@@ -115,11 +128,11 @@ def create_apple_user(caller_user_id, arguments, client=None, **kwargs):
     except UserException as err:
         raise ClientException(str(err)) from err
     user.set_last_client(client)
-    return user.serialize(caller_user_id)
+    return user.serialize(caller_user_id, selection_set=selection_set)
 
 
 @routes.register('Mutation.createFacebookUser')
-def create_facebook_user(caller_user_id, arguments, client=None, **kwargs):
+def create_facebook_user(caller_user_id, arguments, client=None, selection_set=None, **kwargs):
     username = arguments['username']
     full_name = arguments.get('fullName')
     facebook_token = arguments['facebookAccessToken']
@@ -130,11 +143,11 @@ def create_facebook_user(caller_user_id, arguments, client=None, **kwargs):
     except UserException as err:
         raise ClientException(str(err)) from err
     user.set_last_client(client)
-    return user.serialize(caller_user_id)
+    return user.serialize(caller_user_id, selection_set=selection_set)
 
 
 @routes.register('Mutation.createGoogleUser')
-def create_google_user(caller_user_id, arguments, client=None, **kwargs):
+def create_google_user(caller_user_id, arguments, client=None, selection_set=None, **kwargs):
     username = arguments['username']
     full_name = arguments.get('fullName')
     google_id_token = arguments['googleIdToken']
@@ -145,63 +158,63 @@ def create_google_user(caller_user_id, arguments, client=None, **kwargs):
     except UserException as err:
         raise ClientException(str(err)) from err
     user.set_last_client(client)
-    return user.serialize(caller_user_id)
+    return user.serialize(caller_user_id, selection_set=selection_set)
 
 
 @routes.register('Mutation.startChangeUserEmail')
 @validate_caller
 @update_last_client
-def start_change_user_email(caller_user, arguments, **kwargs):
+def start_change_user_email(caller_user, arguments, selection_set=None, **kwargs):
     email = arguments['email']
     try:
         caller_user.start_change_contact_attribute('email', email)
     except UserException as err:
         raise ClientException(str(err)) from err
-    return caller_user.serialize(caller_user.id)
+    return caller_user.serialize(caller_user.id, selection_set=selection_set)
 
 
 @routes.register('Mutation.finishChangeUserEmail')
 @validate_caller
 @update_last_client
-def finish_change_user_email(caller_user, arguments, **kwargs):
+def finish_change_user_email(caller_user, arguments, selection_set=None, **kwargs):
     access_token = arguments['cognitoAccessToken']
     code = arguments['verificationCode']
     try:
         caller_user.finish_change_contact_attribute('email', access_token, code)
     except UserException as err:
         raise ClientException(str(err)) from err
-    return caller_user.serialize(caller_user.id)
+    return caller_user.serialize(caller_user.id, selection_set=selection_set)
 
 
 @routes.register('Mutation.startChangeUserPhoneNumber')
 @validate_caller
 @update_last_client
-def start_change_user_phone_number(caller_user, arguments, **kwargs):
+def start_change_user_phone_number(caller_user, arguments, selection_set=None, **kwargs):
     phone = arguments['phoneNumber']
     try:
         caller_user.start_change_contact_attribute('phone', phone)
     except UserException as err:
         raise ClientException(str(err)) from err
-    return caller_user.serialize(caller_user.id)
+    return caller_user.serialize(caller_user.id, selection_set=selection_set)
 
 
 @routes.register('Mutation.finishChangeUserPhoneNumber')
 @validate_caller
 @update_last_client
-def finish_change_user_phone_number(caller_user, arguments, **kwargs):
+def finish_change_user_phone_number(caller_user, arguments, selection_set=None, **kwargs):
     access_token = arguments['cognitoAccessToken']
     code = arguments['verificationCode']
     try:
         caller_user.finish_change_contact_attribute('phone', access_token, code)
     except UserException as err:
         raise ClientException(str(err)) from err
-    return caller_user.serialize(caller_user.id)
+    return caller_user.serialize(caller_user.id, selection_set=selection_set)
 
 
 @routes.register('Mutation.setUserDetails')
 @validate_caller
 @update_last_client
-def set_user_details(caller_user, arguments, **kwargs):
+def set_user_details(caller_user, arguments, selection_set=None, **kwargs):
     username = arguments.get('username')
     full_name = arguments.get('fullName')
     bio = arguments.get('bio')
@@ -266,13 +279,13 @@ def set_user_details(caller_user, arguments, **kwargs):
         sharing_disabled=sharing_disabled,
         verification_hidden=verification_hidden,
     )
-    return caller_user.serialize(caller_user.id)
+    return caller_user.serialize(caller_user.id, selection_set=selection_set)
 
 
 @routes.register('Mutation.setUserAcceptedEULAVersion')
 @validate_caller
 @update_last_client
-def set_user_accepted_eula_version(caller_user, arguments, **kwargs):
+def set_user_accepted_eula_version(caller_user, arguments, selection_set=None, **kwargs):
     version = arguments['version']
 
     # use the empty string to request deleting
@@ -280,13 +293,13 @@ def set_user_accepted_eula_version(caller_user, arguments, **kwargs):
         version = None
 
     caller_user.set_accepted_eula_version(version)
-    return caller_user.serialize(caller_user.id)
+    return caller_user.serialize(caller_user.id, selection_set=selection_set)
 
 
 @routes.register('Mutation.setUserAPNSToken')
 @validate_caller
 @update_last_client
-def set_user_apns_token(caller_user, arguments, **kwargs):
+def set_user_apns_token(caller_user, arguments, selection_set=None, **kwargs):
     token = arguments['token']
 
     # use the empty string to request deleting
@@ -294,11 +307,11 @@ def set_user_apns_token(caller_user, arguments, **kwargs):
         token = None
 
     caller_user.set_apns_token(token)
-    return caller_user.serialize(caller_user.id)
+    return caller_user.serialize(caller_user.id, selection_set=selection_set)
 
 
 @routes.register('Mutation.resetUser')
-def reset_user(caller_user_id, arguments, client=None, **kwargs):
+def reset_user(caller_user_id, arguments, client=None, selection_set=None, **kwargs):
     new_username = arguments.get('newUsername') or None  # treat empty string like null
 
     # resetUser may be called when user exists in cognito but not in dynamo
@@ -314,11 +327,11 @@ def reset_user(caller_user_id, arguments, client=None, **kwargs):
             raise ClientException(str(err)) from err
         user.set_last_client(client)
 
-    return user.serialize(caller_user_id) if user else None
+    return user.serialize(caller_user_id, selection_set=selection_set) if user else None
 
 
 @routes.register('Mutation.disableUser')
-def disable_user(caller_user_id, arguments, client=None, **kwargs):
+def disable_user(caller_user_id, arguments, client=None, selection_set=None, **kwargs):
     # mark our user as in the process of deleting
     user = user_manager.get_user(caller_user_id)
     if not user:
@@ -326,29 +339,29 @@ def disable_user(caller_user_id, arguments, client=None, **kwargs):
 
     user.set_last_client(client)
     user.disable()
-    return user.serialize(caller_user_id)
+    return user.serialize(caller_user_id, selection_set=selection_set)
 
 
 @routes.register('Mutation.deleteUser')
-def delete_user(caller_user_id, arguments, client=None, **kwargs):
+def delete_user(caller_user_id, arguments, client=None, selection_set=None, **kwargs):
     user = user_manager.get_user(caller_user_id)
     if not user:
         raise ClientException(f'User `{caller_user_id}` does not exist')
 
     user.set_last_client(client)
     user.delete()
-    return user.serialize(caller_user_id)
+    return user.serialize(caller_user_id, selection_set=selection_set)
 
 
 @routes.register('Mutation.grantUserSubscriptionBonus')
 @validate_caller
 @update_last_client
-def grant_user_subscription_bonus(caller_user, arguments, **kwargs):
+def grant_user_subscription_bonus(caller_user, arguments, selection_set=None, **kwargs):
     try:
         caller_user.grant_subscription_bonus()
     except UserException as err:
         raise ClientException(str(err)) from err
-    return caller_user.serialize(caller_user.id)
+    return caller_user.serialize(caller_user.id, selection_set=selection_set)
 
 
 @routes.register('Mutation.addAppStoreReceipt')
@@ -363,25 +376,20 @@ def add_app_store_receipt(caller_user, arguments, **kwargs):
     return True
 
 
-@routes.register('User.photo')
-def user_photo(caller_user_id, arguments, source=None, **kwargs):
-    user = user_manager.init_user(source)
-    native_url = user.get_photo_url(image_size.NATIVE)
-    if not native_url:
-        return None
-    return {
-        'url': native_url,
-        'url64p': user.get_photo_url(image_size.P64),
-        'url480p': user.get_photo_url(image_size.P480),
-        'url1080p': user.get_photo_url(image_size.P1080),
-        'url4k': user.get_photo_url(image_size.K4),
-    }
+@routes.register('User.photo', batch=True)
+def user_photo(requests, **kwargs):
+    return [serialize_user_photo(user_manager.init_user(request['source'])) for request in requests]
+
+
+def serialize_user_photo(user):
+    urls = serialize_image_urls(user.get_photo_urls)
+    return urls if urls['url'] else None
 
 
 @routes.register('Mutation.followUser')
 @validate_caller
 @update_last_client
-def follow_user(caller_user, arguments, **kwargs):
+def follow_user(caller_user, arguments, selection_set=None, **kwargs):
     follower_user = caller_user
     followed_user_id = arguments['userId']
 
@@ -397,7 +405,7 @@ def follow_user(caller_user, arguments, **kwargs):
     except FollowerException as err:
         raise ClientException(str(err)) from err
 
-    resp = followed_user.serialize(caller_user.id)
+    resp = followed_user.serialize(caller_user.id, selection_set=selection_set)
     resp['followedStatus'] = follow.status
     if follow.status == FollowStatus.FOLLOWING:
         resp['followerCount'] = followed_user.item.get('followerCount', 0) + 1
@@ -407,7 +415,7 @@ def follow_user(caller_user, arguments, **kwargs):
 @routes.register('Mutation.unfollowUser')
 @validate_caller
 @update_last_client
-def unfollow_user(caller_user, arguments, **kwargs):
+def unfollow_user(caller_user, arguments, selection_set=None, **kwargs):
     follower_user = caller_user
     followed_user_id = arguments['userId']
 
@@ -420,7 +428,9 @@ def unfollow_user(caller_user, arguments, **kwargs):
     except FollowerException as err:
         raise ClientException(str(err)) from err
 
-    resp = user_manager.get_user(followed_user_id, strongly_consistent=True).serialize(caller_user.id)
+    resp = user_manager.get_user(followed_user_id, strongly_consistent=True).serialize(
+        caller_user.id, selection_set=selection_set
+    )
     resp['followedStatus'] = follow.status
     return resp
 
@@ -428,7 +438,7 @@ def unfollow_user(caller_user, arguments, **kwargs):
 @routes.register('Mutation.acceptFollowerUser')
 @validate_caller
 @update_last_client
-def accept_follower_user(caller_user, arguments, **kwargs):
+def accept_follower_user(caller_user, arguments, selection_set=None, **kwargs):
     followed_user = caller_user
     follower_user_id = arguments['userId']
 
@@ -441,7 +451,9 @@ def accept_follower_user(caller_user, arguments, **kwargs):
     except FollowerException as err:
         raise ClientException(str(err)) from err
 
-    resp = user_manager.get_user(follower_user_id, strongly_consistent=True).serialize(caller_user.id)
+    resp = user_manager.get_user(follower_user_id, strongly_consistent=True).serialize(
+        caller_user.id, selection_set=selection_set
+    )
     resp['followerStatus'] = follow.status
     return resp
 
@@ -449,7 +461,7 @@ def accept_follower_user(caller_user, arguments, **kwargs):
 @routes.register('Mutation.denyFollowerUser')
 @validate_caller
 @update_last_client
-def deny_follower_user(caller_user, arguments, **kwargs):
+def deny_follower_user(caller_user, arguments, selection_set=None, **kwargs):
     followed_user = caller_user
     follower_user_id = arguments['userId']
 
@@ -462,7 +474,9 @@ def deny_follower_user(caller_user, arguments, **kwargs):
     except FollowerException as err:
         raise ClientException(str(err)) from err
 
-    resp = user_manager.get_user(follower_user_id, strongly_consistent=True).serialize(caller_user.id)
+    resp = user_manager.get_user(follower_user_id, strongly_consistent=True).serialize(
+        caller_user.id, selection_set=selection_set
+    )
     resp['followerStatus'] = follow.status
     return resp
 
@@ -470,7 +484,7 @@ def deny_follower_user(caller_user, arguments, **kwargs):
 @routes.register('Mutation.blockUser')
 @validate_caller
 @update_last_client
-def block_user(caller_user, arguments, **kwargs):
+def block_user(caller_user, arguments, selection_set=None, **kwargs):
     blocker_user = caller_user
     blocked_user_id = arguments['userId']
 
@@ -486,7 +500,7 @@ def block_user(caller_user, arguments, **kwargs):
     except BlockException as err:
         raise ClientException(str(err)) from err
 
-    resp = blocked_user.serialize(caller_user.id)
+    resp = blocked_user.serialize(caller_user.id, selection_set=selection_set)
     resp['blockedStatus'] = BlockStatus.BLOCKING
     return resp
 
@@ -494,7 +508,7 @@ def block_user(caller_user, arguments, **kwargs):
 @routes.register('Mutation.unblockUser')
 @validate_caller
 @update_last_client
-def unblock_user(caller_user, arguments, **kwargs):
+def unblock_user(caller_user, arguments, selection_set=None, **kwargs):
     blocker_user = caller_user
     blocked_user_id = arguments['userId']
 
@@ -510,7 +524,7 @@ def unblock_user(caller_user, arguments, **kwargs):
     except BlockException as err:
         raise ClientException(str(err)) from err
 
-    resp = blocked_user.serialize(caller_user.id)
+    resp = blocked_user.serialize(caller_user.id, selection_set=selection_set)
     resp['blockedStatus'] = BlockStatus.NOT_BLOCKING
     return resp
 
@@ -518,7 +532,7 @@ def unblock_user(caller_user, arguments, **kwargs):
 @routes.register('Mutation.addPost')
 @validate_caller
 @update_last_client
-def add_post(caller_user, arguments, **kwargs):
+def add_post(caller_user, arguments, selection_set=None, **kwargs):
     post_id = arguments['postId']
     post_type = arguments.get('postType') or PostType.IMAGE
     text = arguments.get('text')
@@ -559,13 +573,16 @@ def add_post(caller_user, arguments, **kwargs):
     except PostException as err:
         raise ClientException(str(err)) from err
 
-    return post.serialize(caller_user.id)
+    return post.serialize(caller_user.id, selection_set=selection_set)
 
 
-@routes.register('Post.image')
-def post_image(caller_user_id, arguments, source=None, **kwargs):
-    post = post_manager.get_post(source['postId'])
+@routes.register('Post.image', batch=True)
+def post_image(requests, **kwargs):
+    post_ids = [request['source']['postId'] for request in requests]
+    return [serialize_post_image(post) for post in post_manager.get_posts(post_ids, with_image_items=True)]
 
+
+def serialize_post_image(post):
     if not post or post.status == PostStatus.DELETING:
         return None
 
@@ -576,15 +593,7 @@ def post_image(caller_user_id, arguments, source=None, **kwargs):
         return None
 
     image_item = post.image_item.copy() if post.image_item else {}
-    image_item.update(
-        {
-            'url': post.get_image_readonly_url(image_size.NATIVE),
-            'url64p': post.get_image_readonly_url(image_size.P64),
-            'url480p': post.get_image_readonly_url(image_size.P480),
-            'url1080p': post.get_image_readonly_url(image_size.P1080),
-            'url4k': post.get_image_readonly_url(image_size.K4),
-        }
-    )
+    image_item.update(serialize_image_urls(post.get_image_readonly_urls))
     return image_item
 
 
@@ -603,10 +612,13 @@ def post_image_upload_url(caller_user_id, arguments, source=None, **kwargs):
     return post.get_image_writeonly_url()
 
 
-@routes.register('Post.video')
-def post_video(caller_user_id, arguments, source=None, **kwargs):
-    post = post_manager.get_post(source['postId'])
+@routes.register('Post.video', batch=True)
+def post_video(requests, **kwargs):
+    post_ids = [request['source']['postId'] for request in requests]
+    return [serialize_post_video(post) for post in post_manager.get_posts(post_ids)]
+
 
+def serialize_post_video(post):
     statuses = (PostStatus.COMPLETED, PostStatus.ARCHIVED)
     if not post or post.type != PostType.VIDEO or post.status not in statuses:
         return None
@@ -635,7 +647,7 @@ def post_video_upload_url(caller_user_id, arguments, source=None, **kwargs):
 @routes.register('Mutation.editPost')
 @validate_caller
 @update_last_client
-def edit_post(caller_user, arguments, **kwargs):
+def edit_post(caller_user, arguments, selection_set=None, **kwargs):
     post_id = arguments['postId']
     edit_kwargs = {
         'text': arguments.get('text'),
@@ -657,13 +669,13 @@ def edit_post(caller_user, arguments, **kwargs):
     except PostException as err:
         raise ClientException(str(err)) from err
 
-    return post.serialize(caller_user.id)
+    return post.serialize(caller_user.id, selection_set=selection_set)
 
 
 @routes.register('Mutation.editPostAlbum')
 @validate_caller
 @update_last_client
-def edit_post_album(caller_user, arguments, **kwargs):
+def edit_post_album(caller_user, arguments, selection_set=None, **kwargs):
     post_id = arguments['postId']
     album_id = arguments.get('albumId') or None
 
@@ -679,13 +691,13 @@ def edit_post_album(caller_user, arguments, **kwargs):
     except PostException as err:
         raise ClientException(str(err)) from err
 
-    return post.serialize(caller_user.id)
+    return post.serialize(caller_user.id, selection_set=selection_set)
 
 
 @routes.register('Mutation.editPostAlbumOrder')
 @validate_caller
 @update_last_client
-def edit_post_album_order(caller_user, arguments, **kwargs):
+def edit_post_album_order(caller_user, arguments, selection_set=None, **kwargs):
     post_id = arguments['postId']
     preceding_post_id = arguments.get('precedingPostId')
 
@@ -701,13 +713,13 @@ def edit_post_album_order(caller_user, arguments, **kwargs):
     except PostException as err:
         raise ClientException(str(err)) from err
 
-    return post.serialize(caller_user.id)
+    return post.serialize(caller_user.id, selection_set=selection_set)
 
 
 @routes.register('Mutation.editPostExpiresAt')
 @validate_caller
 @update_last_client
-def edit_post_expires_at(caller_user, arguments, **kwargs):
+def edit_post_expires_at(caller_user, arguments, selection_set=None, **kwargs):
     post_id = arguments['postId']
     expires_at_str = arguments.get('expiresAt')
     expires_at = pendulum.parse(expires_at_str) if expires_at_str else None
@@ -723,13 +735,13 @@ def edit_post_expires_at(caller_user, arguments, **kwargs):
         raise ClientException("Cannot set expiresAt to date time in the past: `{expires_at}`")
 
     post.set_expires_at(expires_at)
-    return post.serialize(caller_user.id)
+    return post.serialize(caller_user.id, selection_set=selection_set)
 
 
 @routes.register('Mutation.flagPost')
 @validate_caller
 @update_last_client
-def flag_post(caller_user, arguments, **kwargs):
+def flag_post(caller_user, arguments, selection_set=None, **kwargs):
     post_id = arguments['postId']
 
     post = post_manager.get_post(post_id)
@@ -741,7 +753,7 @@ def flag_post(caller_user, arguments, **kwargs):
     except (PostException, FlagException) as err:
         raise ClientException(str(err)) from err
 
-    resp = post.serialize(caller_user.id)
+    resp = post.serialize(caller_user.id, selection_set=selection_set)
     resp['flagStatus'] = FlagStatus.FLAGGED
     return resp
 
@@ -749,7 +761,7 @@ def flag_post(caller_user, arguments, **kwargs):
 @routes.register('Mutation.archivePost')
 @validate_caller
 @update_last_client
-def archive_post(caller_user, arguments, **kwargs):
+def archive_post(caller_user, arguments, selection_set=None, **kwargs):
     post_id = arguments['postId']
 
     post = post_manager.get_post(post_id)
@@ -764,13 +776,13 @@ def archive_post(caller_user, arguments, **kwargs):
     except PostException as err:
         raise ClientException(str(err)) from err
 
-    return post.serialize(caller_user.id)
+    return post.serialize(caller_user.id, selection_set=selection_set)
 
 
 @routes.register('Mutation.deletePost')
 @validate_caller
 @update_last_client
-def delete_post(caller_user, arguments, **kwargs):
+def delete_post(caller_user, arguments, selection_set=None, **kwargs):
     post_id = arguments['postId']
 
     post = post_manager.get_post(post_id)
@@ -785,13 +797,13 @@ def delete_post(caller_user, arguments, **kwargs):
     except PostException as err:
         raise ClientException(str(err)) from err
 
-    return post.serialize(caller_user.id)
+    return post.serialize(caller_user.id, selection_set=selection_set)
 
 
 @routes.register('Mutation.restoreArchivedPost')
 @validate_caller
 @update_last_client
-def restore_archived_post(caller_user, arguments, **kwargs):
+def restore_archived_post(caller_user, arguments, selection_set=None, **kwargs):
     post_id = arguments['postId']
 
     post = post_manager.get_post(post_id)
@@ -806,13 +818,13 @@ def restore_archived_post(caller_user, arguments, **kwargs):
     except PostException as err:
         raise ClientException(str(err)) from err
 
-    return post.serialize(caller_user.id)
+    return post.serialize(caller_user.id, selection_set=selection_set)
 
 
 @routes.register('Mutation.onymouslyLikePost')
 @validate_caller
 @update_last_client
-def onymously_like_post(caller_user, arguments, **kwargs):
+def onymously_like_post(caller_user, arguments, selection_set=None, **kwargs):
     post_id = arguments['postId']
 
     post = post_manager.get_post(post_id)
@@ -824,7 +836,7 @@ def onymously_like_post(caller_user, arguments, **kwargs):
     except LikeException as err:
         raise ClientException(str(err)) from err
 
-    resp = post.serialize(caller_user.id)
+    resp = post.serialize(caller_user.id, selection_set=selection_set)
     resp['likeStatus'] = LikeStatus.ONYMOUSLY_LIKED
     return resp
 
@@ -832,7 +844,7 @@ def onymously_like_post(caller_user, arguments, **kwargs):
 @routes.register('Mutation.anonymouslyLikePost')
 @validate_caller
 @update_last_client
-def anonymously_like_post(caller_user, arguments, **kwargs):
+def anonymously_like_post(caller_user, arguments, selection_set=None, **kwargs):
     post_id = arguments['postId']
 
     post = post_manager.get_post(post_id)
@@ -844,7 +856,7 @@ def anonymously_like_post(caller_user, arguments, **kwargs):
     except LikeException as err:
         raise ClientException(str(err)) from err
 
-    resp = post.serialize(caller_user.id)
+    resp = post.serialize(caller_user.id, selection_set=selection_set)
     resp['likeStatus'] = LikeStatus.ANONYMOUSLY_LIKED
     return resp
 
@@ -852,7 +864,7 @@ def anonymously_like_post(caller_user, arguments, **kwargs):
 @routes.register('Mutation.dislikePost')
 @validate_caller
 @update_last_client
-def dislike_post(caller_user, arguments, **kwargs):
+def dislike_post(caller_user, arguments, selection_set=None, **kwargs):
     post_id = arguments['postId']
 
     post = post_manager.dynamo.get_post(post_id)
@@ -866,7 +878,7 @@ def dislike_post(caller_user, arguments, **kwargs):
     prev_status = like.item['likeStatus']
     like.dislike()
 
-    resp = post_manager.init_post(post).serialize(caller_user.id)
+    resp = post_manager.init_post(post).serialize(caller_user.id, selection_set=selection_set)
     post_like_count = 'onymousLikeCount' if prev_status == LikeStatus.ONYMOUSLY_LIKED else 'anonymousLikeCount'
     if resp.get(post_like_count, 0) > 0:
         resp[post_like_count] -= 1
@@ -892,7 +904,7 @@ def report_post_views(caller_user, arguments, **kwargs):
 @routes.register('Mutation.addComment')
 @validate_caller
 @update_last_client
-def add_comment(caller_user, arguments, **kwargs):
+def add_comment(caller_user, arguments, selection_set=None, **kwargs):
     comment_id = arguments['commentId']
     post_id = arguments['postId']
     text = arguments['text']
@@ -902,13 +914,13 @@ def add_comment(caller_user, arguments, **kwargs):
     except CommentException as err:
         raise ClientException(str(err)) from err
 
-    return comment.serialize(caller_user.id)
+    return comment.serialize(caller_user.id, selection_set=selection_set)
 
 
 @routes.register('Mutation.deleteComment')
 @validate_caller
 @update_last_client
-def delete_comment(caller_user, arguments, **kwargs):
+def delete_comment(caller_user, arguments, selection_set=None, **kwargs):
     comment_id = arguments['commentId']
 
     comment = comment_manager.get_comment(comment_id)
@@ -920,13 +932,13 @@ def delete_comment(caller_user, arguments, **kwargs):
     except CommentException as err:
         raise ClientException(str(err)) from err
 
-    return comment.serialize(caller_user.id)
+    return comment.serialize(caller_user.id, selection_set=selection_set)
 
 
 @routes.register('Mutation.flagComment')
 @validate_caller
 @update_last_client
-def flag_comment(caller_user, arguments, **kwargs):
+def flag_comment(caller_user, arguments, selection_set=None, **kwargs):
     comment_id = arguments['commentId']
 
     comment = comment_manager.get_comment(comment_id)
@@ -938,7 +950,7 @@ def flag_comment(caller_user, arguments, **kwargs):
     except (CommentException, FlagException) as err:
         raise ClientException(str(err)) from err
 
-    resp = comment.serialize(caller_user.id)
+    resp = comment.serialize(caller_user.id, selection_set=selection_set)
     resp['flagStatus'] = FlagStatus.FLAGGED
     return resp
 
@@ -964,24 +976,22 @@ def delete_card(caller_user, arguments, **kwargs):
     return card.serialize(caller_user.id)
 
 
-@routes.register('Card.thumbnail')
-def card_thumbnail(caller_user_id, arguments, source=None, **kwargs):
-    card = card_manager.get_card(source['cardId'])
+@routes.register('Card.thumbnail', batch=True)
+def card_thumbnail(requests, **kwargs):
+    card_ids = [request['source']['cardId'] for request in requests]
+    return [serialize_card_thumbnail(card) for card in card_manager.get_cards(card_ids, with_posts=True)]
+
+
+def serialize_card_thumbnail(card):
     if card and card.post and card.post.type != PostType.TEXT_ONLY:
-        return {
-            'url': card.post.get_image_readonly_url(image_size.NATIVE),
-            'url64p': card.post.get_image_readonly_url(image_size.P64),
-            'url480p': card.post.get_image_readonly_url(image_size.P480),
-            'url1080p': card.post.get_image_readonly_url(image_size.P1080),
-            'url4k': card.post.get_image_readonly_url(image_size.K4),
-        }
+        return serialize_image_urls(card.post.get_image_readonly_urls)
     return None
 
 
 @routes.register('Mutation.addAlbum')
 @validate_caller
 @update_last_client
-def add_album(caller_user, arguments, **kwargs):
+def add_album(caller_user, arguments, selection_set=None, **kwargs):
     album_id = arguments['albumId']
     name = arguments['name']
     description = arguments.get('description')
@@ -991,13 +1001,13 @@ def add_album(caller_user, arguments, **kwargs):
     except AlbumException as err:
         raise ClientException(str(err)) from err
 
-    return album.serialize(caller_user.id)
+    return album.serialize(caller_user.id, selection_set=selection_set)
 
 
 @routes.register('Mutation.editAlbum')
 @validate_caller
 @update_last_client
-def edit_album(caller_user, arguments, **kwargs):
+def edit_album(caller_user, arguments, selection_set=None, **kwargs):
     album_id = arguments['albumId']
     name = arguments.get('name')
     description = arguments.get('description')
@@ -1017,13 +1027,13 @@ def edit_album(caller_user, arguments, **kwargs):
     except AlbumException as err:
         raise ClientException(str(err)) from err
 
-    return album.serialize(caller_user.id)
+    return album.serialize(caller_user.id, selection_set=selection_set)
 
 
 @routes.register('Mutation.deleteAlbum')
 @validate_caller
 @update_last_client
-def delete_album(caller_user, arguments, **kwargs):
+def delete_album(caller_user, arguments, selection_set=None, **kwargs):
     album_id = arguments['albumId']
 
     album = album_manager.get_album(album_id)
@@ -1038,19 +1048,16 @@ def delete_album(caller_user, arguments, **kwargs):
     except AlbumException as err:
         raise ClientException(str(err)) from err
 
-    return album.serialize(caller_user.id)
+    return album.serialize(caller_user.id, selection_set=selection_set)
 
 
-@routes.register('Album.art')
-def album_art(caller_user_id, arguments, source=None, **kwargs):
-    album = album_manager.init_album(source)
-    return {
-        'url': album.get_art_image_url(image_size.NATIVE),
-        'url64p': album.get_art_image_url(image_size.P64),
-        'url480p': album.get_art_image_url(image_size.P480),
-        'url1080p': album.get_art_image_url(image_size.P1080),
-        'url4k': album.get_art_image_url(image_size.K4),
-    }
+@routes.register('Album.art', batch=True)
+def album_art(requests, **kwargs):
+    return [serialize_album_art(album_manager.init_album(request['source'])) for request in requests]
+
+
+def serialize_album_art(album):
+    return serialize_image_urls(album.get_art_image_urls)
 
 
 @routes.register('Mutation.createDirectChat')
@@ -1188,7 +1195,7 @@ def flag_chat(caller_user, arguments, **kwargs):
 @routes.register('Mutation.addChatMessage')
 @validate_caller
 @update_last_client
-def add_chat_message(caller_user, arguments, **kwargs):
+def add_chat_message(caller_user, arguments, selection_set=None, **kwargs):
     chat_id, message_id, text = arguments['chatId'], arguments['messageId'], arguments['text']
 
     chat = chat_manager.get_chat(chat_id)
@@ -1201,13 +1208,13 @@ def add_chat_message(caller_user, arguments, **kwargs):
         raise ClientException(str(err)) from err
 
     message.trigger_notifications(ChatMessageNotificationType.ADDED)
-    return message.serialize(caller_user.id)
+    return message.serialize(caller_user.id, selection_set=selection_set)
 
 
 @routes.register('Mutation.editChatMessage')
 @validate_caller
 @update_last_client
-def edit_chat_message(caller_user, arguments, **kwargs):
+def edit_chat_message(caller_user, arguments, selection_set=None, **kwargs):
     message_id, text = arguments['messageId'], arguments['text']
 
     message = chat_message_manager.get_chat_message(message_id)
@@ -1220,13 +1227,13 @@ def edit_chat_message(caller_user, arguments, **kwargs):
         raise ClientException(str(err)) from err
 
     message.trigger_notifications(ChatMessageNotificationType.EDITED)
-    return message.serialize(caller_user.id)
+    return message.serialize(caller_user.id, selection_set=selection_set)
 
 
 @routes.register('Mutation.deleteChatMessage')
 @validate_caller
 @update_last_client
-def delete_chat_message(caller_user, arguments, **kwargs):
+def delete_chat_message(caller_user, arguments, selection_set=None, **kwargs):
     message_id = arguments['messageId']
 
     message = chat_message_manager.get_chat_message(message_id)
@@ -1239,13 +1246,13 @@ def delete_chat_message(caller_user, arguments, **kwargs):
         raise ClientException(str(err)) from err
 
     message.trigger_notifications(ChatMessageNotificationType.DELETED)
-    return message.serialize(caller_user.id)
+    return message.serialize(caller_user.id, selection_set=selection_set)
 
 
 @routes.register('Mutation.flagChatMessage')
 @validate_caller
 @update_last_client
-def flag_chat_message(caller_user, arguments, **kwargs):
+def flag_chat_message(caller_user, arguments, selection_set=None, **kwargs):
     message_id = arguments['messageId']
 
     message = chat_message_manager.get_chat_message(message_id)
@@ -1257,7 +1264,7 @@ def flag_chat_message(caller_user, arguments, **kwargs):
     except (ChatMessageException, FlagException) as err:
         raise ClientException(str(err)) from err
 
-    resp = message.serialize(caller_user.id)
+    resp = message.serialize(caller_user.id, selection_set=selection_set)
     resp['flagStatus'] = FlagStatus.FLAGGED
     return resp
 
@@ -4,16 +4,29 @@ import importlib
 # graphql field -> python handler
 cache = {}
 
+# graphql fields whose handler resolves a list of events at a time
+batch_fields = set()
+
 
 def clear():
     cache.clear()
+    batch_fields.clear()
+
 
+def register(field, batch=False):
+    """
+    Decorator to register a handler for an appsync graphql field.
 
-def register(field):
-    "Decorator to register a handler for an appsync graphql field"
+    A `batch` handler is called as `func(requests, context=...)` with a list of requests, one per
+    source object the field is to be resolved for, and returns a list of results in the same order.
+    """
 
     def inner(func):
         cache[field] = func
+        if batch:
+            batch_fields.add(field)
+        else:
+            batch_fields.discard(field)
         return func
 
     return inner
@@ -23,8 +36,12 @@ def get_handler(field):
     return cache.get(field)
 
 
+def is_batch(field):
+    return field in batch_fields
+
+
 def discover(path):
-    cache.clear()
+    clear()
     # registers handlers in the routing table as a side effect of importing
     # add more imports here as handlers are spread across files
     importlib.import_module(path)
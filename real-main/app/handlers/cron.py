@@ -3,32 +3,26 @@ import os
 
 import pendulum
 
-from app import clients, models
 from app.logging import LogLevelContext, handler_logging
 
 from . import xray
+from .registry import Registry
 
-S3_UPLOADS_BUCKET = os.environ.get('S3_UPLOADS_BUCKET')
+DYNAMO_SCAN_TOTAL_SEGMENTS = int(os.environ.get('DYNAMO_SCAN_TOTAL_SEGMENTS') or 1)
 USER_NOTIFICATIONS_ENABLED = os.environ.get('USER_NOTIFICATIONS_ENABLED')
 USER_NOTIFICATIONS_ONLY_USERNAMES = os.environ.get('USER_NOTIFICATIONS_ONLY_USERNAMES')
 
 logger = logging.getLogger()
 xray.patch_all()
 
-clients = {
-    'appstore': clients.AppStoreClient(),
-    'dynamo': clients.DynamoClient(),
-    'cognito': clients.CognitoClient(),
-    'pinpoint': clients.PinpointClient(),
-    's3_uploads': clients.S3Client(S3_UPLOADS_BUCKET),
-}
-
-managers = {}
-appstore_manager = managers.get('appstore') or models.AppStoreManager(clients, managers=managers)
-album_manager = managers.get('album') or models.AlbumManager(clients, managers=managers)
-card_manager = managers.get('card') or models.CardManager(clients, managers=managers)
-post_manager = managers.get('post') or models.PostManager(clients, managers=managers)
-user_manager = managers.get('user') or models.UserManager(clients, managers=managers)
+registry = Registry(['appstore', 'dynamo', 'cognito', 'pinpoint', 's3_uploads', 'work_queue'])
+clients = registry.clients
+managers = registry.managers
+appstore_manager = registry.manager('appstore')
+album_manager = registry.manager('album')
+card_manager = registry.manager('card')
+post_manager = registry.manager('post')
+user_manager = registry.manager('user')
 
 
 @handler_logging
@@ -67,7 +61,7 @@ def delete_recently_expired_posts(event, context):
 @handler_logging
 def delete_older_expired_posts(event, context):
     now = pendulum.now('utc')
-    post_manager.delete_older_expired_posts(now=now)
+    post_manager.delete_older_expired_posts(now=now, total_segments=DYNAMO_SCAN_TOTAL_SEGMENTS)
 
 
 @handler_logging
@@ -0,0 +1,26 @@
+def coalesce_calls(calls):
+    """
+    Collapse the calls of a listener on consecutive MODIFY records of the same item into a single call, with
+    the old item of the first of those records and the new item of the last. Any other event on the item ends
+    the run of MODIFY records, and is called on its own.
+
+    `calls` is a list of (func, sequence_number, event_name, record_key, (item_id, old_item, new_item)) in
+    stream order. Returns a list of (func, [sequence_number, ...], event_name, record_key, (item_id, old_item,
+    new_item)), in stream order of the first record of each.
+    """
+    coalesced = []
+    # {(func, record_key): index in `coalesced` of the call later MODIFY records of the item may be merged into}
+    open_runs = {}
+    for func, sequence_number, event_name, record_key, (item_id, old_item, new_item) in calls:
+        run_key = (func, record_key)
+        idx = open_runs.pop(run_key, None)
+        if event_name != 'MODIFY' or idx is None:
+            coalesced.append((func, [sequence_number], event_name, record_key, (item_id, old_item, new_item)))
+            if event_name == 'MODIFY':
+                open_runs[run_key] = len(coalesced) - 1
+            continue
+        _, sequence_numbers, _, _, (_, first_old_item, _) = coalesced[idx]
+        sequence_numbers.append(sequence_number)
+        coalesced[idx] = (func, sequence_numbers, event_name, record_key, (item_id, first_old_item, new_item))
+        open_runs[run_key] = idx
+    return coalesced
@@ -1,5 +1,5 @@
 import logging
-from collections import defaultdict
+import types
 
 logger = logging.getLogger()
 
@@ -8,35 +8,98 @@ class DynamoDispatch:
     """
     A dispatcher that holds and allows searching over a catalogue of listener functions
     according to matching conditions which should trigger a call.
+
+    Registrations are compiled, on first search, into an index keyed by (pk_prefix, sk_prefix, event_name).
+    Each entry holds the distinct changed-attribute tests of its listeners, so that when searching each
+    test is run at most once per record no matter how many listeners share it.
     """
 
     def __init__(self):
-        self.listeners = defaultdict(lambda: defaultdict(lambda: defaultdict(list)))
+        self.registrations = []
+        self.batch_handlers = set()
+        self.coalesced_handlers = set()
+        self.index = None
 
-    def register(self, pk_prefix, sk_prefix, event_names, handler, attributes=None):
+    def register(self, pk_prefix, sk_prefix, event_names, handler, attributes=None, batch=False, coalesce=False):
         """
         Register a handler.
 
         The `attributes` parameter, if provided, should be a dictionary of {name: default_value}.
         If `attributes` is present handler will only be called if at least one of the
         values of `attributes` have changed when applied to the old & new items.
+
+        If `batch` is set, rather than being called once per matching record as
+        `handler(item_id, new_item=..., old_item=...)`, the handler is called once per batch of
+        records as `handler(records)` where `records` is a list of (item_id, old_item, new_item)
+        tuples, one per matching record in stream order, with None for any missing image.
+
+        If `coalesce` is set, the handler is called once per run of consecutive MODIFY records of the same
+        item in a batch, with the old item of the first and the new item of the last, rather than once
+        per record. Only for handlers that depend on the state of the item, not on each step it went through.
         """
         for event_name in event_names:
-            self.listeners[pk_prefix][sk_prefix][event_name].append(
-                {'handler': handler, 'attributes': attributes}
-            )
+            self.registrations.append(((pk_prefix, sk_prefix, event_name), handler, attributes))
+        if batch:
+            self.batch_handlers.add(handler)
+        if coalesce:
+            self.coalesced_handlers.add(handler)
+        self.index = None
+
+    def is_batch(self, handler):
+        return handler in self.batch_handlers
+
+    def is_coalesced(self, handler):
+        return handler in self.coalesced_handlers
+
+    def compile(self):
+        "Build the index of {(pk_prefix, sk_prefix, event_name): (tests, listeners)} from the registrations"
+        entries = {}
+        for index_key, handler, attributes in self.registrations:
+            tests, listeners = entries.setdefault(index_key, ([], []))
+            test_idxs = None
+            if attributes:
+                test_idxs = []
+                for attr_name, attr_default in attributes.items():
+                    # defaults may be unhashable (ex: lists), so tests are matched by equality
+                    test = (attr_name, type(attr_default), attr_default)
+                    if test not in tests:
+                        tests.append(test)
+                    test_idxs.append(tests.index(test))
+                test_idxs = tuple(test_idxs)
+            listeners.append((handler, test_idxs))
+        self.index = types.MappingProxyType(
+            {
+                index_key: (tuple((name, default) for name, _, default in tests), tuple(listeners))
+                for index_key, (tests, listeners) in entries.items()
+            }
+        )
+        return self.index
+
+    def has_listeners(self, pk_prefix, sk_prefix, event_name):
+        "Could any listener match a record with these prefixes and event name, regardless of its attributes?"
+        index = self.index if self.index is not None else self.compile()
+        return (pk_prefix, sk_prefix, event_name) in index
 
     def search(self, pk_prefix, sk_prefix, event_name, old_item, new_item):
-        "Returns a set of matching listener functions"
+        "Returns a list of matching listener functions"
+        index = self.index if self.index is not None else self.compile()
+        entry = index.get((pk_prefix, sk_prefix, event_name))
+        if entry is None:
+            return []
+        tests, listeners = entry
+        changed = [None] * len(tests)
         matches = []
-        for listener in self.listeners[pk_prefix][sk_prefix][event_name]:
-            if not listener['attributes']:
-                matches.append(listener['handler'])
+        for handler, test_idxs in listeners:
+            if test_idxs is None:
+                matches.append(handler)
                 continue
-            for attr_name, attr_default in listener['attributes'].items():
-                old_value = old_item.get(attr_name, attr_default)
-                new_value = new_item.get(attr_name, attr_default)
-                if old_value != new_value:
-                    matches.append(listener['handler'])
+            for test_idx in test_idxs:
+                if changed[test_idx] is None:
+                    attr_name, attr_default = tests[test_idx]
+                    old_value = old_item.get(attr_name, attr_default)
+                    new_value = new_item.get(attr_name, attr_default)
+                    changed[test_idx] = old_value != new_value
+                if changed[test_idx]:
+                    matches.append(handler)
                     break
         return matches
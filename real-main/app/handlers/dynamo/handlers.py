@@ -1,46 +1,44 @@
+import functools
 import logging
 import os
 
-from boto3.dynamodb.types import TypeDeserializer
-
-from app import clients, models
 from app.handlers import xray
+from app.handlers.registry import Registry, on_client_created
 from app.logging import LogLevelContext, handler_logging
 from app.models.follower.enums import FollowStatus
 from app.models.user.enums import UserStatus
 
+from .coalesce import coalesce_calls
 from .dispatch import DynamoDispatch
+from .image import LazyImage, deserialize
+from .lanes import process_in_lanes
+from .metrics import ListenerMetrics, instrument_client
+from .progress import StreamBatchProgress
 
-DYNAMO_FEED_TABLE = os.environ.get('DYNAMO_FEED_TABLE')
-S3_UPLOADS_BUCKET = os.environ.get('S3_UPLOADS_BUCKET')
+# records with different partition keys are independent, so up to this many of those are processed at once
+DYNAMO_STREAM_CONCURRENCY = int(os.environ.get('DYNAMO_STREAM_CONCURRENCY') or 1)
 
 logger = logging.getLogger()
 xray.patch_all()
 
-clients = {
-    'appstore': clients.AppStoreClient(),
-    'appsync': clients.AppSyncClient(),
-    'dynamo': clients.DynamoClient(),
-    'dynamo_feed': clients.DynamoClient(table_name=DYNAMO_FEED_TABLE),
-    'elasticsearch': clients.ElasticSearchClient(),
-    'pinpoint': clients.PinpointClient(),
-    's3_uploads': clients.S3Client(S3_UPLOADS_BUCKET),
-}
-
-managers = {}
-album_manager = managers.get('album') or models.AlbumManager(clients, managers=managers)
-appstore_manager = managers.get('appstore_receipt') or models.AppStoreManager(clients, managers=managers)
-card_manager = managers.get('card') or models.CardManager(clients, managers=managers)
-chat_manager = managers.get('chat') or models.ChatManager(clients, managers=managers)
-chat_message_manager = managers.get('chat_message') or models.ChatMessageManager(clients, managers=managers)
-comment_manager = managers.get('comment') or models.CommentManager(clients, managers=managers)
-feed_manager = managers.get('feed') or models.FeedManager(clients, managers=managers)
-follower_manager = managers.get('follower') or models.FollowerManager(clients, managers=managers)
-post_manager = managers.get('post') or models.PostManager(clients, managers=managers)
-user_manager = managers.get('user') or models.UserManager(clients, managers=managers)
+registry = Registry(
+    ['appstore', 'appsync', 'dynamo', 'dynamo_feed', 'elasticsearch', 'pinpoint', 's3_uploads', 'work_queue']
+)
+clients = registry.clients
+# count the downstream calls made by each listener
+on_client_created(instrument_client)
 
-# https://stackoverflow.com/a/46738251
-deserialize = TypeDeserializer().deserialize
+managers = registry.managers
+album_manager = registry.manager('album')
+appstore_manager = registry.manager('appstore')
+card_manager = registry.manager('card')
+chat_manager = registry.manager('chat')
+chat_message_manager = registry.manager('chat_message')
+comment_manager = registry.manager('comment')
+feed_manager = registry.manager('feed')
+follower_manager = registry.manager('follower')
+post_manager = registry.manager('post')
+user_manager = registry.manager('user')
 
 dispatch = DynamoDispatch()
 register = dispatch.register
@@ -77,6 +75,7 @@ register(
     ['INSERT', 'MODIFY', 'REMOVE'],
     user_manager.sync_chats_with_unviewed_messages_count,
     {'messagesUnviewedCount': 0},
+    coalesce=True,
 )
 register('chat', 'member', ['REMOVE'], user_manager.on_chat_member_delete_update_chat_count)
 register('chat', 'view', ['INSERT', 'MODIFY'], chat_manager.sync_member_messages_unviewed_count, {'viewCount': 0})
@@ -88,14 +87,13 @@ register('chatMessage', '-', ['REMOVE'], user_manager.sync_chat_message_deletion
 register('chatMessage', 'flag', ['INSERT'], chat_message_manager.on_flag_add)
 register('chatMessage', 'flag', ['REMOVE'], chat_message_manager.on_flag_delete)
 register('comment', '-', ['INSERT'], post_manager.on_comment_add)
-register('comment', '-', ['INSERT'], user_manager.on_comment_add)
+register('comment', '-', ['INSERT', 'REMOVE'], user_manager.on_comments_change_sync_counts, batch=True)
 register(
     'comment', '-', ['INSERT', 'MODIFY'], card_manager.on_comment_text_tags_change_update_card, {'textTags': []},
 )
 register('comment', '-', ['REMOVE'], card_manager.on_comment_delete_delete_cards)
 register('comment', '-', ['REMOVE'], comment_manager.on_item_delete_delete_flags)
 register('comment', '-', ['REMOVE'], post_manager.on_comment_delete)
-register('comment', '-', ['REMOVE'], user_manager.on_comment_delete)
 register('comment', 'flag', ['INSERT'], comment_manager.on_flag_add)
 register('comment', 'flag', ['REMOVE'], comment_manager.on_flag_delete)
 register(
@@ -104,6 +102,7 @@ register(
     ['INSERT', 'MODIFY'],
     card_manager.on_post_comments_unviewed_count_change_update_card,
     {'commentsUnviewedCount': 0},
+    coalesce=True,
 )
 register(
     'post',
@@ -111,6 +110,7 @@ register(
     ['INSERT', 'MODIFY'],
     card_manager.on_post_likes_count_change_update_card,
     {'anonymousLikeCount': 0, 'onymousLikeCount': 0},
+    coalesce=True,
 )
 register(
     'post',
@@ -133,8 +133,9 @@ register(
     'post',
     '-',
     ['INSERT', 'MODIFY', 'REMOVE'],
-    feed_manager.on_post_status_change_sync_feed,
+    feed_manager.on_posts_status_change_sync_feeds,
     {'postStatus': None},
+    batch=True,
 )
 register(
     'post',
@@ -157,10 +158,14 @@ register(
 )
 register('post', 'flag', ['INSERT'], post_manager.on_flag_add)
 register('post', 'flag', ['REMOVE'], post_manager.on_flag_delete)
-register('post', 'like', ['INSERT'], post_manager.on_like_add)
-register('post', 'like', ['REMOVE'], post_manager.on_like_delete)
+register('post', 'like', ['INSERT', 'REMOVE'], post_manager.on_likes_change_sync_counts, batch=True)
 register(
-    'post', 'view', ['INSERT', 'MODIFY'], card_manager.on_post_view_count_change_update_cards, {'viewCount': 0},
+    'post',
+    'view',
+    ['INSERT', 'MODIFY'],
+    card_manager.on_posts_view_count_change_update_cards,
+    {'viewCount': 0},
+    batch=True,
 )
 register(
     'post', 'view', ['INSERT', 'MODIFY'], post_manager.on_post_view_count_change_update_counts, {'viewCount': 0},
@@ -267,29 +272,121 @@ register('user', 'profile', ['REMOVE'], comment_manager.on_user_delete_delete_fl
 register('user', 'profile', ['REMOVE'], post_manager.on_user_delete_delete_flags)
 register('user', 'profile', ['REMOVE'], user_manager.on_user_delete)
 
+dispatch.compile()
+
+
+def process_record(record, progress, metrics):
+    """
+    Run the per-record listeners that match a stream record and have not already completed on it in an earlier
+    attempt at the batch, timing them in `metrics`. Errors are logged and the record marked as failed, not raised.
+    Returns a list of (func, sequence_number, event_name, (pk, sk), (item_id, old_item, new_item)) for the
+    matching batch and coalesced listeners, which are called once the whole batch has been processed.
+    """
+    name = record['eventName']
+    sequence_number = record['dynamodb']['SequenceNumber']
+    pk = deserialize(record['dynamodb']['Keys']['partitionKey'])
+    sk = deserialize(record['dynamodb']['Keys']['sortKey'])
+
+    # we still have some pks in an old (& deprecated) format with more than one item_id in the pk
+    pk_prefix, item_id = pk.split('/')[:2]
+    sk_prefix = sk.split('/')[0]
+
+    if not dispatch.has_listeners(pk_prefix, sk_prefix, name):
+        return []
+
+    with LogLevelContext(logger, logging.INFO):
+        logger.info(f'{name}: `{pk}` / `{sk}` starting processing')
+
+    # images are only deserialized as far as needed to find listeners, and fully only if there are any
+    old_image = LazyImage(record['dynamodb'].get('OldImage', {}))
+    new_image = LazyImage(record['dynamodb'].get('NewImage', {}))
+    funcs = [
+        func
+        for func in dispatch.search(pk_prefix, sk_prefix, name, old_image, new_image)
+        if not progress.is_completed(sequence_number, func)
+    ]
+    if not funcs:
+        return []
+
+    item_kwargs = {k: v.to_dict() for k, v in {'new_item': new_image, 'old_item': old_image}.items() if v}
+    deferred_calls = []
+    for func in funcs:
+        if dispatch.is_batch(func) or dispatch.is_coalesced(func):
+            listener_record = (item_id, item_kwargs.get('old_item'), item_kwargs.get('new_item'))
+            deferred_calls.append((func, sequence_number, name, (pk, sk), listener_record))
+            continue
+        with LogLevelContext(logger, logging.INFO):
+            logger.info(f'{name}: `{pk}` / `{sk}` running: {func}')
+        try:
+            with metrics.listener(func, name, pk=pk, sk=sk), clients['dynamo'].counter_call():
+                func(item_id, **item_kwargs)
+        except Exception as err:
+            logger.exception(str(err))
+            progress.fail(sequence_number)
+        else:
+            progress.complete(sequence_number, func)
+    return deferred_calls
+
 
 @handler_logging
 def process_records(event, context):
-    for record in event['Records']:
+    records = event['Records']
+    progress = StreamBatchProgress(clients['dynamo'], records)
+    progress.load()
+    metrics = ListenerMetrics()
 
-        name = record['eventName']
-        pk = deserialize(record['dynamodb']['Keys']['partitionKey'])
-        sk = deserialize(record['dynamodb']['Keys']['sortKey'])
-        old_item = {k: deserialize(v) for k, v in record['dynamodb'].get('OldImage', {}).items()}
-        new_item = {k: deserialize(v) for k, v in record['dynamodb'].get('NewImage', {}).items()}
+    # counter updates are coalesced across the batch and written when it completes,
+    # except for those of listener calls that fail, as their records are retried
+    with clients['dynamo'].counter_batch():
+        process = functools.partial(process_record, progress=progress, metrics=metrics)
+        if DYNAMO_STREAM_CONCURRENCY > 1 and len(records) > 1:
+            results = process_in_lanes(records, process, DYNAMO_STREAM_CONCURRENCY)
+        else:
+            results = map(process, records)
 
-        with LogLevelContext(logger, logging.INFO):
-            logger.info(f'{name}: `{pk}` / `{sk}` starting processing')
+        # {handler: [(sequence_number, (item_id, old_item, new_item)), ...]} for batch listeners
+        batches = {}
+        coalesced_calls = []
+        for deferred_calls in results:
+            for func, sequence_number, name, record_key, listener_record in deferred_calls:
+                if dispatch.is_batch(func):
+                    batches.setdefault(func, []).append((sequence_number, listener_record))
+                else:
+                    coalesced_calls.append((func, sequence_number, name, record_key, listener_record))
 
-        # we still have some pks in an old (& deprecated) format with more than one item_id in the pk
-        pk_prefix, item_id = pk.split('/')[:2]
-        sk_prefix = sk.split('/')[0]
+        # hot items get many MODIFY records in a batch, state-based listeners only need to see the net change
+        for func, sequence_numbers, name, (pk, sk), (item_id, old_item, new_item) in coalesce_calls(
+            coalesced_calls
+        ):
+            item_kwargs = {k: v for k, v in {'new_item': new_item, 'old_item': old_item}.items() if v}
+            with LogLevelContext(logger, logging.INFO):
+                logger.info(f'{name}: `{pk}` / `{sk}` running for {len(sequence_numbers)} records: {func}')
+            try:
+                with metrics.listener(func, name, pk=pk, sk=sk), clients['dynamo'].counter_call():
+                    func(item_id, **item_kwargs)
+            except Exception as err:
+                logger.exception(str(err))
+                for sequence_number in sequence_numbers:
+                    progress.fail(sequence_number)
+            else:
+                for sequence_number in sequence_numbers:
+                    progress.complete(sequence_number, func)
 
-        item_kwargs = {k: v for k, v in {'new_item': new_item, 'old_item': old_item}.items() if v}
-        for func in dispatch.search(pk_prefix, sk_prefix, name, old_item, new_item):
+        for func, batch in batches.items():
             with LogLevelContext(logger, logging.INFO):
-                logger.info(f'{name}: `{pk}` / `{sk}` running: {func}')
+                logger.info(f'{len(batch)} records running: {func}')
             try:
-                func(item_id, **item_kwargs)
+                with metrics.listener(func, 'BATCH'), clients['dynamo'].counter_call():
+                    func([batch_record for _, batch_record in batch])
             except Exception as err:
                 logger.exception(str(err))
+                for sequence_number, _ in batch:
+                    progress.fail(sequence_number)
+            else:
+                for sequence_number, _ in batch:
+                    progress.complete(sequence_number, func)
+
+    metrics.emit(logger)
+
+    # only the failed records, and those after them in the stream, are retried
+    return {'batchItemFailures': progress.save()}
@@ -0,0 +1,50 @@
+from collections.abc import Mapping
+
+from boto3.dynamodb.types import DYNAMODB_CONTEXT, TypeDeserializer
+
+# https://stackoverflow.com/a/46738251
+type_deserialize = TypeDeserializer().deserialize
+
+
+def deserialize(value):
+    "Deserialize a typed dynamo value, with a fast path for the common scalar types"
+    if 'S' in value:
+        return value['S']
+    if 'N' in value:
+        return DYNAMODB_CONTEXT.create_decimal(value['N'])
+    if 'BOOL' in value:
+        return value['BOOL']
+    if 'NULL' in value:
+        return None
+    return type_deserialize(value)
+
+
+class LazyImage(Mapping):
+    """
+    A read-only view of an OldImage or NewImage from a dynamo stream record that
+    deserializes each attribute on first access, rather than all attributes up front.
+    """
+
+    def __init__(self, typed_image):
+        self.typed_image = typed_image
+        self.values = {}
+
+    def __getitem__(self, name):
+        try:
+            return self.values[name]
+        except KeyError:
+            value = self.values[name] = deserialize(self.typed_image[name])
+            return value
+
+    def __iter__(self):
+        return iter(self.typed_image)
+
+    def __len__(self):
+        return len(self.typed_image)
+
+    def __contains__(self, name):
+        return name in self.typed_image
+
+    def to_dict(self):
+        "Deserialize any remaining attributes and return the image as a plain dict"
+        return {name: self[name] for name in self.typed_image}
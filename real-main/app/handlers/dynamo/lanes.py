@@ -0,0 +1,55 @@
+import functools
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from app.utils import gather
+
+# lanes get a pool of their own, so the shared one stays free for the reads of the listeners they run
+_executor = None
+_executor_concurrency = None
+_executor_lock = threading.Lock()
+
+
+def get_executor(concurrency):
+    "A thread pool for `concurrency` lanes, the first of which runs in the calling thread"
+    global _executor, _executor_concurrency
+    with _executor_lock:
+        if _executor_concurrency != concurrency:
+            if _executor is not None:
+                _executor.shutdown(wait=False)
+            _executor = ThreadPoolExecutor(max_workers=max(concurrency - 1, 1), thread_name_prefix='lane')
+            _executor_concurrency = concurrency
+    return _executor
+
+
+def partition_lanes(records, concurrency):
+    """
+    Partition stream records into up to `concurrency` lanes of (idx, record), by partition key.
+    All records with the same partition key go to the same lane, in stream order.
+    """
+    groups = {}
+    for idx, record in enumerate(records):
+        groups.setdefault(record['dynamodb']['Keys']['partitionKey']['S'], []).append((idx, record))
+
+    # biggest groups first, each to the lane with the fewest records so far
+    lanes = [[] for _ in range(min(concurrency, len(groups)))]
+    for group in sorted(groups.values(), key=len, reverse=True):
+        min(lanes, key=len).extend(group)
+    return lanes
+
+
+def process_in_lanes(records, process_record, concurrency):
+    """
+    Call `process_record(record)` for each of the stream records, with the lanes of partition_lanes()
+    processed concurrently. As each lane is processed sequentially, the ordering of changes to any one item
+    is kept just as when processing serially. Returns the results, in stream order.
+    """
+    results = [None] * len(records)
+
+    def process_lane(lane):
+        for idx, record in lane:
+            results[idx] = process_record(record)
+
+    lanes = partition_lanes(records, concurrency)
+    gather(*(functools.partial(process_lane, lane) for lane in lanes), executor=get_executor(concurrency))
+    return results
@@ -0,0 +1,213 @@
+import contextlib
+import contextvars
+import functools
+import heapq
+import itertools
+import json
+import logging
+import sys
+import threading
+import time
+
+from app.logging import LogLevelContext
+
+from .progress import listener_name
+
+SERVICES = ('dynamo', 'appsync', 'elasticsearch', 'pinpoint', 's3')
+
+# EMF documents go to stdout as bare json lines, where lambda picks them up, apart from the formatted log lines
+emf_logger = logging.getLogger('emf')
+emf_logger.setLevel(logging.INFO)
+emf_logger.propagate = False
+_emf_handler = logging.StreamHandler(sys.stdout)
+_emf_handler.setFormatter(logging.Formatter('%(message)s'))
+emf_logger.addHandler(_emf_handler)
+
+# the downstream calls counted for the listener running in the current context
+_call_counts = contextvars.ContextVar('call_counts', default=None)
+_call_counts_lock = threading.Lock()
+
+
+def instrument(clients):
+    "Hook the downstream clients of a {name: client} dict, as passed to the managers, to count their calls"
+    for name, client in clients.items():
+        instrument_client(name, client)
+
+
+def instrument_client(name, client):
+    if name in ('dynamo', 'dynamo_feed'):
+        # on the clients of the Table resources of all threads too
+        client.register_event('before-call', functools.partial(_on_before_call, 'dynamo'))
+    elif name == 'appsync':
+        count_method_calls(client, 'appsync', ['send'])
+    elif name == 'elasticsearch':
+        count_method_calls(client, 'elasticsearch', ['query_users', 'put_user', 'delete_user'])
+    elif name == 'pinpoint':
+        count_boto3_calls(client.client, 'pinpoint')
+    elif name.startswith('s3'):
+        count_boto3_calls(client.boto_client, 's3')
+        count_boto3_calls(client.s3.meta.client, 's3')
+
+
+def count_boto3_calls(boto3_client, service):
+    boto3_client.meta.events.register('before-call', functools.partial(_on_before_call, service))
+
+
+def _on_before_call(service, **kwargs):
+    count_call(service)
+
+
+def count_method_calls(client, service, method_names):
+    "For clients that don't go through boto3, count calls to the given methods of the client instance"
+
+    def counted(method):
+        @functools.wraps(method)
+        def wrapper(*args, **kwargs):
+            count_call(service)
+            return method(*args, **kwargs)
+
+        return wrapper
+
+    for method_name in method_names:
+        setattr(client, method_name, counted(getattr(client, method_name)))
+
+
+def count_call(service):
+    "Count a downstream call against the listener running in the current context, if any"
+    counts = _call_counts.get()
+    if counts is not None:
+        # a listener's calls may be made from several threads, see gather()
+        with _call_counts_lock:
+            counts[service] += 1
+
+
+class ListenerMetrics:
+    """
+    Latency and downstream call counts of the stream listeners, aggregated per (listener, event name)
+    over a single invocation, along with the slowest listener calls and the records they were called for.
+
+    Downstream calls are counted by the client hooks of `instrument()`, and attributed to the listener
+    running in the current context, which `gather()` carries over to its pool threads.
+    """
+
+    namespace = 'REAL/DynamoStream'
+    metric_names = {
+        'dynamo': 'DynamoCalls',
+        'appsync': 'AppSyncCalls',
+        'elasticsearch': 'ElasticSearchCalls',
+        'pinpoint': 'PinpointCalls',
+        's3': 'S3Calls',
+    }
+    slowest_count = 5
+
+    def __init__(self):
+        # {(listener, event_name): {'calls': ..., 'errors': ..., 'durationMs': ..., 'maxDurationMs': ..., **counts}}
+        self.stats = {}
+        # min-heap of the slowest calls, (duration_ms, tiebreaker, {...})
+        self.slowest = []
+        self.tiebreaker = itertools.count()
+        self.lock = threading.Lock()
+
+    @contextlib.contextmanager
+    def listener(self, func, event_name, pk=None, sk=None):
+        "Time the listener call made within this context, and count its downstream calls"
+        counts = dict.fromkeys(SERVICES, 0)
+        token = _call_counts.set(counts)
+        error = False
+        start = time.perf_counter()
+        try:
+            yield counts
+        except Exception:
+            error = True
+            raise
+        finally:
+            duration_ms = (time.perf_counter() - start) * 1000
+            _call_counts.reset(token)
+            self.record(listener_name(func), event_name, duration_ms, counts, error=error, pk=pk, sk=sk)
+
+    def record(self, listener, event_name, duration_ms, counts, error=False, pk=None, sk=None):
+        with self.lock:
+            stats = self.stats.get((listener, event_name))
+            if stats is None:
+                stats = self.stats[(listener, event_name)] = {
+                    'calls': 0,
+                    'errors': 0,
+                    'durationMs': 0,
+                    'maxDurationMs': 0,
+                    **dict.fromkeys(SERVICES, 0),
+                }
+            stats['calls'] += 1
+            stats['errors'] += int(error)
+            stats['durationMs'] += duration_ms
+            stats['maxDurationMs'] = max(stats['maxDurationMs'], duration_ms)
+            for service, count in counts.items():
+                stats[service] += count
+
+            slow = {'listener': listener, 'eventName': event_name, 'pk': pk, 'sk': sk}
+            entry = (duration_ms, next(self.tiebreaker), slow)
+            if len(self.slowest) < self.slowest_count:
+                heapq.heappush(self.slowest, entry)
+            elif duration_ms > self.slowest[0][0]:
+                heapq.heapreplace(self.slowest, entry)
+
+    def summary(self):
+        "A compact summary of the invocation, suitable for a structured log line"
+        return {
+            'listeners': [
+                {'listener': listener, 'eventName': event_name, **self.rounded(stats)}
+                for (listener, event_name), stats in sorted(
+                    self.stats.items(), key=lambda kv: kv[1]['durationMs'], reverse=True
+                )
+            ],
+            'slowest': [
+                {**slow, 'durationMs': round(duration_ms, 1)}
+                for duration_ms, _, slow in sorted(self.slowest, key=lambda entry: entry[0], reverse=True)
+            ],
+        }
+
+    def emf_documents(self, timestamp_ms=None):
+        "CloudWatch embedded metric format documents, one per (listener, event name)"
+        timestamp_ms = timestamp_ms or int(time.time() * 1000)
+        metrics = [
+            {'Name': 'Calls', 'Unit': 'Count'},
+            {'Name': 'Errors', 'Unit': 'Count'},
+            {'Name': 'Duration', 'Unit': 'Milliseconds'},
+            {'Name': 'MaxDuration', 'Unit': 'Milliseconds'},
+            *({'Name': self.metric_names[service], 'Unit': 'Count'} for service in SERVICES),
+        ]
+        for (listener, event_name), stats in self.stats.items():
+            stats = self.rounded(stats)
+            yield {
+                '_aws': {
+                    'Timestamp': timestamp_ms,
+                    'CloudWatchMetrics': [
+                        {
+                            'Namespace': self.namespace,
+                            'Dimensions': [['Listener', 'EventName']],
+                            'Metrics': metrics,
+                        }
+                    ],
+                },
+                'Listener': listener,
+                'EventName': event_name,
+                'Calls': stats['calls'],
+                'Errors': stats['errors'],
+                'Duration': stats['durationMs'],
+                'MaxDuration': stats['maxDurationMs'],
+                **{self.metric_names[service]: stats[service] for service in SERVICES},
+            }
+
+    def emit(self, logger):
+        """
+        Emit the metrics as EMF documents, through `emf_logger`, and the summary as a log line.
+        """
+        if not self.stats:
+            return
+        for document in self.emf_documents():
+            emf_logger.info(json.dumps(document))
+        with LogLevelContext(logger, logging.INFO):
+            logger.info(f'Listener metrics: {json.dumps(self.summary())}')
+
+    @staticmethod
+    def rounded(stats):
+        return {k: round(v, 1) if k in ('durationMs', 'maxDurationMs') else v for k, v in stats.items()}
@@ -0,0 +1,87 @@
+import logging
+
+import pendulum
+
+logger = logging.getLogger()
+
+# lambda stops retrying once a record leaves the stream, after 24 hours, so a marker is of no use after that
+MARKER_LIFETIME = pendulum.duration(days=2)
+
+
+def listener_name(func):
+    "A name for a listener that is stable across invocations, to record that it has completed on a record"
+    owner = getattr(func, '__self__', None)
+    if owner is not None:
+        # listeners defined on mixins are shared by several managers
+        return f'{type(owner).__name__}.{func.__name__}'
+    return func.__qualname__
+
+
+class StreamBatchProgress:
+    """
+    Tracks which listeners have completed on, and which of, the records of a stream batch have failed.
+
+    Failed records are reported back to lambda as `batchItemFailures` (ReportBatchItemFailures), after which
+    the stream is retried from the first failed record on. Records after that one are re-delivered even if they
+    succeeded, so the listeners that completed on them are saved in a marker item keyed by the sequence number
+    of the first failed record. The retry starts at that same record, finds the marker, and skips those listeners.
+    """
+
+    def __init__(self, dynamo_client, records):
+        self.dynamo_client = dynamo_client
+        self.sequence_numbers = [record['dynamodb']['SequenceNumber'] for record in records]
+        self.completed = {sequence_number: set() for sequence_number in self.sequence_numbers}
+        self.failed = set()
+        self.marker = None
+
+    def pk(self, sequence_number):
+        return {'partitionKey': f'streamProgress/{sequence_number}', 'sortKey': '-'}
+
+    def load(self):
+        "Load the listeners that completed in an earlier attempt at this batch, if this is a retry"
+        if not self.sequence_numbers:
+            return
+        self.marker = self.dynamo_client.get_item(self.pk(self.sequence_numbers[0]), ConsistentRead=True)
+        for sequence_number, names in (self.marker or {}).get('completedListeners', {}).items():
+            if sequence_number in self.completed:
+                self.completed[sequence_number].update(names)
+
+    def is_completed(self, sequence_number, func):
+        return listener_name(func) in self.completed[sequence_number]
+
+    def complete(self, sequence_number, func):
+        self.completed[sequence_number].add(listener_name(func))
+
+    def fail(self, sequence_number):
+        self.failed.add(sequence_number)
+
+    def save(self):
+        """
+        Save a marker for the records that will be re-delivered, and delete any marker this attempt consumed.
+        Returns the `batchItemFailures` for the lambda response.
+        """
+        failed = [sequence_number for sequence_number in self.sequence_numbers if sequence_number in self.failed]
+        marker_pk = None
+        if failed:
+            redelivered = self.sequence_numbers[self.sequence_numbers.index(failed[0]) :]
+            marker_pk = self.pk(failed[0])
+            completed = {
+                sequence_number: sorted(self.completed[sequence_number])
+                for sequence_number in redelivered
+                if self.completed[sequence_number]
+            }
+            try:
+                # expired by the table's TTL, in case the retry never comes
+                expires_at = (pendulum.now('utc') + MARKER_LIFETIME).int_timestamp
+                self.dynamo_client.put_item(
+                    {**marker_pk, 'completedListeners': completed, 'ttlExpiresAt': expires_at}
+                )
+            except Exception as err:
+                # the retry will re-run listeners that completed, as it would have without the marker
+                logger.exception(f'Failed to save stream progress marker: {err}')
+        if self.marker and self.marker['partitionKey'] != (marker_pk or {}).get('partitionKey'):
+            try:
+                self.dynamo_client.delete_item(self.pk(self.sequence_numbers[0]))
+            except Exception as err:
+                logger.exception(f'Failed to delete stream progress marker: {err}')
+        return [{'itemIdentifier': sequence_number} for sequence_number in failed]
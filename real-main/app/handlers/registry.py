@@ -0,0 +1,124 @@
+"""
+Clients and managers for the handler modules, created on first use rather than at import time,
+so a cold start only pays for what the invocation actually touches.
+"""
+import os
+import threading
+
+from app import clients, models
+
+DYNAMO_FEED_TABLE = os.environ.get('DYNAMO_FEED_TABLE')
+S3_PLACEHOLDER_PHOTOS_BUCKET = os.environ.get('S3_PLACEHOLDER_PHOTOS_BUCKET')
+S3_UPLOADS_BUCKET = os.environ.get('S3_UPLOADS_BUCKET')
+WORK_QUEUE_URL = os.environ.get('WORK_QUEUE_URL')
+
+# client name -> function that creates it. Classes are looked up on `app.clients` at creation time.
+client_factories = {
+    'apple': lambda: clients.AppleClient(),
+    'appstore': lambda: clients.AppStoreClient(),
+    'appsync': lambda: clients.AppSyncClient(),
+    'cloudfront': lambda: clients.CloudFrontClient(get_client('secrets_manager').get_cloudfront_key_pair),
+    'cognito': lambda: clients.CognitoClient(),
+    'dynamo': lambda: clients.DynamoClient(),
+    'dynamo_feed': lambda: clients.DynamoClient(table_name=DYNAMO_FEED_TABLE),
+    'elasticsearch': lambda: clients.ElasticSearchClient(),
+    'facebook': lambda: clients.FacebookClient(),
+    'google': lambda: clients.GoogleClient(get_client('secrets_manager').get_google_client_ids),
+    'mediaconvert': lambda: clients.MediaConvertClient(),
+    'pinpoint': lambda: clients.PinpointClient(),
+    'post_verification': lambda: clients.PostVerificationClient(
+        get_client('secrets_manager').get_post_verification_api_creds
+    ),
+    's3_placeholder_photos': lambda: clients.S3Client(S3_PLACEHOLDER_PHOTOS_BUCKET),
+    's3_uploads': lambda: clients.S3Client(S3_UPLOADS_BUCKET),
+    'secrets_manager': lambda: clients.SecretsManagerClient(),
+    # without a queue, tasks are worked to completion in the process that sends them
+    'work_queue': lambda: (
+        clients.WorkQueueClient(get_client('dynamo'), queue_url=WORK_QUEUE_URL)
+        if WORK_QUEUE_URL
+        else clients.LocalWorkQueueClient()
+    ),
+}
+
+# manager name, as the managers register themselves in the shared hash table -> class
+manager_classes = {
+    'album': models.AlbumManager,
+    'appstore': models.AppStoreManager,
+    'block': models.BlockManager,
+    'card': models.CardManager,
+    'chat': models.ChatManager,
+    'chat_message': models.ChatMessageManager,
+    'comment': models.CommentManager,
+    'feed': models.FeedManager,
+    'follower': models.FollowerManager,
+    'like': models.LikeManager,
+    'post': models.PostManager,
+    'user': models.UserManager,
+}
+
+# clients are shared by all handler modules loaded in the process
+_clients = {}
+_clients_lock = threading.RLock()
+# called as `func(name, client)` upon creation of each client
+_client_created_callbacks = []
+
+
+def get_client(name):
+    "The client of the given name, created if it doesn't exist yet"
+    if name not in _clients:
+        with _clients_lock:
+            if name not in _clients:
+                client = client_factories[name]()
+                for callback in _client_created_callbacks:
+                    callback(name, client)
+                _clients[name] = client
+    return _clients[name]
+
+
+def on_client_created(callback):
+    "Call `callback(name, client)` for each client created from now on"
+    _client_created_callbacks.append(callback)
+
+
+class Lazy:
+    "Stands in for the object returned by `factory()`, which is called upon first access to an attribute"
+
+    def __init__(self, factory):
+        object.__setattr__(self, '_factory', factory)
+
+    def __getattr__(self, name):
+        # only called for attributes not found on the proxy itself
+        return getattr(self._factory(), name)
+
+    def __setattr__(self, name, value):
+        setattr(self._factory(), name, value)
+
+
+class Registry:
+    """
+    The clients and managers of a handler module.
+
+    `clients` is a {name: client} dict, as the managers take, limited to the given client names.
+    Its values are proxies, so the clients themselves are only created once they are used.
+    Likewise `manager(name)` returns a proxy for a manager that is only created once it is used.
+    """
+
+    def __init__(self, client_names):
+        unknown = set(client_names) - set(client_factories)
+        assert not unknown, f'Unknown clients: `{unknown}`'
+        self.clients = {name: Lazy(lambda name=name: get_client(name)) for name in client_names}
+        # shared hash table of all managers, enables inter-manager communication
+        self.managers = {}
+        self.managers_lock = threading.RLock()
+
+    def get_manager(self, name):
+        if name not in self.managers:
+            with self.managers_lock:
+                # managers add themselves, and any other managers they create, to the table
+                if name not in self.managers:
+                    manager_classes[name](self.clients, managers=self.managers)
+        return self.managers[name]
+
+    def manager(self, name):
+        assert name in manager_classes, f'Unknown manager: `{name}`'
+        return Lazy(lambda: self.get_manager(name))
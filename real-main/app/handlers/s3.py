@@ -1,31 +1,31 @@
 import logging
-import os
 import urllib
 
-from app import clients, models
 from app.logging import LogLevelContext, handler_logging
 from app.models.post.enums import PostStatus, PostType
 from app.models.post.exceptions import PostException
 
-from . import xray
-
-S3_UPLOADS_BUCKET = os.environ.get('S3_UPLOADS_BUCKET')
+from . import warmup, xray
+from .registry import Registry
 
 logger = logging.getLogger()
 xray.patch_all()
 
-secrets_manager_client = clients.SecretsManagerClient()
-clients = {
-    'appsync': clients.AppSyncClient(),
-    'cloudfront': clients.CloudFrontClient(secrets_manager_client.get_cloudfront_key_pair),
-    'dynamo': clients.DynamoClient(),
-    'mediaconvert': clients.MediaConvertClient(),
-    'post_verification': clients.PostVerificationClient(secrets_manager_client.get_post_verification_api_creds),
-    's3_uploads': clients.S3Client(S3_UPLOADS_BUCKET),
-}
+registry = Registry(['appsync', 'cloudfront', 'dynamo', 'mediaconvert', 'post_verification', 's3_uploads'])
+clients = registry.clients
+managers = registry.managers
+post_manager = registry.manager('post')
 
-managers = {}
-post_manager = managers.get('post') or models.PostManager(clients, managers=managers)
+# image processing and video transcoding setup, done ahead of the first upload when warming up
+WARMUP_STEPS = [
+    'cloudfront_key',
+    'dynamo_connection',
+    's3_connection',
+    'image_libraries',
+    'text_image_font',
+    'mediaconvert_endpoint',
+]
+warmup.prime_on_init(WARMUP_STEPS)
 
 
 def event_to_extras(event):
@@ -35,6 +35,7 @@ def event_to_extras(event):
     return {'s3_key': path}
 
 
+@warmup.handle_warmup(WARMUP_STEPS)
 @handler_logging(event_to_extras=event_to_extras)
 def image_post_uploaded(event, context):
     # we suppress INFO logging, except this message
@@ -78,6 +79,7 @@ def image_post_uploaded(event, context):
         logger.warning(str(err))
 
 
+@warmup.handle_warmup(WARMUP_STEPS)
 @handler_logging(event_to_extras=event_to_extras)
 def video_post_uploaded(event, context):
     # we suppress INFO logging, except this message
@@ -112,6 +114,7 @@ def video_post_uploaded(event, context):
         logger.warning(str(err))
 
 
+@warmup.handle_warmup(WARMUP_STEPS)
 @handler_logging(event_to_extras=event_to_extras)
 def video_post_processed(event, context):
     # we suppress INFO logging, except this message
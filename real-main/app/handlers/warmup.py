@@ -0,0 +1,119 @@
+"""
+Priming of a lambda execution environment, so the first real invocation after a cold start costs
+the same as any other. One-time costs (secrets, endpoint discovery, TLS handshakes, image library
+initialization) are paid eagerly, either on init under provisioned concurrency or upon a warm-up event.
+"""
+import functools
+import logging
+import os
+import time
+
+from app.logging import LogLevelContext
+
+from .registry import get_client
+
+# lambda sets this to 'provisioned-concurrency' when initializing an environment ahead of any invocation
+PROVISIONED_CONCURRENCY = os.environ.get('AWS_LAMBDA_INITIALIZATION_TYPE') == 'provisioned-concurrency'
+# as sent by serverless-plugin-warmup
+WARMUP_EVENT_SOURCE = 'serverless-plugin-warmup'
+
+logger = logging.getLogger()
+
+
+def prime_cloudfront_key():
+    "Fetch the key pair from secrets manager and parse the private key, as signing urls requires"
+    get_client('cloudfront').get_private_key()
+
+
+def prime_image_libraries():
+    "Import the image libraries and have PIL register its file format plugins"
+    import colorthief  # noqa: F401
+    import PIL.Image
+    import PIL.ImageOps  # noqa: F401
+    import pyheif  # noqa: F401
+
+    PIL.Image.init()
+
+
+def prime_text_image_font():
+    "Read the font file text posts are rendered in, and have FreeType load it"
+    from app.models.post.text_image import load_font
+
+    load_font(10)
+
+
+def prime_mediaconvert_endpoint():
+    # the account's endpoint is discovered upon first use of the boto client
+    get_client('mediaconvert').boto_client
+
+
+def prime_dynamo_connection():
+    # a read of a key that doesn't exist, through both the boto3 client and the table resource
+    dynamo_client = get_client('dynamo')
+    dynamo_client.table.get_item(Key={'partitionKey': 'warmup', 'sortKey': '-'})
+    dynamo_client.get_typed_item({'partitionKey': {'S': 'warmup'}, 'sortKey': {'S': '-'}})
+
+
+def prime_s3_connection():
+    get_client('s3_uploads').exists('warmup')
+
+
+# step name -> function that does it
+steps = {
+    'cloudfront_key': prime_cloudfront_key,
+    'image_libraries': prime_image_libraries,
+    'text_image_font': prime_text_image_font,
+    'mediaconvert_endpoint': prime_mediaconvert_endpoint,
+    'dynamo_connection': prime_dynamo_connection,
+    's3_connection': prime_s3_connection,
+}
+
+
+def prime(step_names):
+    """
+    Run the given priming steps, in order, and return a {step name: duration in ms} dict.
+    A failed step is logged and has a duration of None, priming is best effort.
+    """
+    durations = {}
+    for name in step_names:
+        start = time.perf_counter()
+        try:
+            steps[name]()
+        except Exception as err:
+            logger.warning(f'Warm-up step `{name}` failed: {err}')
+            durations[name] = None
+        else:
+            durations[name] = round((time.perf_counter() - start) * 1000, 1)
+
+    # we suppress INFO logging, except this message
+    with LogLevelContext(logger, logging.INFO):
+        logger.info(f'Warmed up in {sum(d for d in durations.values() if d):.1f} ms: {durations}')
+    return durations
+
+
+def is_warmup_event(event):
+    return isinstance(event, dict) and event.get('source') == WARMUP_EVENT_SOURCE
+
+
+def prime_on_init(step_names):
+    "Prime with the given steps if this environment is being initialized for provisioned concurrency"
+    if PROVISIONED_CONCURRENCY:
+        prime(step_names)
+
+
+def handle_warmup(step_names):
+    """
+    Handler decorator that answers warm-up events by priming with the given steps, rather than calling the
+    handler. Goes above `handler_logging`, as warm-up events don't have the shape handlers expect.
+    """
+
+    def outer_wrapper(func):
+        @functools.wraps(func)
+        def inner_wrapper(event, context):
+            if is_warmup_event(event):
+                return prime(step_names)
+            return func(event, context)
+
+        return inner_wrapper
+
+    return outer_wrapper
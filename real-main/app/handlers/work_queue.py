@@ -0,0 +1,34 @@
+import logging
+import os
+import time
+
+from app.logging import handler_logging
+
+from . import xray
+from .registry import Registry
+
+# tasks are worked in slices of at most this long, after which any not yet done are continued later
+WORK_QUEUE_SLICE_SECONDS = float(os.environ.get('WORK_QUEUE_SLICE_SECONDS') or 30)
+# kept in reserve to send continuations before the lambda times out
+WORK_QUEUE_RESERVE_SECONDS = 5
+
+logger = logging.getLogger()
+xray.patch_all()
+
+registry = Registry(['appsync', 'dynamo', 'dynamo_feed', 's3_uploads', 'work_queue'])
+clients = registry.clients
+
+# managers register the tasks they work upon initialization, so they are created right away
+managers = registry.managers
+album_manager = registry.get_manager('album')
+feed_manager = registry.get_manager('feed')
+follower_manager = registry.get_manager('follower')
+post_manager = registry.get_manager('post')
+
+
+@handler_logging
+def process_tasks(event, context):
+    remaining_seconds = context.get_remaining_time_in_millis() / 1000 - WORK_QUEUE_RESERVE_SECONDS
+    deadline = time.monotonic() + min(remaining_seconds, WORK_QUEUE_SLICE_SECONDS)
+    failed_message_ids = clients['work_queue'].work_messages(event['Records'], deadline=deadline)
+    return {'batchItemFailures': [{'itemIdentifier': message_id} for message_id in failed_message_ids]}
@@ -1,3 +1,4 @@
+import contextvars
 import json
 import logging
 
@@ -44,18 +45,43 @@ def handler_logging(*args, event_to_extras=None):
         return outer_wrapper
 
 
+# {logger: level} set by the LogLevelContexts entered in the current context
+_level_overrides = contextvars.ContextVar('log_level_overrides', default={})
+
+
+def _use_level_overrides(logger):
+    "Have the logger check its level against any override set in the current context"
+    if getattr(logger, 'level_overrides', False):
+        return
+    is_enabled_for = logger.isEnabledFor
+
+    def is_enabled_for_override(level):
+        override = _level_overrides.get().get(logger)
+        if override is None:
+            return is_enabled_for(level)
+        return not logger.disabled and level > logger.manager.disable and level >= override
+
+    logger.isEnabledFor = is_enabled_for_override
+    logger.level_overrides = True
+
+
 # https://docs.python.org/3/howto/logging-cookbook.html#using-a-context-manager-for-selective-logging
 class LogLevelContext:
+    """
+    Sets the level of the logger for calls made within the block, by the current thread only, so contexts
+    entered from different threads may overlap. Child loggers keep their own level.
+    """
+
     def __init__(self, logger, level):
         self.logger = logger
         self.level = level
 
     def __enter__(self):
-        self.old_level = self.logger.level
-        self.logger.setLevel(self.level)
+        _use_level_overrides(self.logger)
+        self.token = _level_overrides.set({**_level_overrides.get(), self.logger: self.level})
 
     def __exit__(self, et, ev, tb):
-        self.logger.setLevel(self.old_level)
+        _level_overrides.reset(self.token)
 
 
 # https://github.com/python/cpython/blob/v3.8.3/Lib/logging/__init__.py#L510
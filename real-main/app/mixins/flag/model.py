@@ -1,5 +1,7 @@
 import logging
 
+from app.utils import gather
+
 from .exceptions import FlagException
 
 logger = logging.getLogger()
@@ -12,12 +14,17 @@ class FlagModelMixin:
             self.flag_dynamo = flag_dynamo
 
     def flag(self, user):
+        blocked, blocking = gather(
+            lambda: self.block_manager.is_blocked(self.user_id, user.id),
+            lambda: self.block_manager.is_blocked(user.id, self.user_id),
+        )
+
         # can't flag a model of a user that has blocked us
-        if self.block_manager.is_blocked(self.user_id, user.id):
+        if blocked:
             raise FlagException(f'User has been blocked by owner of {self.item_type} `{self.id}`')
 
         # can't flag a model of a user we have blocked
-        if self.block_manager.is_blocked(user.id, self.user_id):
+        if blocking:
             raise FlagException(f'User has blocked owner of {self.item_type} `{self.id}`')
 
         # cant flag our own model
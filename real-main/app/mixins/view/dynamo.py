@@ -29,16 +29,14 @@ class ViewDynamo:
                 Key('partitionKey').eq(pk['partitionKey']) & Key('sortKey').begins_with('view/')
             )
         }
-        gen = self.client.generate_all_query(query_kwargs)
-        if pks_only:
-            gen = ({'partitionKey': item['partitionKey'], 'sortKey': item['sortKey']} for item in gen)
-        return gen
+        projection = ('partitionKey', 'sortKey') if pks_only else None
+        return self.client.generate_all_query(query_kwargs, projection=projection)
 
     def delete_view(self, item_id, user_id):
         return self.client.delete_item(self.pk(item_id, user_id))
 
     def delete_views(self, view_pk_generator):
-        self.client.batch_delete_items(view_pk_generator)
+        self.client.batch_delete_items(view_pk_generator, parallel=True)
 
     def add_view(self, item_id, user_id, view_count, viewed_at):
         pk = self.pk(item_id, user_id)
@@ -3,6 +3,7 @@ import logging
 import pendulum
 
 from app import models
+from app.clients import LocalWorkQueueClient
 
 from .dynamo import AlbumDynamo
 from .model import Album
@@ -15,7 +16,7 @@ class AlbumManager:
     zero_post_lifetime = pendulum.duration(hours=24)
 
     def __init__(self, clients, managers=None):
-        managers = managers or {}
+        managers = {} if managers is None else managers
         managers['album'] = self
         self.post_manager = managers.get('post') or models.PostManager(clients, managers=managers)
         self.user_manager = managers.get('user') or models.UserManager(clients, managers=managers)
@@ -23,6 +24,8 @@ class AlbumManager:
         self.clients = clients
         if 'dynamo' in clients:
             self.dynamo = AlbumDynamo(clients['dynamo'])
+        self.work_queue_client = clients.get('work_queue') or LocalWorkQueueClient()
+        self.work_queue_client.register('album.update_art_if_needed', self.update_art_if_needed)
 
     def get_album(self, album_id):
         album_item = self.dynamo.get_album(album_id)
@@ -65,9 +68,15 @@ class AlbumManager:
         if new_count > 0 and 'gsiK1PartitionKey' in new_item:
             self.dynamo.clear_delete_at(album_id)
 
+    def update_art_if_needed(self, album_id, cursor=None):
+        "Work queue task. Update the art of the album, if it still exists and its posts call for it."
+        if album := self.get_album(album_id):
+            album.update_art_if_needed()
+
     def on_album_posts_last_updated_at_change_update_art_if_needed(self, album_id, new_item, old_item=None):
-        album = self.init_album(new_item)
-        album.update_art_if_needed()
+        # rendering the art is slow, so it's done on the work queue, in order with other changes to the album
+        task = {'name': 'album.update_art_if_needed', 'key': f'album/{album_id}', 'args': {'album_id': album_id}}
+        self.work_queue_client.send_tasks([task])
 
     def on_post_album_change_update_counts_and_timestamps(self, post_id, new_item=None, old_item=None):
         new_album_id = (new_item or {}).get('albumId')
@@ -4,11 +4,9 @@ import itertools
 import logging
 import os
 
-import PIL.Image
-
 from app.utils import image_size
+from app.utils.selection_set import is_selected, sub_selection
 
-from . import art
 from .exceptions import AlbumException
 
 logger = logging.getLogger()
@@ -48,9 +46,13 @@ class Album:
         self.item = self.dynamo.get_album(self.id, strongly_consistent=strongly_consistent)
         return self
 
-    def serialize(self, caller_user_id):
+    def serialize(self, caller_user_id, selection_set=None):
         resp = self.item.copy()
-        resp['ownedBy'] = self.user_manager.get_user(self.user_id).serialize(caller_user_id)
+        if is_selected(selection_set, 'ownedBy'):
+            user = self.user_manager.get_user(self.user_id)
+            resp['ownedBy'] = user.serialize(
+                caller_user_id, selection_set=sub_selection(selection_set, 'ownedBy')
+            )
         return resp
 
     def update(self, name=None, description=None):
@@ -83,6 +85,15 @@ class Album:
             return self.cloudfront_client.generate_presigned_url(art_image_path, ['GET', 'HEAD'])
         return f'https://{self.frontend_resources_domain}/default-album-art/{size.filename}'
 
+    def get_art_image_urls(self, sizes):
+        "Same as get_art_image_url() for many sizes, in one call"
+        art_hash = self.item.get('artHash')
+        if art_hash:
+            path_prefix = '/'.join([self.get_art_image_path_prefix(), art_hash])
+            filenames = [size.filename for size in sizes]
+            return self.cloudfront_client.generate_presigned_urls(path_prefix, filenames, ['GET', 'HEAD'])
+        return [self.get_art_image_url(size) for size in sizes]
+
     def get_art_image_path_prefix(self):
         return '/'.join([self.user_id, 'album', self.id])
 
@@ -120,12 +131,14 @@ class Album:
         if new_art_hash == old_art_hash:
             return self  # no changes
 
-        posts = [self.post_manager.get_post(post_id) for post_id in post_ids]
+        posts = self.post_manager.get_posts(post_ids)
         if len(posts) == 0:
             new_native_image = None
         elif len(posts) == 1:
             new_native_image = posts[0].k4_jpeg_cache.readonly_image
         else:
+            from . import art  # deferred, pulls in the image libraries
+
             images = [post.p1080_jpeg_cache.readonly_image for post in posts]
             new_native_image = art.generate_zoomed_grid(images)
 
@@ -155,6 +168,8 @@ class Album:
         self.s3_uploads_client.put_object(path, native_image_buf.read(), self.jpeg_content_type)
 
         # generate and save thumbnails
+        import PIL.Image  # deferred, as with `art` above
+
         native_image_buf.seek(0)
         image = PIL.Image.open(native_image_buf)
         for size in image_size.THUMBNAILS:  # ordered by decreasing size
@@ -8,7 +8,7 @@ logger = logging.getLogger()
 
 class AppStoreManager:
     def __init__(self, clients, managers=None):
-        managers = managers or {}
+        managers = {} if managers is None else managers
         managers['appstore'] = self
 
         self.clients = clients
@@ -11,7 +11,7 @@ logger = logging.getLogger()
 
 class BlockManager:
     def __init__(self, clients, managers=None):
-        managers = managers or {}
+        managers = {} if managers is None else managers
         managers['block'] = self
         self.chat_manager = managers.get('chat') or models.ChatManager(clients, managers=managers)
         self.follower_manager = managers.get('follower') or models.FollowerManager(clients, managers=managers)
@@ -20,6 +20,12 @@ class CardDynamo:
     def get_card(self, card_id, strongly_consistent=False):
         return self.client.get_item(self.pk(card_id), ConsistentRead=strongly_consistent)
 
+    def get_cards(self, card_ids):
+        return self.client.get_many(self.pk(card_id) for card_id in card_ids)
+
+    def generate_cards(self, card_id_generator):
+        return self.client.generate_many(self.pk(card_id) for card_id in card_id_generator)
+
     def add_card(
         self,
         card_id,
@@ -85,10 +91,8 @@ class CardDynamo:
             'ExpressionAttributeValues': {':pk': f'user/{user_id}', ':sk_prefix': 'card/'},
             'IndexName': 'GSI-A1',
         }
-        gen = self.client.generate_all_query(query_kwargs)
-        if pks_only:
-            gen = ({'partitionKey': item['partitionKey'], 'sortKey': item['sortKey']} for item in gen)
-        return gen
+        projection = ('partitionKey', 'sortKey') if pks_only else None
+        return self.client.generate_all_query(query_kwargs, projection=projection)
 
     def generate_card_keys_by_post(self, post_id, user_id=None):
         query_kwargs = {
@@ -17,7 +17,7 @@ logger = logging.getLogger()
 
 class CardManager:
     def __init__(self, clients, managers=None):
-        managers = managers or {}
+        managers = {} if managers is None else managers
         managers['card'] = self
         self.comment_manager = managers.get('comment') or models.CommentManager(clients, managers=managers)
         self.post_manager = managers.get('post') or models.PostManager(clients, managers=managers)
@@ -34,6 +34,21 @@ class CardManager:
         item = self.dynamo.get_card(card_id, strongly_consistent=strongly_consistent)
         return self.init_card(item) if item else None
 
+    def get_cards(self, card_ids, with_posts=False):
+        """
+        Get many cards in batch requests. Returned in the order of `card_ids`, with None for any DNE.
+        If `with_posts`, the posts of the cards are fetched in batch requests too.
+        """
+        items = self.dynamo.get_cards(card_ids)
+        cards = [self.init_card(item) if item else None for item in items]
+        if with_posts:
+            found = [card for card in cards if card]
+            post_ids = [card.post_id for card in found if card.post_id]
+            posts = dict(zip(post_ids, self.post_manager.get_posts(post_ids)))
+            for card in found:
+                card._post = posts.get(card.post_id)
+        return cards
+
     def init_card(self, item):
         kwargs = {
             'appsync': getattr(self, 'appsync', None),
@@ -73,7 +88,7 @@ class CardManager:
 
     def delete_by_post(self, post_id, user_id=None):
         key_generator = self.dynamo.generate_card_keys_by_post(post_id, user_id=user_id)
-        self.dynamo.client.batch_delete_items(key_generator)
+        self.dynamo.client.batch_delete_items(key_generator, parallel=True)
 
     def delete_by_comment(self, comment_id):
         key_generator = self.dynamo.generate_card_keys_by_comment(comment_id)
@@ -96,8 +111,11 @@ class CardManager:
         # send on notifcations for cards for those users
         now = pendulum.now('utc')
         total_count, success_count = 0, 0
-        for card_id in self.dynamo.generate_card_ids_by_notify_user_at(now, only_user_ids=only_user_ids):
-            card = self.get_card(card_id)
+        card_ids = self.dynamo.generate_card_ids_by_notify_user_at(now, only_user_ids=only_user_ids)
+        for card_item in self.dynamo.generate_cards(card_ids):
+            if not card_item:
+                continue
+            card = self.init_card(card_item)
             success_count += card.notify_user()
             total_count += 1
             card.clear_notify_user_at()
@@ -154,10 +172,22 @@ class CardManager:
                 logger.warning(f'Original post `{original_post_id}` not found')
 
     def on_post_view_count_change_update_cards(self, post_id, new_item, old_item=None):
-        if new_item.get('viewCount', 0) <= (old_item or {}).get('viewCount', 0):
-            return  # view count did not increase
-        _, viewed_by_user_id = new_item['sortKey'].split('/')
-        self.delete_by_post(post_id, user_id=viewed_by_user_id)
+        self.on_posts_view_count_change_update_cards([(post_id, old_item, new_item)])
+
+    def on_posts_view_count_change_update_cards(self, records):
+        "Batch listener. Deletes the cards of each viewed post for its viewer, all in one batch delete."
+        post_and_user_ids = {}  # used as an ordered set
+        for post_id, old_item, new_item in records:
+            if new_item.get('viewCount', 0) <= (old_item or {}).get('viewCount', 0):
+                continue  # view count did not increase
+            _, viewed_by_user_id = new_item['sortKey'].split('/')
+            post_and_user_ids[(post_id, viewed_by_user_id)] = None
+        key_generator = (
+            key
+            for post_id, user_id in post_and_user_ids
+            for key in self.dynamo.generate_card_keys_by_post(post_id, user_id=user_id)
+        )
+        self.dynamo.client.batch_delete_items(key_generator, parallel=True)
 
     def on_post_comments_unviewed_count_change_update_card(self, post_id, new_item, old_item=None):
         new_cnt = new_item.get('commentsUnviewedCount', 0)
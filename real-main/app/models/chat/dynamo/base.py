@@ -97,13 +97,13 @@ class ChatDynamo:
         return self.client.increment_count(self.pk(chat_id), 'flagCount')
 
     def decrement_flag_count(self, chat_id):
-        return self.client.decrement_count(self.pk(chat_id), 'flagCount')
+        return self.client.decrement_count(self.pk(chat_id), 'flagCount', deferrable=True)
 
     def increment_messages_count(self, chat_id):
-        return self.client.increment_count(self.pk(chat_id), 'messagesCount')
+        return self.client.increment_count(self.pk(chat_id), 'messagesCount', deferrable=True)
 
     def decrement_messages_count(self, chat_id):
-        return self.client.decrement_count(self.pk(chat_id), 'messagesCount')
+        return self.client.decrement_count(self.pk(chat_id), 'messagesCount', deferrable=True)
 
     def delete(self, chat_id):
         return self.client.delete_item(self.pk(chat_id))
@@ -66,11 +66,22 @@ class ChatMemberDynamo:
         msg = f'Failed to update last message activity for chat `{chat_id}` and member `{user_id}` to `{now_str}`'
         return self.client.update_item(query_kwargs, failure_warning=msg)
 
+    def transact_update_last_message_activity_at(self, chat_id, user_id, now):
+        "See update_last_message_activity_at(). For use with DynamoClient.pipeline_write_items()."
+        return {
+            'Update': {
+                'Key': self.typed_pk(chat_id, user_id),
+                'UpdateExpression': 'SET gsiK2SortKey = :gsik2sk',
+                'ExpressionAttributeValues': {':gsik2sk': {'S': 'chat/' + now.to_iso8601_string()}},
+                'ConditionExpression': 'attribute_exists(partitionKey) AND NOT :gsik2sk < gsiK2SortKey',
+            }
+        }
+
     def increment_messages_unviewed_count(self, chat_id, user_id):
-        return self.client.increment_count(self.pk(chat_id, user_id), 'messagesUnviewedCount')
+        return self.client.increment_count(self.pk(chat_id, user_id), 'messagesUnviewedCount', deferrable=True)
 
     def decrement_messages_unviewed_count(self, chat_id, user_id):
-        return self.client.decrement_count(self.pk(chat_id, user_id), 'messagesUnviewedCount')
+        return self.client.decrement_count(self.pk(chat_id, user_id), 'messagesUnviewedCount', deferrable=True)
 
     def clear_messages_unviewed_count(self, chat_id, user_id):
         query_kwargs = {
@@ -87,7 +98,8 @@ class ChatMemberDynamo:
             ),
             'IndexName': 'GSI-K1',
         }
-        return map(lambda item: item['sortKey'][len('member/') :], self.client.generate_all_query(query_kwargs))
+        gen = self.client.generate_all_query(query_kwargs, projection=('sortKey',))
+        return map(lambda item: item['sortKey'][len('member/') :], gen)
 
     def generate_chat_ids_by_user(self, user_id):
         query_kwargs = {
@@ -96,6 +108,5 @@ class ChatMemberDynamo:
             ),
             'IndexName': 'GSI-K2',
         }
-        return map(
-            lambda item: item['partitionKey'][len('chat/') :], self.client.generate_all_query(query_kwargs)
-        )
+        gen = self.client.generate_all_query(query_kwargs, projection=('partitionKey',))
+        return map(lambda item: item['partitionKey'][len('chat/') :], gen)
@@ -22,7 +22,7 @@ class ChatManager(FlagManagerMixin, ViewManagerMixin, ManagerBase):
 
     def __init__(self, clients, managers=None):
         super().__init__(clients, managers=managers)
-        managers = managers or {}
+        managers = {} if managers is None else managers
         managers['chat'] = self
         self.block_manager = managers.get('block') or models.BlockManager(clients, managers=managers)
         self.chat_message_manager = managers.get('chat_message') or models.ChatMessageManager(
@@ -141,10 +141,25 @@ class ChatManager(FlagManagerMixin, ViewManagerMixin, ManagerBase):
         # for each memeber of the chat
         #   - update the last message activity timestamp (controls chat ordering)
         #   - for everyone except the author, increment their 'messagesUnviewedCount'
-        for user_id in self.member_dynamo.generate_user_ids_by_chat(message.chat_id):
-            self.member_dynamo.update_last_message_activity_at(message.chat_id, user_id, message.created_at)
+        # Dynamo has no support for batch updates, so the timestamp updates are pipelined as chunks of
+        # transactions. The increments are deferrable, so they are coalesced across the stream batch instead.
+        user_ids = list(self.member_dynamo.generate_user_ids_by_chat(message.chat_id))
+        transact_items = [
+            self.member_dynamo.transact_update_last_message_activity_at(
+                message.chat_id, user_id, message.created_at
+            )
+            for user_id in user_ids
+        ]
+        failures = self.dynamo.client.pipeline_write_items(transact_items)
+        now_str = message.created_at.to_iso8601_string()
+        for user_id, failure in zip(user_ids, failures):
+            if failure:
+                logger.warning(
+                    f'Failed to update last message activity for chat `{message.chat_id}` and member `{user_id}` '
+                    + f'to `{now_str}`: {failure}'
+                )
+        for user_id in user_ids:
             if user_id != message.user_id:
-                # Note that dynamo has no support for batch updates.
                 self.member_dynamo.increment_messages_unviewed_count(message.chat_id, user_id)
                 # TODO
                 # we can be in a state where the user manually dismissed a card, and this view does not
@@ -1,7 +1,5 @@
 import logging
 
-import gql
-
 logger = logging.getLogger()
 
 
@@ -10,8 +8,7 @@ class ChatMessageAppSync:
         self.client = appsync_client
 
     def trigger_notification(self, notification_type, user_id, message):
-        mutation = gql.gql(
-            '''
+        mutation = '''
             mutation TriggerChatMessageNotification ($input: ChatMessageNotificationInput!) {
                 triggerChatMessageNotification (input: $input) {
                     userId
@@ -42,7 +39,6 @@ class ChatMessageAppSync:
                 }
             }
         '''
-        )
         input_obj = {
             'userId': user_id,
             'messageId': message.id,
@@ -53,7 +53,7 @@ class ChatMessageDynamo:
         return self.client.increment_count(self.pk(message_id), 'flagCount')
 
     def decrement_flag_count(self, message_id):
-        return self.client.decrement_count(self.pk(message_id), 'flagCount')
+        return self.client.decrement_count(self.pk(message_id), 'flagCount', deferrable=True)
 
     def delete_chat_message(self, message_id):
         return self.client.delete_item(self.pk(message_id))
@@ -63,7 +63,5 @@ class ChatMessageDynamo:
             'KeyConditionExpression': Key('gsiA1PartitionKey').eq(f'chatMessage/{chat_id}'),
             'IndexName': 'GSI-A1',
         }
-        gen = self.client.generate_all_query(query_kwargs)
-        if pks_only:
-            gen = ({'partitionKey': item['partitionKey'], 'sortKey': item['sortKey']} for item in gen)
-        return gen
+        projection = ('partitionKey', 'sortKey') if pks_only else None
+        return self.client.generate_all_query(query_kwargs, projection=projection)
@@ -21,7 +21,7 @@ class ChatMessageManager(FlagManagerMixin, ManagerBase):
 
     def __init__(self, clients, managers=None):
         super().__init__(clients, managers=managers)
-        managers = managers or {}
+        managers = {} if managers is None else managers
         managers['chat_message'] = self
         self.block_manager = managers.get('block') or models.BlockManager(clients, managers=managers)
         self.chat_manager = managers.get('chat') or models.ChatManager(clients, managers=managers)
@@ -6,6 +6,7 @@ import pendulum
 
 from app.mixins.flag.model import FlagModelMixin
 from app.models.block.enums import BlockStatus
+from app.utils.selection_set import is_selected, sub_selection
 
 from .exceptions import ChatMessageException
 
@@ -65,9 +66,11 @@ class ChatMessage(FlagModelMixin):
         self.item = self.dynamo.get_chat_message(self.id, strongly_consistent=strongly_consistent)
         return self
 
-    def serialize(self, caller_user_id):
+    def serialize(self, caller_user_id, selection_set=None):
         resp = self.item.copy()
-        resp['author'] = self.user_manager.get_user(self.user_id).serialize(caller_user_id)
+        if is_selected(selection_set, 'author'):
+            user = self.user_manager.get_user(self.user_id)
+            resp['author'] = user.serialize(caller_user_id, selection_set=sub_selection(selection_set, 'author'))
         return resp
 
     def edit(self, text, now=None):
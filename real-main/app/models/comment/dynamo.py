@@ -52,7 +52,7 @@ class CommentDynamo:
         return self.client.increment_count(self.pk(comment_id), 'flagCount')
 
     def decrement_flag_count(self, comment_id):
-        return self.client.decrement_count(self.pk(comment_id), 'flagCount')
+        return self.client.decrement_count(self.pk(comment_id), 'flagCount', deferrable=True)
 
     def generate_by_post(self, post_id):
         query_kwargs = {
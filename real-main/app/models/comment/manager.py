@@ -21,7 +21,7 @@ class CommentManager(FlagManagerMixin, ManagerBase):
 
     def __init__(self, clients, managers=None):
         super().__init__(clients, managers=managers)
-        managers = managers or {}
+        managers = {} if managers is None else managers
         managers['comment'] = self
         self.block_manager = managers.get('block') or models.BlockManager(clients, managers=managers)
         self.follower_manager = managers.get('follower') or models.FollowerManager(clients, managers=managers)
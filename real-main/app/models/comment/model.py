@@ -5,6 +5,7 @@ import pendulum
 from app.mixins.flag.model import FlagModelMixin
 from app.models.follower.enums import FollowStatus
 from app.models.user.enums import UserPrivacyStatus
+from app.utils.selection_set import is_selected, sub_selection
 
 from .exceptions import CommentException
 
@@ -63,9 +64,13 @@ class Comment(FlagModelMixin):
         self.item = self.dynamo.get_comment(self.id, strongly_consistent=strongly_consistent)
         return self
 
-    def serialize(self, caller_user_id):
+    def serialize(self, caller_user_id, selection_set=None):
         resp = self.item.copy()
-        resp['commentedBy'] = self.user_manager.get_user(self.user_id).serialize(caller_user_id)
+        if is_selected(selection_set, 'commentedBy'):
+            user = self.user_manager.get_user(self.user_id)
+            resp['commentedBy'] = user.serialize(
+                caller_user_id, selection_set=sub_selection(selection_set, 'commentedBy')
+            )
         return resp
 
     def delete(self, deleter_user_id=None, forced=False):
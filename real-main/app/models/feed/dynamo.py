@@ -21,11 +21,21 @@ class FeedDynamo:
 
     def add_post_to_feeds(self, feed_user_id_generator, post_item):
         "Add the post to all the feeds of the generated user_ids, return a list of those user_ids"
+        return self.add_posts_to_feeds(feed_user_id_generator, [post_item])
+
+    def add_posts_to_feeds(self, feed_user_id_generator, post_items):
+        "Add the posts to all the feeds of the generated user_ids, return a list of those user_ids"
         feed_user_ids = list(feed_user_id_generator)
-        item_generator = (self.item(feed_user_id, post_item) for feed_user_id in feed_user_ids)
-        self.feed_client.batch_put_items(item_generator)
+        item_generator = (
+            self.item(feed_user_id, post_item) for feed_user_id in feed_user_ids for post_item in post_items
+        )
+        self.feed_client.batch_put_items(item_generator, parallel=True)
         return feed_user_ids
 
+    def delete_posts_from_feed(self, feed_user_id, post_ids):
+        "Delete the feed items of the posts from the feed of `feed_user_id`"
+        self.feed_client.batch_delete({'postId': post_id, 'feedUserId': feed_user_id} for post_id in post_ids)
+
     def delete_by_post_owner(self, feed_user_id, post_user_id):
         "Delete all feed items by `posted_by_user_id` from the feed of `feed_user_id`"
         key_generator = self.generate_keys_by_posted_by_user(feed_user_id, post_user_id)
@@ -35,7 +45,7 @@ class FeedDynamo:
         "Delete all feed items of `post_id`, return a list of affected user_ids"
         keys = list(self.generate_keys_by_post(post_id))
         feed_user_ids = [key['feedUserId'] for key in keys]
-        self.feed_client.batch_delete(k for k in keys)
+        self.feed_client.batch_delete((k for k in keys), parallel=True)
         return feed_user_ids
 
     def generate_items(self, feed_user_id):
@@ -1,7 +1,9 @@
+import collections
 import itertools
 import logging
 
 from app import models
+from app.clients import LocalWorkQueueClient
 from app.models.follower.enums import FollowStatus
 from app.models.post.enums import PostStatus
 from app.utils import GqlNotificationType
@@ -12,8 +14,12 @@ logger = logging.getLogger()
 
 
 class FeedManager:
+
+    # posts added to, or followers whose feeds are synced, per chunk of the work queue tasks
+    chunk_size = 500
+
     def __init__(self, clients, managers=None):
-        managers = managers or {}
+        managers = {} if managers is None else managers
         managers['feed'] = self
         self.follower_manager = managers.get('follower') or models.FollowerManager(clients, managers=managers)
         self.post_manager = managers.get('post') or models.PostManager(clients, managers=managers)
@@ -23,32 +29,115 @@ class FeedManager:
             self.appsync_client = clients['appsync']
         if 'dynamo_feed' in clients:
             self.dynamo = FeedDynamo(clients['dynamo_feed'])
+        self.work_queue_client = clients.get('work_queue') or LocalWorkQueueClient()
+        self.work_queue_client.register('feed.add_users_posts_to_feed', self.add_users_posts_to_feed)
+        self.work_queue_client.register('feed.remove_users_posts_from_feed', self.remove_users_posts_from_feed)
+        self.work_queue_client.register('feed.sync_posts_to_followers_feeds', self.sync_posts_to_followers_feeds)
+
+    def add_users_posts_to_feed(self, feed_user_id, posted_by_user_id, cursor=None):
+        """
+        Work queue task. Add a chunk of the completed posts of one user to the feed of another.
+        Returns the cursor of the next chunk.
+        """
+        paginated = self.post_manager.dynamo.query_posts_by_user(
+            posted_by_user_id, completed=True, limit=self.chunk_size, next_token=cursor
+        )
+        self.dynamo.add_posts_to_feed(feed_user_id, iter(paginated['items']))
 
-    def add_users_posts_to_feed(self, feed_user_id, posted_by_user_id):
-        post_item_generator = self.post_manager.dynamo.generate_posts_by_user(posted_by_user_id, completed=True)
-        self.dynamo.add_posts_to_feed(feed_user_id, post_item_generator)
+        # Posts of the page may have been archived or deleted since it was read, and sync_posts_to_followers_feeds()
+        # may have removed them from all feeds before they were written to this one. That sync follows the
+        # change of status, so a strongly consistent read after the write finds any such post.
+        post_ids = [post_item['postId'] for post_item in paginated['items']]
+        post_items = self.post_manager.dynamo.get_posts(post_ids, strongly_consistent=True)
+        uncompleted_post_ids = [
+            post_id
+            for post_id, post_item in zip(post_ids, post_items)
+            if (post_item or {}).get('postStatus') != PostStatus.COMPLETED
+        ]
+        if uncompleted_post_ids:
+            self.dynamo.delete_posts_from_feed(feed_user_id, uncompleted_post_ids)
+        self.appsync_client.fire_notification(feed_user_id, GqlNotificationType.USER_FEED_CHANGED)
+        return paginated['nextToken']
+
+    def remove_users_posts_from_feed(self, feed_user_id, posted_by_user_id, cursor=None):
+        "Work queue task. Remove all the posts of one user from the feed of another."
+        self.dynamo.delete_by_post_owner(feed_user_id, posted_by_user_id)
+        self.appsync_client.fire_notification(feed_user_id, GqlNotificationType.USER_FEED_CHANGED)
 
     def add_post_to_followers_feeds(self, followed_user_id, post_item):
+        return self.add_posts_to_followers_feeds(followed_user_id, [post_item])
+
+    def add_posts_to_followers_feeds(self, followed_user_id, post_items):
         user_id_gen = itertools.chain(
             [followed_user_id], self.follower_manager.generate_follower_user_ids(followed_user_id)
         )
-        return self.dynamo.add_post_to_feeds(user_id_gen, post_item)
+        return self.dynamo.add_posts_to_feeds(user_id_gen, post_items)
+
+    def sync_posts_to_followers_feeds(self, posted_by_user_id, post_items, deleted_post_ids, cursor=None):
+        """
+        Work queue task. With the first chunk, remove the `deleted_post_ids` from all feeds. Then add the
+        `post_items` to the user's own feed and to the feeds of a chunk of their followers.
+        Each affected feed is notified, and the cursor of the next chunk is returned.
+        """
+        feed_user_ids = {}  # used as an ordered set
+        next_token = None
+        if cursor is None:
+            for post_id in deleted_post_ids:
+                feed_user_ids.update(dict.fromkeys(self.dynamo.delete_by_post(post_id)))
+        if post_items:
+            follower_user_ids, next_token = self.follower_manager.get_follower_user_ids_page(
+                posted_by_user_id, limit=self.chunk_size, next_token=cursor
+            )
+            user_id_gen = itertools.chain([posted_by_user_id] if cursor is None else [], follower_user_ids)
+            feed_user_ids.update(dict.fromkeys(self.dynamo.add_posts_to_feeds(user_id_gen, post_items)))
+        for user_id in feed_user_ids:
+            self.appsync_client.fire_notification(user_id, GqlNotificationType.USER_FEED_CHANGED)
+        return next_token
 
     def on_user_follow_status_change_sync_feed(self, followed_user_id, new_item=None, old_item=None):
         follower_user_id = (new_item or old_item)['followerUserId']
         new_status = (new_item or {}).get('followStatus', FollowStatus.NOT_FOLLOWING)
         if new_status == FollowStatus.FOLLOWING:
-            self.add_users_posts_to_feed(follower_user_id, followed_user_id)
+            name = 'feed.add_users_posts_to_feed'
         else:
-            self.dynamo.delete_by_post_owner(follower_user_id, followed_user_id)
-        self.appsync_client.fire_notification(follower_user_id, GqlNotificationType.USER_FEED_CHANGED)
+            name = 'feed.remove_users_posts_from_feed'
+        # keyed by feed, so that follows and unfollows are applied to it in order
+        task = {
+            'name': name,
+            'key': f'feed/{follower_user_id}',
+            'args': {'feed_user_id': follower_user_id, 'posted_by_user_id': followed_user_id},
+        }
+        self.work_queue_client.send_tasks([task])
 
     def on_post_status_change_sync_feed(self, post_id, new_item=None, old_item=None):
-        posted_by_user_id = (new_item or old_item)['postedByUserId']
-        new_status = (new_item or {}).get('postStatus')
-        if new_status == PostStatus.COMPLETED:
-            feed_user_ids = self.add_post_to_followers_feeds(posted_by_user_id, new_item)
-        else:
-            feed_user_ids = self.dynamo.delete_by_post(post_id)
-        for user_id in feed_user_ids:
-            self.appsync_client.fire_notification(user_id, GqlNotificationType.USER_FEED_CHANGED)
+        self.on_posts_status_change_sync_feeds([(post_id, old_item, new_item)])
+
+    def on_posts_status_change_sync_feeds(self, records):
+        """
+        Batch listener. Only the last change to each post matters. The feeds are synced on the work queue,
+        with one task per posting user, so that their feed changes are applied in order.
+        """
+        last_items = {post_id: (old_item, new_item) for post_id, old_item, new_item in records}
+        post_items, deleted_post_ids = collections.defaultdict(list), collections.defaultdict(list)
+        for post_id, (old_item, new_item) in last_items.items():
+            posted_by_user_id = (new_item or old_item)['postedByUserId']
+            if (new_item or {}).get('postStatus') == PostStatus.COMPLETED:
+                post_item = {k: new_item[k] for k in ('postId', 'postedByUserId', 'postedAt')}
+                post_items[posted_by_user_id].append(post_item)
+            else:
+                deleted_post_ids[posted_by_user_id].append(post_id)
+        tasks = [
+            {
+                'name': 'feed.sync_posts_to_followers_feeds',
+                # per posting user, so these may run alongside the `feed/{feed_user_id}` tasks that write the
+                # same feeds, see add_users_posts_to_feed() for how posts removed meanwhile are kept out
+                'key': f'postsBy/{posted_by_user_id}',
+                'args': {
+                    'posted_by_user_id': posted_by_user_id,
+                    'post_items': post_items[posted_by_user_id],
+                    'deleted_post_ids': deleted_post_ids[posted_by_user_id],
+                },
+            }
+            for posted_by_user_id in dict.fromkeys([*post_items, *deleted_post_ids])
+        ]
+        self.work_queue_client.send_tasks(tasks)
@@ -51,11 +51,23 @@ class FollowerDynamo:
         }
         return self.client.update_item(query_kwargs)
 
+    def transact_update_following_status(self, follow_item, follow_status):
+        "See update_following_status(). For use with DynamoClient.pipeline_write_items()."
+        sort_key = f'{follow_status}/{follow_item["followedAt"]}'
+        return {
+            'Update': {
+                'Key': {k: {'S': follow_item[k]} for k in ('partitionKey', 'sortKey')},
+                'UpdateExpression': 'SET followStatus = :status, gsiA1SortKey = :sk, gsiA2SortKey = :sk',
+                'ExpressionAttributeValues': {':status': {'S': follow_status}, ':sk': {'S': sort_key}},
+                'ConditionExpression': 'attribute_exists(partitionKey)',
+            }
+        }
+
     def delete_following(self, follow_item):
         key = {k: follow_item[k] for k in ('partitionKey', 'sortKey')}
         return self.client.delete_item(key)
 
-    def generate_followed_items(self, user_id, follow_status=None, limit=None, next_token=None):
+    def generate_followed_items(self, user_id, follow_status=None, limit=None, next_token=None, projection=None):
         "Generate items that represent a followed of the given user (that the given user is the follower)"
         key_conditions = [Key('gsiA1PartitionKey').eq(f'follower/{user_id}')]
         if follow_status is not None:
@@ -64,15 +76,23 @@ class FollowerDynamo:
             'KeyConditionExpression': functools.reduce(lambda a, b: a & b, key_conditions),
             'IndexName': 'GSI-A1',
         }
-        return self.client.generate_all_query(query_kwargs)
+        return self.client.generate_all_query(query_kwargs, projection=projection)
 
-    def generate_follower_items(self, user_id, follow_status=None, limit=None, next_token=None):
+    def generate_follower_items(self, user_id, follow_status=None, limit=None, next_token=None, projection=None):
         "Generate items that represent a follower of the given user (that the given user is the followed)"
+        query_kwargs = self.follower_items_query_kwargs(user_id, follow_status=follow_status)
+        return self.client.generate_all_query(query_kwargs, projection=projection)
+
+    def query_follower_items(self, user_id, follow_status=None, limit=None, next_token=None, projection=None):
+        "Query a page of the items of generate_follower_items(). Returns {'items': [...], 'nextToken': ...}"
+        query_kwargs = self.follower_items_query_kwargs(user_id, follow_status=follow_status)
+        return self.client.query(query_kwargs, limit=limit, next_token=next_token, projection=projection)
+
+    def follower_items_query_kwargs(self, user_id, follow_status=None):
         key_conditions = [Key('gsiA2PartitionKey').eq(f'followed/{user_id}')]
         if follow_status is not None:
             key_conditions.append(Key('gsiA2SortKey').begins_with(follow_status + '/'))
-        query_kwargs = {
+        return {
             'KeyConditionExpression': functools.reduce(lambda a, b: a & b, key_conditions),
             'IndexName': 'GSI-A2',
         }
-        return self.client.generate_all_query(query_kwargs)
@@ -31,11 +31,11 @@ class FirstStoryDynamo:
             }
             for follower_user_id in follower_user_ids_generator
         )
-        self.client.batch_put_items(item_generator)
+        self.client.batch_put_items(item_generator, parallel=True)
 
     def delete_all(self, follower_user_ids_generator, posted_by_user_id):
         "Delete our followed first story from all our followers"
         keys_generator = (
             self.key(posted_by_user_id, follower_user_id) for follower_user_id in follower_user_ids_generator
         )
-        self.client.batch_delete_items(keys_generator)
+        self.client.batch_delete_items(keys_generator, parallel=True)
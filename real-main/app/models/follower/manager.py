@@ -1,8 +1,9 @@
 import logging
 
 from app import models
+from app.clients import LocalWorkQueueClient
 from app.models.user.enums import UserPrivacyStatus
-from app.utils import GqlNotificationType
+from app.utils import GqlNotificationType, gather
 
 from .dynamo.base import FollowerDynamo
 from .dynamo.first_story import FirstStoryDynamo
@@ -14,8 +15,12 @@ logger = logging.getLogger()
 
 
 class FollowerManager:
+
+    # followers whose first story is synced per chunk of the work queue task
+    first_story_chunk_size = 1000
+
     def __init__(self, clients, managers=None):
-        managers = managers or {}
+        managers = {} if managers is None else managers
         managers['follower'] = self
         self.block_manager = managers.get('block') or models.BlockManager(clients, managers=managers)
         self.like_manager = managers.get('like') or models.LikeManager(clients, managers=managers)
@@ -28,6 +33,8 @@ class FollowerManager:
         if 'dynamo' in clients:
             self.dynamo = FollowerDynamo(clients['dynamo'])
             self.first_story_dynamo = FirstStoryDynamo(clients['dynamo'])
+        self.work_queue_client = clients.get('work_queue') or LocalWorkQueueClient()
+        self.work_queue_client.register('follower.sync_first_story', self.sync_first_story)
 
     def get_follow(self, follower_user_id, followed_user_id, strongly_consistent=False):
         item = self.dynamo.get_following(
@@ -55,27 +62,47 @@ class FollowerManager:
 
     def generate_follower_user_ids(self, followed_user_id, follow_status=None):
         "Return a generator that produces user ids of users that follow the given user"
-        gen = self.dynamo.generate_follower_items(followed_user_id, follow_status=follow_status)
+        gen = self.dynamo.generate_follower_items(
+            followed_user_id, follow_status=follow_status, projection=('followerUserId',)
+        )
         gen = map(lambda item: item['followerUserId'], gen)
         return gen
 
+    def get_follower_user_ids_page(self, followed_user_id, follow_status=None, limit=None, next_token=None):
+        "Return a page of ([user_id, ...], next_token) of the users that follow the given user"
+        paginated = self.dynamo.query_follower_items(
+            followed_user_id,
+            follow_status=follow_status,
+            limit=limit,
+            next_token=next_token,
+            projection=('followerUserId',),
+        )
+        return [item['followerUserId'] for item in paginated['items']], paginated['nextToken']
+
     def generate_followed_user_ids(self, follower_user_id, follow_status=None):
         "Return a generator that produces user ids of users given user follows"
-        gen = self.dynamo.generate_followed_items(follower_user_id, follow_status=follow_status)
+        gen = self.dynamo.generate_followed_items(
+            follower_user_id, follow_status=follow_status, projection=('followedUserId',)
+        )
         gen = map(lambda item: item['followedUserId'], gen)
         return gen
 
     def request_to_follow(self, follower_user, followed_user):
         "Returns the status of the follow request"
-        if self.get_follow(follower_user.id, followed_user.id):
+        follow, blocked, blocking = gather(
+            lambda: self.get_follow(follower_user.id, followed_user.id),
+            lambda: self.block_manager.is_blocked(followed_user.id, follower_user.id),
+            lambda: self.block_manager.is_blocked(follower_user.id, followed_user.id),
+        )
+        if follow:
             raise FollowerAlreadyExists(follower_user.id, followed_user.id)
 
         # can't follow a user that has blocked us
-        if self.block_manager.is_blocked(followed_user.id, follower_user.id):
+        if blocked:
             raise FollowerException(f'User has been blocked by user `{followed_user.id}`')
 
         # can't follow a user we have blocked
-        if self.block_manager.is_blocked(follower_user.id, followed_user.id):
+        if blocking:
             raise FollowerException(f'User has blocked user `{followed_user.id}`')
 
         follow_status = (
@@ -83,19 +110,37 @@ class FollowerManager:
             if followed_user.item['privacyStatus'] == UserPrivacyStatus.PRIVATE
             else FollowStatus.FOLLOWING
         )
-        follow_item = self.dynamo.add_following(follower_user.id, followed_user.id, follow_status)
-
         if follow_status == FollowStatus.FOLLOWING:
-            post = self.post_manager.dynamo.get_next_completed_post_to_expire(followed_user.id)
+            follow_item, post = gather(
+                lambda: self.dynamo.add_following(follower_user.id, followed_user.id, follow_status),
+                lambda: self.post_manager.dynamo.get_next_completed_post_to_expire(followed_user.id),
+            )
             if post:
                 self.first_story_dynamo.set_all([follower_user.id], post)
+        else:
+            follow_item = self.dynamo.add_following(follower_user.id, followed_user.id, follow_status)
 
         return self.init_follow(follow_item)
 
     def accept_all_requested_follow_requests(self, followed_user_id):
-        for item in self.dynamo.generate_follower_items(followed_user_id, FollowStatus.REQUESTED):
-            # can't batch this: dynamo doesn't support batch updates
-            self.init_follow(item).accept()
+        # dynamo doesn't support batch updates, so pipeline the status updates as chunks of transactions
+        follow_items = list(self.dynamo.generate_follower_items(followed_user_id, FollowStatus.REQUESTED))
+        transact_items = [
+            self.dynamo.transact_update_following_status(item, FollowStatus.FOLLOWING) for item in follow_items
+        ]
+        failures = self.dynamo.client.pipeline_write_items(transact_items, parallel=True)
+        accepted_user_ids = []
+        for item, failure in zip(follow_items, failures):
+            if failure:
+                key_str = f'`{item["partitionKey"]}` / `{item["sortKey"]}`'
+                logger.warning(f'Failed to accept follow request {key_str}: {failure}')
+            else:
+                accepted_user_ids.append(item['followerUserId'])
+
+        # all the new followers get the same first story
+        post = self.post_manager.dynamo.get_next_completed_post_to_expire(followed_user_id)
+        if post and accepted_user_ids:
+            self.first_story_dynamo.set_all(accepted_user_ids, post)
 
     def delete_all_denied_follow_requests(self, followed_user_id):
         for item in self.dynamo.generate_follower_items(followed_user_id, FollowStatus.DENIED):
@@ -146,23 +191,34 @@ class FollowerManager:
             None,
         )
 
-        follower_uids_generator = self.generate_follower_user_ids(user_id, follow_status=FollowStatus.FOLLOWING)
-        if ffs_prev and not ffs_now:
-            # a story was deleted, and there are no more stories to take its place as ffs
-            self.first_story_dynamo.delete_all(follower_uids_generator, user_id)
-
-        if not ffs_prev and ffs_now:
-            # there was no ffs, but a story was added and can now be ffs
-            self.first_story_dynamo.set_all(follower_uids_generator, ffs_now)
-
-        if ffs_prev and ffs_now:
-            if ffs_prev != ffs_now:
-                # the ffs has changed: either different post, or same post but that post changed
-                self.first_story_dynamo.set_all(follower_uids_generator, ffs_now)
-
         if not ffs_prev and not ffs_now:
             raise AssertionError('Should be unreachable condition')
 
+        # the first story is set (or deleted) for each of the followers on the work queue, as they may be many.
+        # Cases: a story was deleted and there are no more to take its place as ffs, there was no ffs but
+        # a story was added, or the ffs changed: either a different post, or the same post but that post changed
+        if ffs_prev != ffs_now:
+            story = {k: ffs_now[k] for k in ('postId', 'postedByUserId', 'expiresAt')} if ffs_now else None
+            task = {'name': 'follower.sync_first_story', 'key': f'firstStory/{user_id}'}
+            self.work_queue_client.send_tasks([{**task, 'args': {'followed_user_id': user_id, 'story': story}}])
+
+    def sync_first_story(self, followed_user_id, story=None, cursor=None):
+        """
+        Work queue task. Set `story` as the followed first story of a chunk of the user's followers,
+        or delete their followed first story if there is no `story`. Returns the cursor of the next chunk.
+        """
+        follower_user_ids, next_token = self.get_follower_user_ids_page(
+            followed_user_id,
+            follow_status=FollowStatus.FOLLOWING,
+            limit=self.first_story_chunk_size,
+            next_token=cursor,
+        )
+        if story:
+            self.first_story_dynamo.set_all(iter(follower_user_ids), story)
+        else:
+            self.first_story_dynamo.delete_all(iter(follower_user_ids), followed_user_id)
+        return next_token
+
     def on_first_story_post_id_change_fire_gql_notifications(self, user_id, new_item=None, old_item=None):
         followed_user_id, follower_user_id = self.first_story_dynamo.parse_key(new_item or old_item)
         kwargs = {'followedUserId': followed_user_id}
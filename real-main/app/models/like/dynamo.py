@@ -64,19 +64,19 @@ class LikeDynamo:
         except self.client.exceptions.ConditionalCheckFailedException as err:
             raise NotLikedWithStatus(liked_by_user_id, post_id, like_status) from err
 
-    def generate_of_post(self, post_id):
+    def generate_of_post(self, post_id, projection=None):
         query_kwargs = {
             'KeyConditionExpression': Key('gsiA2PartitionKey').eq(f'like/{post_id}'),
             'IndexName': 'GSI-A2',
         }
-        return self.client.generate_all_query(query_kwargs)
+        return self.client.generate_all_query(query_kwargs, projection=projection)
 
-    def generate_by_liked_by(self, liked_by_user_id):
+    def generate_by_liked_by(self, liked_by_user_id, projection=None):
         query_kwargs = {
             'KeyConditionExpression': Key('gsiA1PartitionKey').eq(f'like/{liked_by_user_id}'),
             'IndexName': 'GSI-A1',
         }
-        return self.client.generate_all_query(query_kwargs)
+        return self.client.generate_all_query(query_kwargs, projection=projection)
 
     def generate_pks_by_liked_by_for_posted_by(self, liked_by_user_id, posted_by_user_id):
         key_conditions = [
@@ -15,7 +15,7 @@ logger = logging.getLogger()
 
 class LikeManager:
     def __init__(self, clients, managers=None):
-        managers = managers or {}
+        managers = {} if managers is None else managers
         managers['like'] = self
         self.block_manager = managers.get('block') or models.BlockManager(clients, managers=managers)
         self.follower_manager = managers.get('follower') or models.FollowerManager(clients, managers=managers)
@@ -69,12 +69,12 @@ class LikeManager:
 
     def dislike_all_of_post(self, post_id):
         "Dislike all likes of a post"
-        for like_item in self.dynamo.generate_of_post(post_id):
+        for like_item in self.dynamo.generate_of_post(post_id, projection=Like.dislike_attributes):
             self.init_like(like_item).dislike()
 
     def dislike_all_by_user(self, liked_by_user_id):
         "Dislike all likes by a user"
-        for like_item in self.dynamo.generate_by_liked_by(liked_by_user_id):
+        for like_item in self.dynamo.generate_by_liked_by(liked_by_user_id, projection=Like.dislike_attributes):
             self.init_like(like_item).dislike()
 
     def dislike_all_by_user_from_user(self, liked_by_user_id, posted_by_user_id):
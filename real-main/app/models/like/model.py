@@ -4,6 +4,10 @@ logger = logging.getLogger()
 
 
 class Like:
+
+    # the attributes of a like item that are needed to dislike() it
+    dislike_attributes = ('likedByUserId', 'postId', 'likeStatus')
+
     def __init__(self, like_item, like_dynamo, post_manager=None):
         self.dynamo = like_dynamo
         if post_manager:
@@ -1,9 +1,5 @@
 import io
 
-import PIL.Image
-import PIL.ImageOps
-import pyheif
-
 from .exceptions import PostException
 
 
@@ -42,6 +38,11 @@ class CachedImage:
         return self._image
 
     def _fill_image_from_data(self):
+        # the image libraries are slow to import, so only lambdas that actually decode images pay for them
+        import PIL.Image
+        import PIL.ImageOps
+        import pyheif
+
         fh = io.BytesIO(self._data)
         if self.content_type == 'image/heic':
             try:
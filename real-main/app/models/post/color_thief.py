@@ -0,0 +1,6 @@
+import colorthief
+
+
+class ColorThiefFromImage(colorthief.ColorThief):
+    def __init__(self, image):
+        self.image = image
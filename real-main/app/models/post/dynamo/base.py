@@ -25,6 +25,11 @@ class PostDynamo:
     def get_post(self, post_id, strongly_consistent=False):
         return self.client.get_item(self.pk(post_id), ConsistentRead=strongly_consistent)
 
+    def get_posts(self, post_ids, strongly_consistent=False):
+        return self.client.get_many(
+            (self.pk(post_id) for post_id in post_ids), consistent_read=strongly_consistent
+        )
+
     def delete_post(self, post_id):
         return self.client.delete_item(self.pk(post_id))
 
@@ -41,6 +46,15 @@ class PostDynamo:
         return next(self.client.generate_all_query(query_kwargs), None)
 
     def generate_posts_by_user(self, user_id, completed=None):
+        query_kwargs = self.posts_by_user_query_kwargs(user_id, completed=completed)
+        return self.client.generate_all_query(query_kwargs)
+
+    def query_posts_by_user(self, user_id, completed=None, limit=None, next_token=None):
+        "Query a page of the items of generate_posts_by_user(). Returns {'items': [...], 'nextToken': ...}"
+        query_kwargs = self.posts_by_user_query_kwargs(user_id, completed=completed)
+        return self.client.query(query_kwargs, limit=limit, next_token=next_token)
+
+    def posts_by_user_query_kwargs(self, user_id, completed=None):
         query_kwargs = {
             'KeyConditionExpression': Key('gsiA2PartitionKey').eq(f'post/{user_id}'),
             'IndexName': 'GSI-A2',
@@ -49,7 +63,7 @@ class PostDynamo:
             filter_exp = Attr('postStatus')
             filter_exp = filter_exp.eq if completed else filter_exp.ne
             query_kwargs['FilterExpression'] = filter_exp(PostStatus.COMPLETED)
-        return self.client.generate_all_query(query_kwargs)
+        return query_kwargs
 
     def generate_expired_post_pks_by_day(self, date, cut_off_time=None):
         key_conditions = [Key('gsiK1PartitionKey').eq(f'post/{date}')]
@@ -62,7 +76,7 @@ class PostDynamo:
         }
         return self.client.generate_all_query(query_kwargs)
 
-    def generate_expired_post_pks_with_scan(self, cut_off_date):
+    def generate_expired_post_pks_with_scan(self, cut_off_date, total_segments=1):
         "Do a table **scan** to generate pks of expired posts. Does *not* include cut_off_date."
         query_kwargs = {
             'FilterExpression': (
@@ -70,7 +84,7 @@ class PostDynamo:
             ),
             'ProjectionExpression': 'partitionKey, sortKey',
         }
-        return self.client.generate_all_scan(query_kwargs)
+        return self.client.generate_all_scan(query_kwargs, total_segments=total_segments)
 
     def add_pending_post(
         self,
@@ -142,10 +156,10 @@ class PostDynamo:
         return self.client.increment_count(self.pk(post_id), 'flagCount')
 
     def decrement_flag_count(self, post_id):
-        return self.client.decrement_count(self.pk(post_id), 'flagCount')
+        return self.client.decrement_count(self.pk(post_id), 'flagCount', deferrable=True)
 
     def increment_viewed_by_count(self, post_id):
-        return self.client.increment_count(self.pk(post_id), 'viewedByCount')
+        return self.client.increment_count(self.pk(post_id), 'viewedByCount', deferrable=True)
 
     def set_post_status(self, post_item, status, status_reason=None, original_post_id=None, album_rank=None):
         album_id = post_item.get('albumId')
@@ -344,16 +358,16 @@ class PostDynamo:
         return self.client.update_item(update_query_kwargs)
 
     def increment_onymous_like_count(self, post_id):
-        return self.client.increment_count(self.pk(post_id), 'onymousLikeCount')
+        return self.client.increment_count(self.pk(post_id), 'onymousLikeCount', deferrable=True)
 
     def decrement_onymous_like_count(self, post_id):
-        return self.client.decrement_count(self.pk(post_id), 'onymousLikeCount')
+        return self.client.decrement_count(self.pk(post_id), 'onymousLikeCount', deferrable=True)
 
     def increment_anonymous_like_count(self, post_id):
-        return self.client.increment_count(self.pk(post_id), 'anonymousLikeCount')
+        return self.client.increment_count(self.pk(post_id), 'anonymousLikeCount', deferrable=True)
 
     def decrement_anonymous_like_count(self, post_id):
-        return self.client.decrement_count(self.pk(post_id), 'anonymousLikeCount')
+        return self.client.decrement_count(self.pk(post_id), 'anonymousLikeCount', deferrable=True)
 
     def increment_comment_count(self, post_id, viewed=False):
         query_kwargs = {
@@ -370,7 +384,7 @@ class PostDynamo:
         return self.client.update_item(query_kwargs, failure_warning=msg)
 
     def decrement_comment_count(self, post_id):
-        return self.client.decrement_count(self.pk(post_id), 'commentCount')
+        return self.client.decrement_count(self.pk(post_id), 'commentCount', deferrable=True)
 
     def decrement_comments_unviewed_count(self, post_id):
         return self.client.decrement_count(self.pk(post_id), 'commentsUnviewedCount')
@@ -416,6 +430,16 @@ class PostDynamo:
         return self.client.update_item(query_kwargs)
 
     def generate_post_ids_in_album(self, album_id, completed=None, after_rank=None):
+        query_kwargs = self.post_ids_in_album_query_kwargs(album_id, completed=completed, after_rank=after_rank)
+        return map(lambda item: item['partitionKey'].split('/')[1], self.client.generate_all_query(query_kwargs))
+
+    def query_post_ids_in_album(self, album_id, limit=None, next_token=None):
+        "Query a page of generate_post_ids_in_album(). Returns a tuple of ([post_id, ...], next_token)"
+        query_kwargs = self.post_ids_in_album_query_kwargs(album_id)
+        paginated = self.client.query(query_kwargs, limit=limit, next_token=next_token)
+        return [item['partitionKey'].split('/')[1] for item in paginated['items']], paginated['nextToken']
+
+    def post_ids_in_album_query_kwargs(self, album_id, completed=None, after_rank=None):
         assert completed is None or after_rank is None, 'Cant specify both completed and after_rank kwargs'
 
         key_exps = [Key('gsiK3PartitionKey').eq(f'post/{album_id}')]
@@ -426,9 +450,8 @@ class PostDynamo:
         if after_rank is not None:
             key_exps.append(Key('gsiK3SortKey').gt(after_rank))
 
-        query_kwargs = {
+        return {
             'KeyConditionExpression': functools.reduce(lambda a, b: a & b, key_exps),
             'IndexName': 'GSI-K3',
             'ProjectionExpression': 'partitionKey',
         }
-        return map(lambda item: item['partitionKey'].split('/')[1], self.client.generate_all_query(query_kwargs))
@@ -16,6 +16,9 @@ class PostImageDynamo:
     def get(self, post_id, strongly_consistent=False):
         return self.client.get_item(self.pk(post_id), ConsistentRead=strongly_consistent)
 
+    def get_many(self, post_ids):
+        return self.client.get_many(self.pk(post_id) for post_id in post_ids)
+
     def delete(self, post_id):
         return self.client.delete_item(self.pk(post_id))
 
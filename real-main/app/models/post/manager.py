@@ -5,6 +5,7 @@ import logging
 import pendulum
 
 from app import models
+from app.clients import LocalWorkQueueClient
 from app.mixins.base import ManagerBase
 from app.mixins.flag.manager import FlagManagerMixin
 from app.mixins.trending.manager import TrendingManagerMixin
@@ -25,9 +26,12 @@ class PostManager(FlagManagerMixin, TrendingManagerMixin, ViewManagerMixin, Mana
 
     item_type = 'post'
 
+    # posts removed from a deleted album per chunk of the work queue task
+    remove_from_album_chunk_size = 100
+
     def __init__(self, clients, managers=None):
         super().__init__(clients, managers=managers)
-        managers = managers or {}
+        managers = {} if managers is None else managers
         managers['post'] = self
         self.album_manager = managers.get('album') or models.AlbumManager(clients, managers=managers)
         self.block_manager = managers.get('block') or models.BlockManager(clients, managers=managers)
@@ -43,6 +47,8 @@ class PostManager(FlagManagerMixin, TrendingManagerMixin, ViewManagerMixin, Mana
             self.dynamo = PostDynamo(clients['dynamo'])
             self.image_dynamo = PostImageDynamo(clients['dynamo'])
             self.original_metadata_dynamo = PostOriginalMetadataDynamo(clients['dynamo'])
+        self.work_queue_client = clients.get('work_queue') or LocalWorkQueueClient()
+        self.work_queue_client.register('post.remove_posts_from_album', self.remove_posts_from_album)
 
     def get_model(self, item_id, strongly_consistent=False):
         return self.get_post(item_id, strongly_consistent=strongly_consistent)
@@ -51,6 +57,20 @@ class PostManager(FlagManagerMixin, TrendingManagerMixin, ViewManagerMixin, Mana
         post_item = self.dynamo.get_post(post_id, strongly_consistent=strongly_consistent)
         return self.init_post(post_item) if post_item else None
 
+    def get_posts(self, post_ids, with_image_items=False):
+        """
+        Get many posts in batch requests. Returned in the order of `post_ids`, with None for any DNE.
+        If `with_image_items`, the image items of the posts are fetched in batch requests too.
+        """
+        post_items = self.dynamo.get_posts(post_ids)
+        posts = [self.init_post(post_item) if post_item else None for post_item in post_items]
+        if with_image_items:
+            found = [post for post in posts if post]
+            image_items = self.image_dynamo.get_many(post.id for post in found)
+            for post, image_item in zip(found, image_items):
+                post._image_item = image_item or {}
+        return posts
+
     def init_post(self, post_item):
         kwargs = {
             'post_appsync': getattr(self, 'appsync', None),
@@ -199,8 +219,8 @@ class PostManager(FlagManagerMixin, TrendingManagerMixin, ViewManagerMixin, Mana
             return
 
         results = []
-        for post_id, view_count in grouped_post_ids.items():
-            post = self.get_post(post_id)
+        posts = self.get_posts(grouped_post_ids.keys())
+        for post, (post_id, view_count) in zip(posts, grouped_post_ids.items()):
             if not post:
                 logger.warning(f'Cannot record view(s) by user `{user_id}` on DNE post `{post_id}`')
                 continue
@@ -235,13 +255,14 @@ class PostManager(FlagManagerMixin, TrendingManagerMixin, ViewManagerMixin, Mana
             )
             self.init_post(post_item).delete()
 
-    def delete_older_expired_posts(self, now=None):
-        "Delete posts that expired yesterday or earlier, via full table scan"
+    def delete_older_expired_posts(self, now=None, total_segments=1):
+        "Delete posts that expired yesterday or earlier, via full table scan in `total_segments` parallel segments"
         now = now or pendulum.now('utc')
         today = now.date()
 
         # scan for expired posts
-        for post_pk in self.dynamo.generate_expired_post_pks_with_scan(today):  # excludes today
+        post_pks = self.dynamo.generate_expired_post_pks_with_scan(today, total_segments=total_segments)
+        for post_pk in post_pks:  # excludes today
             logger.warning(f'Deleting expired post with pk ({post_pk["partitionKey"]}, {post_pk["sortKey"]})')
             post_item = self.dynamo.client.get_item(post_pk)
             self.init_post(post_item).delete()
@@ -284,24 +305,31 @@ class PostManager(FlagManagerMixin, TrendingManagerMixin, ViewManagerMixin, Mana
                     self.dynamo.set_last_unviewed_comment_at(post_item, None)
 
     def on_like_add(self, post_id, new_item):
-        like_status = new_item['likeStatus']
-        if like_status == LikeStatus.ONYMOUSLY_LIKED:
-            incrementor = self.dynamo.increment_onymous_like_count
-        elif like_status == LikeStatus.ANONYMOUSLY_LIKED:
-            incrementor = self.dynamo.increment_anonymous_like_count
-        else:
-            raise Exception(f'Unrecognized like status `{like_status}`')
-        incrementor(post_id)
+        self.on_likes_change_sync_counts([(post_id, None, new_item)])
 
     def on_like_delete(self, post_id, old_item):
-        like_status = old_item['likeStatus']
-        if like_status == LikeStatus.ONYMOUSLY_LIKED:
-            decrementor = self.dynamo.decrement_onymous_like_count
-        elif like_status == LikeStatus.ANONYMOUSLY_LIKED:
-            decrementor = self.dynamo.decrement_anonymous_like_count
-        else:
-            raise Exception(f'Unrecognized like status `{like_status}`')
-        decrementor(post_id)
+        self.on_likes_change_sync_counts([(post_id, old_item, None)])
+
+    def on_likes_change_sync_counts(self, records):
+        "Batch listener. Applies the net change to the like counts of each post, with one write per counter."
+        attribute_names = {
+            LikeStatus.ONYMOUSLY_LIKED: 'onymousLikeCount',
+            LikeStatus.ANONYMOUSLY_LIKED: 'anonymousLikeCount',
+        }
+        deltas = collections.Counter()
+        for post_id, old_item, new_item in records:
+            for item, delta in ((old_item, -1), (new_item, 1)):
+                if not item:
+                    continue
+                if item['likeStatus'] not in attribute_names:
+                    # raising would fail, and so retry, the records whose counts are already applied
+                    logger.warning(
+                        f'Unrecognized like status `{item["likeStatus"]}` on post `{post_id}`, skipping'
+                    )
+                    continue
+                deltas[(post_id, attribute_names[item['likeStatus']])] += delta
+        for (post_id, attribute_name), delta in deltas.items():
+            self.dynamo.client.add_count(self.dynamo.pk(post_id), attribute_name, delta, deferrable=True)
 
     def on_post_view_count_change_update_counts(self, post_id, new_item, old_item=None):
         if new_item.get('viewCount', 0) <= (old_item or {}).get('viewCount', 0):
@@ -322,9 +350,22 @@ class PostManager(FlagManagerMixin, TrendingManagerMixin, ViewManagerMixin, Mana
                 raise
 
     def on_album_delete_remove_posts(self, album_id, old_item):
-        for post_id in self.dynamo.generate_post_ids_in_album(album_id):
+        task = {
+            'name': 'post.remove_posts_from_album',
+            'key': f'album/{album_id}',
+            'args': {'album_id': album_id},
+        }
+        self.work_queue_client.send_tasks([task])
+
+    def remove_posts_from_album(self, album_id, cursor=None):
+        "Work queue task. Remove a chunk of the posts in an album from it. Returns the cursor of the next chunk."
+        post_ids, next_token = self.dynamo.query_post_ids_in_album(
+            album_id, limit=self.remove_from_album_chunk_size, next_token=cursor
+        )
+        for post_id in post_ids:
             if post := self.get_post(post_id):
                 post.set_album(None)
+        return next_token
 
     def on_post_status_change_fire_gql_notifications(self, post_id, new_item, old_item):
         old_post = self.init_post(old_item)
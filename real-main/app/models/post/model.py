@@ -2,9 +2,7 @@ import base64
 import io
 import logging
 
-import colorthief
 import pendulum
-import PIL.Image
 
 from app.mixins.flag.model import FlagModelMixin
 from app.mixins.trending.model import TrendingModelMixin
@@ -13,6 +11,7 @@ from app.models.follower.enums import FollowStatus
 from app.models.user.enums import UserPrivacyStatus, UserSubscriptionLevel
 from app.models.user.exceptions import UserException
 from app.utils import image_size
+from app.utils.selection_set import is_selected, sub_selection
 
 from .cached_image import CachedImage
 from .enums import PostNotificationType, PostStatus, PostType
@@ -28,15 +27,19 @@ VIDEO_POSTER_PREFIX = 'video-poster/poster'
 IMAGE_DIR = 'image'
 
 
-class ColorThiefFromImage(colorthief.ColorThief):
-    def __init__(self, image):
-        self.image = image
-
-
 class Post(FlagModelMixin, TrendingModelMixin, ViewModelMixin):
 
     item_type = 'post'
 
+    # fields of the Post graphql type whose resolvers read the serialized `postedBy` off their source
+    posted_by_dependents = [
+        'anonymousLikeCount',
+        'onymousLikeCount',
+        'onymouslyLikedBy',
+        'viewedBy',
+        'viewedByCount',
+    ]
+
     def __init__(
         self,
         item,
@@ -233,18 +236,29 @@ class Post(FlagModelMixin, TrendingModelMixin, ViewModelMixin):
         path = self.get_image_path(size)
         return self.cloudfront_client.generate_presigned_url(path, ['GET', 'HEAD'])
 
+    def get_image_readonly_urls(self, sizes):
+        "Same as get_image_readonly_url() for many sizes, in one call"
+        path_prefix = f'{self.s3_prefix}/{IMAGE_DIR}'
+        filenames = [size.filename for size in sizes]
+        return self.cloudfront_client.generate_presigned_urls(path_prefix, filenames, ['GET', 'HEAD'])
+
     def get_image_writeonly_url(self):
         assert self.type == PostType.IMAGE
         size = image_size.NATIVE_HEIC if self.image_item.get('imageFormat') == 'HEIC' else image_size.NATIVE
         path = self.get_image_path(size)
         return self.cloudfront_client.generate_presigned_url(path, ['PUT'])
 
-    def serialize(self, caller_user_id):
+    def serialize(self, caller_user_id, selection_set=None):
         resp = self.item.copy()
-        resp['postedBy'] = self.user_manager.get_user(self.user_id).serialize(caller_user_id)
+        # the album resolver hands our postedBy on as the album's ownedBy
+        if is_selected(selection_set, 'postedBy', 'album/ownedBy', *self.posted_by_dependents):
+            user_selection_set = sub_selection(selection_set, 'postedBy', 'album/ownedBy')
+            resp['postedBy'] = self.user.serialize(caller_user_id, selection_set=user_selection_set)
         return resp
 
     def build_image_thumbnails(self):
+        import PIL.Image  # deferred, only the lambdas that process images need it
+
         image = self.native_jpeg_cache.readonly_image.copy()
         # ordered by decreasing size
         for cache in (self.k4_jpeg_cache, self.p1080_jpeg_cache, self.p480_jpeg_cache, self.p64_jpeg_cache):
@@ -482,6 +496,8 @@ class Post(FlagModelMixin, TrendingModelMixin, ViewModelMixin):
         return self
 
     def set_colors(self):
+        from .color_thief import ColorThiefFromImage  # deferred, pulls in colorthief and PIL
+
         try:
             colors = ColorThiefFromImage(self.native_jpeg_cache.readonly_image).get_palette(color_count=5)
         except Exception as err:
@@ -1,26 +1,41 @@
+import functools
+import io
 import logging
 import os.path
 
-import PIL.Image
-import PIL.ImageDraw
-import PIL.ImageFont
-
 font_path = os.path.join(os.path.dirname(__file__), '..', '..', '..', 'fonts', 'OpenSans-Regular.ttf')
 logger = logging.getLogger()
 
 
+@functools.lru_cache(maxsize=None)
+def read_font_file():
+    "The font file's contents, read from disk once per process"
+    with open(font_path, 'rb') as fh:
+        return fh.read()
+
+
+@functools.lru_cache(maxsize=32)
+def load_font(size):
+    "The font at the given size, ready to draw with"
+    import PIL.ImageFont
+
+    return PIL.ImageFont.truetype(io.BytesIO(read_font_file()), size=size)
+
+
 def generate_text_image(text, dimensions, font_size=None):
     "Generate an image with text nicely wrapped and centered"
     assert text, 'Must be called with some text to render'
 
+    # the image libraries are slow to import, so only lambdas that actually render text pay for them
+    import PIL.Image
+    import PIL.ImageDraw
+
     image_width, image_height = dimensions
     image_aspect_ratio = image_width / image_height
     img = PIL.Image.new('RGB', dimensions)
 
     font_size = font_size or image_height // 10
-
-    with open(font_path, 'rb') as fh:
-        font = PIL.ImageFont.truetype(fh, size=font_size)
+    font = load_font(font_size)
 
     # we want our text to match, more or less, the aspect ratio of the overall image
     draw = PIL.ImageDraw.Draw(img)
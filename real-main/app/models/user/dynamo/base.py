@@ -26,6 +26,9 @@ class UserDynamo:
     def get_user(self, user_id, strongly_consistent=False):
         return self.client.get_item(self.pk(user_id), ConsistentRead=strongly_consistent)
 
+    def get_users(self, user_ids):
+        return self.client.get_many(self.pk(user_id) for user_id in user_ids)
+
     def get_user_by_username(self, username):
         query_kwargs = {
             'KeyConditionExpression': Key('gsiA1PartitionKey').eq(f'username/{username}'),
@@ -264,88 +267,88 @@ class UserDynamo:
         return self.client.update_item(query_kwargs, failure_warning=failure_warning)
 
     def increment_album_count(self, user_id):
-        return self.client.increment_count(self.pk(user_id), 'albumCount')
+        return self.client.increment_count(self.pk(user_id), 'albumCount', deferrable=True)
 
     def decrement_album_count(self, user_id):
-        return self.client.decrement_count(self.pk(user_id), 'albumCount')
+        return self.client.decrement_count(self.pk(user_id), 'albumCount', deferrable=True)
 
     def increment_card_count(self, user_id):
-        return self.client.increment_count(self.pk(user_id), 'cardCount')
+        return self.client.increment_count(self.pk(user_id), 'cardCount', deferrable=True)
 
     def decrement_card_count(self, user_id):
-        return self.client.decrement_count(self.pk(user_id), 'cardCount')
+        return self.client.decrement_count(self.pk(user_id), 'cardCount', deferrable=True)
 
     def increment_chat_count(self, user_id):
-        return self.client.increment_count(self.pk(user_id), 'chatCount')
+        return self.client.increment_count(self.pk(user_id), 'chatCount', deferrable=True)
 
     def decrement_chat_count(self, user_id):
-        return self.client.decrement_count(self.pk(user_id), 'chatCount')
+        return self.client.decrement_count(self.pk(user_id), 'chatCount', deferrable=True)
 
     def increment_chat_messages_creation_count(self, user_id):
-        return self.client.increment_count(self.pk(user_id), 'chatMessagesCreationCount')
+        return self.client.increment_count(self.pk(user_id), 'chatMessagesCreationCount', deferrable=True)
 
     def increment_chat_messages_deletion_count(self, user_id):
-        return self.client.increment_count(self.pk(user_id), 'chatMessagesDeletionCount')
+        return self.client.increment_count(self.pk(user_id), 'chatMessagesDeletionCount', deferrable=True)
 
     def increment_chat_messages_forced_deletion_count(self, user_id):
-        return self.client.increment_count(self.pk(user_id), 'chatMessagesForcedDeletionCount')
+        return self.client.increment_count(self.pk(user_id), 'chatMessagesForcedDeletionCount', deferrable=True)
 
     def increment_chats_with_unviewed_messages_count(self, user_id):
-        return self.client.increment_count(self.pk(user_id), 'chatsWithUnviewedMessagesCount')
+        return self.client.increment_count(self.pk(user_id), 'chatsWithUnviewedMessagesCount', deferrable=True)
 
     def decrement_chats_with_unviewed_messages_count(self, user_id):
-        return self.client.decrement_count(self.pk(user_id), 'chatsWithUnviewedMessagesCount')
+        return self.client.decrement_count(self.pk(user_id), 'chatsWithUnviewedMessagesCount', deferrable=True)
 
     def increment_comment_count(self, user_id):
-        return self.client.increment_count(self.pk(user_id), 'commentCount')
+        return self.client.increment_count(self.pk(user_id), 'commentCount', deferrable=True)
 
     def decrement_comment_count(self, user_id):
-        return self.client.decrement_count(self.pk(user_id), 'commentCount')
+        return self.client.decrement_count(self.pk(user_id), 'commentCount', deferrable=True)
 
     def increment_comment_deleted_count(self, user_id):
-        return self.client.increment_count(self.pk(user_id), 'commentDeletedCount')
+        return self.client.increment_count(self.pk(user_id), 'commentDeletedCount', deferrable=True)
 
     def increment_comment_forced_deletion_count(self, user_id):
-        return self.client.increment_count(self.pk(user_id), 'commentForcedDeletionCount')
+        return self.client.increment_count(self.pk(user_id), 'commentForcedDeletionCount', deferrable=True)
 
     def increment_followed_count(self, user_id):
-        return self.client.increment_count(self.pk(user_id), 'followedCount')
+        return self.client.increment_count(self.pk(user_id), 'followedCount', deferrable=True)
 
     def decrement_followed_count(self, user_id):
-        return self.client.decrement_count(self.pk(user_id), 'followedCount')
+        return self.client.decrement_count(self.pk(user_id), 'followedCount', deferrable=True)
 
     def increment_follower_count(self, user_id):
-        return self.client.increment_count(self.pk(user_id), 'followerCount')
+        return self.client.increment_count(self.pk(user_id), 'followerCount', deferrable=True)
 
     def decrement_follower_count(self, user_id):
-        return self.client.decrement_count(self.pk(user_id), 'followerCount')
+        return self.client.decrement_count(self.pk(user_id), 'followerCount', deferrable=True)
 
     def increment_followers_requested_count(self, user_id):
-        return self.client.increment_count(self.pk(user_id), 'followersRequestedCount')
+        return self.client.increment_count(self.pk(user_id), 'followersRequestedCount', deferrable=True)
 
     def decrement_followers_requested_count(self, user_id):
-        return self.client.decrement_count(self.pk(user_id), 'followersRequestedCount')
+        return self.client.decrement_count(self.pk(user_id), 'followersRequestedCount', deferrable=True)
 
     def increment_post_count(self, user_id):
-        return self.client.increment_count(self.pk(user_id), 'postCount')
+        return self.client.increment_count(self.pk(user_id), 'postCount', deferrable=True)
 
     def decrement_post_count(self, user_id):
-        return self.client.decrement_count(self.pk(user_id), 'postCount')
+        return self.client.decrement_count(self.pk(user_id), 'postCount', deferrable=True)
 
     def increment_post_archived_count(self, user_id):
-        return self.client.increment_count(self.pk(user_id), 'postArchivedCount')
+        return self.client.increment_count(self.pk(user_id), 'postArchivedCount', deferrable=True)
 
     def decrement_post_archived_count(self, user_id):
-        return self.client.decrement_count(self.pk(user_id), 'postArchivedCount')
+        return self.client.decrement_count(self.pk(user_id), 'postArchivedCount', deferrable=True)
 
     def increment_post_deleted_count(self, user_id):
-        return self.client.increment_count(self.pk(user_id), 'postDeletedCount')
+        return self.client.increment_count(self.pk(user_id), 'postDeletedCount', deferrable=True)
 
     def increment_post_forced_archiving_count(self, user_id):
-        return self.client.increment_count(self.pk(user_id), 'postForcedArchivingCount')
+        return self.client.increment_count(self.pk(user_id), 'postForcedArchivingCount', deferrable=True)
 
     def increment_post_viewed_by_count(self, user_id):
-        return self.client.increment_count(self.pk(user_id), 'postViewedByCount')
+        return self.client.increment_count(self.pk(user_id), 'postViewedByCount', deferrable=True)
 
     def add_user_deleted(self, user_id, now=None):
         now = now or pendulum.now('utc')
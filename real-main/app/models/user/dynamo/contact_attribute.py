@@ -27,9 +27,7 @@ class UserContactAttributeDynamo:
 
     def delete(self, attr, user_id):
         kwargs = {
-            'Key': self.key(attr),
             'ConditionExpression': 'attribute_not_exists(userId) OR userId = :uid',
             'ExpressionAttributeValues': {':uid': user_id},
-            'ReturnValues': 'ALL_OLD',
         }
-        return self.client.table.delete_item(**kwargs).get('Attributes') or None
+        return self.client.delete_item(self.key(attr), **kwargs)
@@ -1,3 +1,4 @@
+import collections
 import logging
 import os
 import random
@@ -44,7 +45,7 @@ class UserManager(TrendingManagerMixin, ManagerBase):
 
     def __init__(self, clients, managers=None, placeholder_photos_directory=S3_PLACEHOLDER_PHOTOS_DIRECTORY):
         super().__init__(clients, managers=managers)
-        managers = managers or {}
+        managers = {} if managers is None else managers
         managers['user'] = self
         self.album_manager = managers.get('album') or models.AlbumManager(clients, managers=managers)
         self.block_manager = managers.get('block') or models.BlockManager(clients, managers=managers)
@@ -78,6 +79,11 @@ class UserManager(TrendingManagerMixin, ManagerBase):
         user_item = self.dynamo.get_user(user_id, strongly_consistent=strongly_consistent)
         return self.init_user(user_item) if user_item else None
 
+    def get_users(self, user_ids):
+        "Get many users in batch requests. Returned in the order of `user_ids`, with None for any DNE."
+        user_items = self.dynamo.get_users(user_ids)
+        return [self.init_user(user_item) if user_item else None for user_item in user_items]
+
     def get_user_by_username(self, username):
         user_item = self.dynamo.get_user_by_username(username)
         return self.init_user(user_item) if user_item else None
@@ -245,12 +251,22 @@ class UserManager(TrendingManagerMixin, ManagerBase):
         )
 
     def on_comment_add(self, comment_id, new_item):
-        self.dynamo.increment_comment_count(new_item['userId'])
+        self.on_comments_change_sync_counts([(comment_id, None, new_item)])
 
     def on_comment_delete(self, comment_id, old_item):
-        user_id = old_item['userId']
-        self.dynamo.decrement_comment_count(user_id)
-        self.dynamo.increment_comment_deleted_count(user_id)
+        self.on_comments_change_sync_counts([(comment_id, old_item, None)])
+
+    def on_comments_change_sync_counts(self, records):
+        "Batch listener. Applies the net change to the comment counts of each user, with one write per counter."
+        deltas = collections.Counter()
+        for _, old_item, new_item in records:
+            if new_item:
+                deltas[(new_item['userId'], 'commentCount')] += 1
+            if old_item:
+                deltas[(old_item['userId'], 'commentCount')] -= 1
+                deltas[(old_item['userId'], 'commentDeletedCount')] += 1
+        for (user_id, attribute_name), delta in deltas.items():
+            self.dynamo.client.add_count(self.dynamo.pk(user_id), attribute_name, delta, deferrable=True)
 
     def on_card_add_increment_count(self, card_id, new_item):
         card = self.card_manager.init_card(new_item)
@@ -6,7 +6,8 @@ import stringcase
 
 from app.mixins.trending.model import TrendingModelMixin
 from app.models.post.enums import PostStatus, PostType
-from app.utils import image_size
+from app.utils import gather, image_size
+from app.utils.selection_set import is_selected
 
 from .enums import UserPrivacyStatus, UserStatus, UserSubscriptionLevel
 from .exceptions import UserException, UserValidationException, UserVerificationException
@@ -30,6 +31,42 @@ class User(TrendingModelMixin):
     item_type = 'user'
     subscription_bonus_duration = pendulum.duration(months=3)
 
+    # fields of the User graphql type whose resolvers read these serialized fields off their source,
+    # as found in mapping-templates/User.<field>.request.vtl
+    serialized_field_dependents = {
+        'blockerStatus': [
+            'albumCount',
+            'albums',
+            'bio',
+            'followedCount',
+            'followedUsers',
+            'followedsCount',
+            'followerCount',
+            'followerUsers',
+            'followersCount',
+            'likedPosts',
+            'postCount',
+            'posts',
+            'stories',
+            'subscriptionLevel',
+            'themeCode',
+            'userStatus',
+        ],
+        'followedStatus': [
+            'albumCount',
+            'albums',
+            'bio',
+            'followedCount',
+            'followedUsers',
+            'followedsCount',
+            'followerCount',
+            'followerUsers',
+            'followersCount',
+            'posts',
+            'stories',
+        ],
+    }
+
     def __init__(
         self,
         user_item,
@@ -86,10 +123,16 @@ class User(TrendingModelMixin):
         return self.item.get('subscriptionLevel', UserSubscriptionLevel.BASIC)
 
     def get_photo_path(self, size, photo_post_id=None):
+        photo_path_prefix = self.get_photo_path_prefix(photo_post_id=photo_post_id)
+        if not photo_path_prefix:
+            return None
+        return '/'.join([photo_path_prefix, size.filename])
+
+    def get_photo_path_prefix(self, photo_post_id=None):
         photo_post_id = photo_post_id or self.item.get('photoPostId')
         if not photo_post_id:
             return None
-        return '/'.join([self.id, 'profile-photo', photo_post_id, size.filename])
+        return '/'.join([self.id, 'profile-photo', photo_post_id])
 
     def get_placeholder_photo_path(self, size):
         code = self.item.get('placeholderPhotoCode')
@@ -106,6 +149,14 @@ class User(TrendingModelMixin):
             return f'https://{self.frontend_resources_domain}/{placeholder_path}'
         return None
 
+    def get_photo_urls(self, sizes):
+        "Same as get_photo_url() for many sizes, in one call"
+        photo_path_prefix = self.get_photo_path_prefix()
+        if photo_path_prefix:
+            filenames = [size.filename for size in sizes]
+            return self.cloudfront_client.generate_presigned_urls(photo_path_prefix, filenames, ['GET', 'HEAD'])
+        return [self.get_photo_url(size) for size in sizes]
+
     def is_forced_disabling_criteria_met_by_chat_messages(self):
         # matching post criteria
         total_count = self.item.get('chatMessagesCreationCount', 0)
@@ -130,11 +181,20 @@ class User(TrendingModelMixin):
         self.item = self.dynamo.get_user(self.id, strongly_consistent=strongly_consistent)
         return self
 
-    def serialize(self, caller_user_id):
+    def serialize(self, caller_user_id, selection_set=None):
+        "Fields that need reads of their own are only included if selected, or needed by a selected field"
         assert self.item
         resp = self.item.copy()
-        resp['blockerStatus'] = self.block_manager.get_block_status(self.id, caller_user_id)
-        resp['followedStatus'] = self.follower_manager.get_follow_status(caller_user_id, self.id)
+        getters = {
+            'blockerStatus': lambda: self.block_manager.get_block_status(self.id, caller_user_id),
+            'followedStatus': lambda: self.follower_manager.get_follow_status(caller_user_id, self.id),
+        }
+        fields = [
+            field
+            for field in getters
+            if is_selected(selection_set, field, *self.serialized_field_dependents[field])
+        ]
+        resp.update(zip(fields, gather(*(getters[field] for field in fields))))
         return resp
 
     def enable(self):
@@ -1,4 +1,6 @@
 __all__ = [
+    'gather',
     'GqlNotificationType',
 ]
+from .futures import gather
 from .gql_notification_type import GqlNotificationType
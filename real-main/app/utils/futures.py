@@ -0,0 +1,57 @@
+import contextvars
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+# boto3 clients are thread safe and dynamo reads are I/O bound, so a small pool goes a long way
+MAX_WORKERS = int(os.environ.get('GATHER_MAX_WORKERS') or 8)
+
+_executor = None
+_executor_lock = threading.Lock()
+_pool_thread = threading.local()
+
+
+def get_executor():
+    "The thread pool shared by the model layer, created on first use and kept for the life of the container"
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(max_workers=MAX_WORKERS, initializer=_mark_pool_thread)
+    return _executor
+
+
+def _mark_pool_thread():
+    _pool_thread.active = True
+
+
+def gather(*funcs, executor=None):
+    """
+    Call each of the given no-argument callables concurrently and return a list of their results, in order.
+    Meant for independent reads, ex: `block_status, follow_status = gather(lambda: ..., lambda: ...)`.
+
+    The first callable runs in the calling thread, the rest on the shared thread pool, or on `executor` if given.
+    If any of them raise, the exception of the first (in argument order) to have raised is re-raised, once all
+    have completed. Calls made from a thread of the shared pool run sequentially, so nesting cannot deadlock it.
+    Each callable run on the pool sees a copy of the calling thread's context variables.
+    """
+    if len(funcs) < 2 or (executor is None and getattr(_pool_thread, 'active', False)):
+        return [func() for func in funcs]
+
+    executor = executor or get_executor()
+    futures = [executor.submit(contextvars.copy_context().run, func) for func in funcs[1:]]
+    results, errors = [], []
+    try:
+        results.append(funcs[0]())
+    except Exception as err:
+        results.append(None)
+        errors.append(err)
+    for future in futures:
+        try:
+            results.append(future.result())
+        except Exception as err:
+            results.append(None)
+            errors.append(err)
+    if errors:
+        raise errors[0]
+    return results
@@ -0,0 +1,22 @@
+"""
+Helpers for the graphql selection sets that AppSync passes to lambda resolvers as `info.selectionSetList`,
+ex: `['userId', 'postedBy', 'postedBy/userId']`. A selection set of None selects everything.
+"""
+
+
+def is_selected(selection_set, *fields):
+    "Is any of `fields` selected?"
+    return selection_set is None or any(field in selection_set for field in fields)
+
+
+def sub_selection(selection_set, *fields):
+    "The selection set nested under any of `fields`"
+    if selection_set is None:
+        return None
+    prefixes = tuple(f'{field}/' for field in fields)
+    return [
+        selection[len(prefix) :]
+        for selection in selection_set
+        for prefix in prefixes
+        if selection.startswith(prefix)
+    ]
@@ -1,4 +1,13 @@
+import base64
+import json
 import urllib
+from unittest.mock import patch
+
+import pendulum
+from cryptography.exceptions import InvalidSignature
+from cryptography.hazmat.primitives.asymmetric.padding import PKCS1v15
+from cryptography.hazmat.primitives.hashes import SHA1
+from cryptography.hazmat.primitives.serialization import load_der_public_key
 
 from app.clients import CloudFrontClient
 
@@ -64,3 +73,106 @@ def test_generate_presigned_url():
     parsed_qs = urllib.parse.parse_qs(parsed.query)
     assert set(parsed_qs.keys()) == set(['Method', 'Expires', 'Key-Pair-Id', 'Signature'])
     assert set(parsed_qs['Method']) == set(methods)
+
+
+def test_generate_presigned_url_expires_at_end_of_window():
+    client = CloudFrontClient(get_key_pair, domain='d.cloudfront.net')
+    now = pendulum.datetime(2020, 6, 1, 7, 30, tz='utc')
+    assert client.get_expires_at(now=now) == pendulum.datetime(2020, 6, 3, 12, tz='utc')
+    assert client.get_expires_at(now=now.add(hours=4, minutes=29)) == pendulum.datetime(2020, 6, 3, 12, tz='utc')
+    assert client.get_expires_at(now=now.add(hours=4, minutes=30)) == pendulum.datetime(2020, 6, 3, 18, tz='utc')
+
+    signed_url = client.generate_presigned_url('uid/mid', ['GET'])
+    expires = int(urllib.parse.parse_qs(urllib.parse.urlparse(signed_url).query)['Expires'][0])
+    assert expires == client.get_expires_at().int_timestamp
+
+
+def test_generate_presigned_url_cache():
+    client = CloudFrontClient(get_key_pair, domain='d.cloudfront.net')
+    url = client.generate_presigned_url('uid/mid', ['GET', 'HEAD'])
+
+    # same path and methods within the window, same url without signing again
+    with patch.object(client, 'sign_url') as sign_url_mock:
+        assert client.generate_presigned_url('uid/mid', ['GET', 'HEAD']) == url
+    assert sign_url_mock.call_count == 0
+
+    # different methods or path are signed separately
+    assert client.generate_presigned_url('uid/mid', ['GET']) != url
+    assert client.generate_presigned_url('uid/other', ['GET', 'HEAD']) != url
+
+    # an explicit expires_at is always signed
+    expires_at = pendulum.now('utc') + pendulum.duration(hours=1)
+    with patch.object(client, 'sign_url', return_value='signed') as sign_url_mock:
+        assert client.generate_presigned_url('uid/mid', ['GET', 'HEAD'], expires_at=expires_at) == 'signed'
+    assert sign_url_mock.call_count == 1
+
+    # once the window moves on, the url is signed again
+    next_expires_at = client.get_expires_at() + client.expiry_window
+    with patch.object(client, 'get_expires_at', return_value=next_expires_at):
+        new_url = client.generate_presigned_url('uid/mid', ['GET', 'HEAD'])
+    assert new_url != url
+    assert f'Expires={next_expires_at.int_timestamp}' in new_url
+
+
+def test_generate_presigned_url_cache_is_lru():
+    client = CloudFrontClient(get_key_pair, domain='d.cloudfront.net')
+    client.url_cache_size = 2
+    client.generate_presigned_url('p1', ['GET'])
+    client.generate_presigned_url('p2', ['GET'])
+    client.generate_presigned_url('p1', ['GET'])
+    client.generate_presigned_url('p3', ['GET'])
+    assert list(client.url_cache) == [('p1', ('GET',)), ('p3', ('GET',))]
+
+
+def test_generate_presigned_urls():
+    client = CloudFrontClient(get_key_pair, domain='d.cloudfront.net')
+    urls = client.generate_presigned_urls('uid/post/pid/image', ['native.jpg', '64p.jpg'], ['GET', 'HEAD'])
+    assert urls == [
+        client.generate_presigned_url('uid/post/pid/image/native.jpg', ['GET', 'HEAD']),
+        client.generate_presigned_url('uid/post/pid/image/64p.jpg', ['GET', 'HEAD']),
+    ]
+
+    # each url has its own canned signature, served from the cache within the window
+    parsed_qs = [urllib.parse.parse_qs(urllib.parse.urlparse(url).query) for url in urls]
+    assert set(parsed_qs[0].keys()) == set(['Method', 'Expires', 'Key-Pair-Id', 'Signature'])
+    assert parsed_qs[0]['Signature'] != parsed_qs[1]['Signature']
+    with patch.object(client, 'sign_url') as sign_url_mock:
+        assert client.generate_presigned_urls('uid/post/pid/image', ['64p.jpg'], ['GET', 'HEAD']) == urls[1:]
+    assert sign_url_mock.call_count == 0
+
+
+def verify_canned_signature(url):
+    "Verify a presigned url as cloudfront does, against the canned policy for the url without its signature"
+    parsed = urllib.parse.urlparse(url)
+    params = urllib.parse.parse_qsl(parsed.query)
+    signed = dict(params)
+    unsigned_qs = urllib.parse.urlencode(
+        [(k, v) for k, v in params if k not in ('Expires', 'Signature', 'Key-Pair-Id')]
+    )
+    resource = parsed._replace(query=unsigned_qs).geturl()
+    policy = json.dumps(
+        {
+            'Statement': [
+                {'Resource': resource, 'Condition': {'DateLessThan': {'AWS:EpochTime': int(signed['Expires'])}}}
+            ]
+        },
+        separators=(',', ':'),
+    ).encode('utf-8')
+    signature = base64.b64decode(signed['Signature'].replace('-', '+').replace('_', '=').replace('~', '/'))
+    public_key = load_der_public_key(base64.b64decode(testing_only_key_pair['publicKey']))
+    try:
+        public_key.verify(signature, policy, PKCS1v15(), SHA1())
+    except InvalidSignature:
+        return False
+    return True
+
+
+def test_read_url_cannot_be_turned_into_write_url():
+    client = CloudFrontClient(get_key_pair, domain='d.cloudfront.net')
+    url = client.generate_presigned_urls('uid/post/pid/image', ['native.jpg'], ['GET', 'HEAD'])[0]
+    assert verify_canned_signature(url)
+
+    write_url = url.replace('Method=GET&Method=HEAD', 'Method=PUT')
+    assert write_url != url
+    assert not verify_canned_signature(write_url)
+    assert not verify_canned_signature(url.replace('Method=GET&Method=HEAD', 'Method=GET&Method=HEAD&Method=PUT'))
@@ -0,0 +1,626 @@
+import threading
+from unittest import mock
+
+import pytest
+
+from app.utils import gather
+
+
+@pytest.fixture
+def item(dynamo_client):
+    item = {'partitionKey': 'pk', 'sortKey': 'sk', 'cnt': 1}
+    dynamo_client.add_item({'Item': dict(item)})
+    yield item
+
+
+def test_table_per_thread(dynamo_client, item):
+    # boto3 resources are not thread safe, so each thread reads through its own
+    tables = gather(lambda: dynamo_client.table, lambda: dynamo_client.table)
+    assert tables[0] is dynamo_client.table
+    assert tables[1] is not tables[0]
+    assert tables[1].table_name == dynamo_client.table_name
+
+    key = {k: item[k] for k in ('partitionKey', 'sortKey')}
+    assert gather(lambda: dynamo_client.get_item(key), lambda: dynamo_client.get_item(key)) == [item, item]
+
+
+def test_register_event_on_table_of_every_thread(dynamo_client, item):
+    key = {k: item[k] for k in ('partitionKey', 'sortKey')}
+    operations = []
+    # a pool thread that already has its table, and one that does not yet
+    gather(lambda: None, lambda: dynamo_client.table)
+    dynamo_client.register_event('before-call.dynamodb', lambda model, **kwargs: operations.append(model.name))
+
+    barrier = threading.Barrier(3, timeout=5)
+
+    def get_item():
+        barrier.wait()
+        return dynamo_client.get_item(key)
+
+    assert gather(get_item, get_item, get_item) == [item, item, item]
+    dynamo_client.get_typed_item({'partitionKey': {'S': 'pk'}, 'sortKey': {'S': 'sk'}})
+    assert operations == ['GetItem'] * 4
+
+
+def test_item_cache_disabled_by_default(dynamo_client, item):
+    assert dynamo_client.cache is None
+    dynamo_client.table = mock.Mock(wraps=dynamo_client.table)
+    key = {k: item[k] for k in ('partitionKey', 'sortKey')}
+    assert dynamo_client.get_item(key) == item
+    assert dynamo_client.get_item(key) == item
+    assert dynamo_client.table.get_item.call_count == 2
+
+
+def test_item_cache_read_through(dynamo_client, item):
+    dynamo_client.table = mock.Mock(wraps=dynamo_client.table)
+    key = {k: item[k] for k in ('partitionKey', 'sortKey')}
+    missing_key = {'partitionKey': 'pk', 'sortKey': 'nope'}
+    with dynamo_client.item_cache():
+        assert dynamo_client.get_item(key) == item
+        assert dynamo_client.get_item(key) == item
+        assert dynamo_client.get_item(missing_key) is None
+        assert dynamo_client.get_item(missing_key) is None
+        assert dynamo_client.table.get_item.call_count == 2
+
+        # cached items are copies, so mutating them does not corrupt the cache
+        dynamo_client.get_item(key)['cnt'] = 42
+        assert dynamo_client.get_item(key) == item
+
+        # strongly consistent reads bypass the cache
+        assert dynamo_client.get_item(key, ConsistentRead=True) == item
+        assert dynamo_client.table.get_item.call_count == 3
+
+    # cache is dropped on exit
+    assert dynamo_client.cache is None
+    assert dynamo_client.get_item(key) == item
+    assert dynamo_client.table.get_item.call_count == 4
+
+
+def test_item_cache_nested_contexts_share_cache(dynamo_client, item):
+    with dynamo_client.item_cache() as outer_cache:
+        with dynamo_client.item_cache() as inner_cache:
+            assert inner_cache is outer_cache
+        assert dynamo_client.cache is outer_cache
+    assert dynamo_client.cache is None
+
+
+def test_item_cache_refreshed_by_writes(dynamo_client, item):
+    key = {k: item[k] for k in ('partitionKey', 'sortKey')}
+    with dynamo_client.item_cache():
+        assert dynamo_client.get_item(key)['cnt'] == 1
+
+        dynamo_client.set_attributes(key, cnt=2)
+        assert dynamo_client.get_item(key)['cnt'] == 2
+
+        dynamo_client.increment_count(key, 'cnt')
+        assert dynamo_client.get_item(key)['cnt'] == 3
+
+        query_kwargs = {
+            'Key': key,
+            'UpdateExpression': 'SET #v = :v',
+            'ExpressionAttributeNames': {'#v': 'cnt'},
+            'ExpressionAttributeValues': {':v': 4},
+        }
+        dynamo_client.update_item(query_kwargs)
+        assert dynamo_client.get_item(key)['cnt'] == 4
+
+        dynamo_client.delete_item(key)
+        assert dynamo_client.get_item(key) is None
+
+        dynamo_client.add_item({'Item': {**key, 'cnt': 5}})
+        assert dynamo_client.get_item(key)['cnt'] == 5
+
+        transact = {
+            'Update': {
+                'Key': {'partitionKey': {'S': 'pk'}, 'sortKey': {'S': 'sk'}},
+                'UpdateExpression': 'SET #v = :v',
+                'ExpressionAttributeNames': {'#v': 'cnt'},
+                'ExpressionAttributeValues': {':v': {'N': '6'}},
+            }
+        }
+        dynamo_client.transact_write_items([transact])
+        assert dynamo_client.get_item(key)['cnt'] == 6
+
+        dynamo_client.batch_delete_items([key])
+        assert dynamo_client.get_item(key) is None
+
+        assert dynamo_client.put_item({**key, 'cnt': 7}) == {**key, 'cnt': 7}
+        assert dynamo_client.get_item(key)['cnt'] == 7
+        dynamo_client.put_item({**key, 'cnt': 8})
+        assert dynamo_client.get_item(key)['cnt'] == 8
+
+
+def test_item_cache_batch_get_items(dynamo_client, item):
+    dynamo_client.boto3_client = mock.Mock(wraps=dynamo_client.boto3_client)
+    key = {k: item[k] for k in ('partitionKey', 'sortKey')}
+    typed_key = {'partitionKey': {'S': 'pk'}, 'sortKey': {'S': 'sk'}}
+    typed_missing_key = {'partitionKey': {'S': 'pk'}, 'sortKey': {'S': 'nope'}}
+    typed_item = {'partitionKey': {'S': 'pk'}, 'sortKey': {'S': 'sk'}, 'cnt': {'N': '1'}}
+    with dynamo_client.item_cache():
+        assert dynamo_client.batch_get_items([typed_key, typed_missing_key]) == [typed_item]
+        assert dynamo_client.boto3_client.batch_get_item.call_count == 1
+
+        # everything now served from the cache, including the miss
+        assert dynamo_client.batch_get_items([typed_key, typed_missing_key]) == [typed_item]
+        assert dynamo_client.get_item(key) == item
+        assert dynamo_client.boto3_client.batch_get_item.call_count == 1
+
+        # projections bypass the cache
+        resp = dynamo_client.batch_get_items([typed_key], projection_expression='sortKey')
+        assert resp == [{'sortKey': {'S': 'sk'}}]
+        assert dynamo_client.boto3_client.batch_get_item.call_count == 2
+
+
+def test_get_many_order_misses_and_chunking(dynamo_client):
+    keys = [{'partitionKey': f'pk/{i}', 'sortKey': '-'} for i in range(250)]
+    dynamo_client.batch_put_items({**key, 'cnt': i} for i, key in enumerate(keys) if i % 3)
+    dynamo_client.boto3_client = mock.Mock(wraps=dynamo_client.boto3_client)
+
+    items = dynamo_client.get_many(keys + keys[:2])
+    assert dynamo_client.boto3_client.batch_get_item.call_count == 3
+    assert len(items) == 252
+    for i, (key, item) in enumerate(zip(keys, items)):
+        assert item == ({**key, 'cnt': i} if i % 3 else None)
+    assert items[250] is None
+    assert items[251] == items[1]
+    assert items[251] is not items[1]
+
+    # with a projection
+    items = dynamo_client.get_many(keys[:3], projection_expression='cnt')
+    assert items == [None, {**keys[1], 'cnt': 1}, {**keys[2], 'cnt': 2}]
+
+    # nothing requested, nothing fetched
+    assert dynamo_client.get_many([]) == []
+    assert dynamo_client.boto3_client.batch_get_item.call_count == 4
+
+
+def test_get_many_consistent_read(dynamo_client, item):
+    key = {k: item[k] for k in ('partitionKey', 'sortKey')}
+    dynamo_client.boto3_client = mock.Mock(wraps=dynamo_client.boto3_client)
+    with dynamo_client.item_cache():
+        assert dynamo_client.get_many([key]) == [item]
+        assert dynamo_client.get_many([key]) == [item]
+        assert dynamo_client.boto3_client.batch_get_item.call_count == 1
+
+        # strongly consistent reads bypass the cache
+        assert dynamo_client.get_many([key], consistent_read=True) == [item]
+        assert dynamo_client.boto3_client.batch_get_item.call_count == 2
+    request = dynamo_client.boto3_client.batch_get_item.call_args.kwargs['RequestItems'][dynamo_client.table_name]
+    assert request['ConsistentRead'] is True
+
+
+def test_generate_many(dynamo_client):
+    keys = [{'partitionKey': f'pk/{i}', 'sortKey': '-'} for i in range(150)]
+    dynamo_client.batch_put_items({**key, 'cnt': i} for i, key in enumerate(keys) if i != 120)
+    dynamo_client.boto3_client = mock.Mock(wraps=dynamo_client.boto3_client)
+
+    generator = dynamo_client.generate_many(key for key in keys)
+    assert dynamo_client.boto3_client.batch_get_item.call_count == 0
+    assert next(generator) == {**keys[0], 'cnt': 0}
+    assert dynamo_client.boto3_client.batch_get_item.call_count == 1
+
+    items = list(generator)
+    assert dynamo_client.boto3_client.batch_get_item.call_count == 2
+    assert len(items) == 149
+    assert items[119] is None
+    assert items[-1] == {**keys[-1], 'cnt': 149}
+
+
+def test_batch_get_items_retries_unprocessed_keys(dynamo_client):
+    typed_keys = [{'partitionKey': {'S': f'pk/{i}'}, 'sortKey': {'S': '-'}} for i in range(3)]
+    typed_items = [{**typed_key, 'cnt': {'N': '1'}} for typed_key in typed_keys]
+    dynamo_client.boto3_client = mock.Mock(dynamo_client.boto3_client)
+    dynamo_client.boto3_client.batch_get_item.side_effect = [
+        {
+            'Responses': {'main-table': typed_items[:1]},
+            'UnprocessedKeys': {'main-table': {'Keys': typed_keys[1:]}},
+        },
+        {
+            'Responses': {'main-table': typed_items[1:2]},
+            'UnprocessedKeys': {'main-table': {'Keys': typed_keys[2:]}},
+        },
+        {'Responses': {'main-table': typed_items[2:]}, 'UnprocessedKeys': {}},
+    ]
+    with mock.patch('app.clients.dynamo.time.sleep') as sleep:
+        assert dynamo_client.batch_get_items(typed_keys) == typed_items
+    assert sleep.call_count == 2
+    assert dynamo_client.boto3_client.batch_get_item.mock_calls == [
+        mock.call(RequestItems={'main-table': {'Keys': typed_keys}}),
+        mock.call(RequestItems={'main-table': {'Keys': typed_keys[1:]}}),
+        mock.call(RequestItems={'main-table': {'Keys': typed_keys[2:]}}),
+    ]
+
+
+def test_batch_get_items_gives_up_on_unprocessed_keys(dynamo_client):
+    typed_keys = [{'partitionKey': {'S': 'pk'}, 'sortKey': {'S': '-'}}]
+    dynamo_client.boto3_client = mock.Mock(dynamo_client.boto3_client)
+    dynamo_client.boto3_client.batch_get_item.return_value = {
+        'Responses': {},
+        'UnprocessedKeys': {'main-table': {'Keys': typed_keys}},
+    }
+    with mock.patch('app.clients.dynamo.time.sleep'):
+        with pytest.raises(Exception, match='unprocessed keys'):
+            dynamo_client.batch_get_items(typed_keys)
+    assert dynamo_client.boto3_client.batch_get_item.call_count == dynamo_client.batch_get_max_attempts
+
+
+class FakeSegmentTable:
+    "Serves scan pages of {segment: [page_items, ...]}, as moto does not support parallel scans"
+
+    def __init__(self, segment_pages, fail_segment=None):
+        self.segment_pages = segment_pages
+        self.fail_segment = fail_segment
+        self.calls = []
+
+    def scan(self, Segment, TotalSegments, ExclusiveStartKey=None, **kwargs):
+        assert TotalSegments == len(self.segment_pages)
+        self.calls.append((Segment, ExclusiveStartKey))
+        if Segment == self.fail_segment:
+            raise Exception('scan failed')
+        page_num = ExclusiveStartKey['page'] if ExclusiveStartKey else 0
+        resp = {'Items': self.segment_pages[Segment][page_num]}
+        if page_num + 1 < len(self.segment_pages[Segment]):
+            resp['LastEvaluatedKey'] = {'page': page_num + 1}
+        return resp
+
+
+def test_generate_all_query_projection(dynamo_client):
+    items = [{'partitionKey': 'pk', 'sortKey': f'sk/{i}', 'name': f'n{i}', 'cnt': i} for i in range(3)]
+    dynamo_client.batch_put_items(items)
+    query_kwargs = {
+        'KeyConditionExpression': '#pk = :pk',
+        'ExpressionAttributeNames': {'#pk': 'partitionKey'},
+        'ExpressionAttributeValues': {':pk': 'pk'},
+    }
+
+    # no projection
+    assert list(dynamo_client.generate_all_query(query_kwargs)) == items
+
+    # reserved words are escaped, existing attribute names are preserved, duplicates ignored
+    gen = dynamo_client.generate_all_query(query_kwargs, projection=('sortKey', 'name', 'name'))
+    assert list(gen) == [{'sortKey': f'sk/{i}', 'name': f'n{i}'} for i in range(3)]
+    assert query_kwargs['ExpressionAttributeNames'] == {'#pk': 'partitionKey'}
+    assert 'ProjectionExpression' not in query_kwargs
+
+    # attributes the item lacks are simply absent
+    gen = dynamo_client.generate_all_query(query_kwargs, projection=('cnt', 'nope'))
+    assert list(gen) == [{'cnt': i} for i in range(3)]
+
+    resp = dynamo_client.query(dict(query_kwargs), limit=1, projection=('sortKey',))
+    assert resp['items'] == [{'sortKey': 'sk/0'}]
+    assert resp['nextToken']
+
+
+def test_generate_all_scan_projection(dynamo_client):
+    items = [{'partitionKey': f'pk/{i}', 'sortKey': '-', 'cnt': i} for i in range(3)]
+    dynamo_client.batch_put_items(items)
+    gen = dynamo_client.generate_all_scan({}, projection=('partitionKey',))
+    assert sorted(gen, key=str) == [{'partitionKey': f'pk/{i}'} for i in range(3)]
+
+
+def test_generate_all_scan_checkpoint(dynamo_client):
+    items = [{'partitionKey': f'pk/{i}', 'sortKey': '-'} for i in range(3)]
+    dynamo_client.batch_put_items(items)
+
+    checkpoint = {}
+    assert sorted(dynamo_client.generate_all_scan({}, checkpoint=checkpoint), key=str) == items
+    assert checkpoint == {0: None}
+
+    # resuming a completed scan yields nothing
+    assert list(dynamo_client.generate_all_scan({}, checkpoint=checkpoint)) == []
+
+
+def test_generate_parallel_scan(dynamo_client):
+    segment_pages = [
+        [[{'s': 0, 'i': 0}, {'s': 0, 'i': 1}], [{'s': 0, 'i': 2}]],
+        [[]],
+        [[{'s': 2, 'i': 0}], [], [{'s': 2, 'i': 1}]],
+    ]
+    table = FakeSegmentTable(segment_pages)
+    checkpoint = {}
+    with mock.patch.object(dynamo_client, 'segment_table', return_value=table):
+        items = list(dynamo_client.generate_all_scan({}, total_segments=3, max_workers=2, checkpoint=checkpoint))
+    assert sorted(items, key=lambda item: (item['s'], item['i'])) == [
+        {'s': 0, 'i': 0},
+        {'s': 0, 'i': 1},
+        {'s': 0, 'i': 2},
+        {'s': 2, 'i': 0},
+        {'s': 2, 'i': 1},
+    ]
+    assert len(table.calls) == 6
+    assert checkpoint == {0: None, 1: None, 2: None}
+
+
+def test_generate_parallel_scan_resume_from_checkpoint(dynamo_client):
+    segment_pages = [
+        [[{'s': 0, 'i': 0}], [{'s': 0, 'i': 1}]],
+        [[{'s': 1, 'i': 0}], [{'s': 1, 'i': 1}]],
+    ]
+    table = FakeSegmentTable(segment_pages)
+    checkpoint = {0: None, 1: {'page': 1}}
+    with mock.patch.object(dynamo_client, 'segment_table', return_value=table):
+        items = list(dynamo_client.generate_all_scan({}, total_segments=2, checkpoint=checkpoint))
+    assert items == [{'s': 1, 'i': 1}]
+    assert table.calls == [(1, {'page': 1})]
+    assert checkpoint == {0: None, 1: None}
+
+
+def test_generate_parallel_scan_early_exit_and_errors(dynamo_client):
+    segment_pages = [[[{'s': s, 'i': i}] for i in range(50)] for s in range(4)]
+
+    # consumer stops early: workers are blocked by back-pressure and then stopped
+    table = FakeSegmentTable(segment_pages)
+    with mock.patch.object(dynamo_client, 'segment_table', return_value=table):
+        generator = dynamo_client.generate_all_scan({}, total_segments=4, max_workers=2)
+        next(generator)
+        generator.close()
+    assert len(table.calls) < 20
+
+    # worker errors are raised to the consumer
+    table = FakeSegmentTable(segment_pages, fail_segment=3)
+    with mock.patch.object(dynamo_client, 'segment_table', return_value=table):
+        with pytest.raises(Exception, match='scan failed'):
+            list(dynamo_client.generate_all_scan({}, total_segments=4))
+
+
+def test_parallel_batch_put_and_delete(dynamo_client):
+    items = [{'partitionKey': f'pk/{i}', 'sortKey': '-', 'cnt': i} for i in range(110)]
+    assert dynamo_client.batch_put_items((item for item in items), parallel=True) == 110
+    assert sorted(dynamo_client.generate_all_scan({}), key=lambda item: item['cnt']) == items
+
+    assert dynamo_client.batch_delete_items((item for item in items[:60]), parallel=True) == 60
+    assert sorted(dynamo_client.generate_all_scan({}), key=lambda item: item['cnt']) == items[60:]
+
+    assert dynamo_client.batch_delete((item for item in []), parallel=True) == 0
+
+
+def test_parallel_batch_write_retries_unprocessed_items(dynamo_client):
+    dynamo_client.boto3_client = mock.Mock(dynamo_client.boto3_client)
+    key = {'partitionKey': 'pk', 'sortKey': '-'}
+    typed_request = {'DeleteRequest': {'Key': {'partitionKey': {'S': 'pk'}, 'sortKey': {'S': '-'}}}}
+    dynamo_client.boto3_client.batch_write_item.side_effect = [
+        {'UnprocessedItems': {'main-table': [typed_request]}},
+        {'UnprocessedItems': {}},
+    ]
+    with mock.patch('app.clients.dynamo.time.sleep') as sleep:
+        assert dynamo_client.batch_delete([key], parallel=True) == 1
+    assert sleep.call_count == 1
+    assert dynamo_client.boto3_client.batch_write_item.mock_calls == [
+        mock.call(RequestItems={'main-table': [typed_request]}),
+        mock.call(RequestItems={'main-table': [typed_request]}),
+    ]
+
+    # gives up eventually
+    dynamo_client.boto3_client.batch_write_item.side_effect = None
+    dynamo_client.boto3_client.batch_write_item.return_value = {
+        'UnprocessedItems': {'main-table': [typed_request]}
+    }
+    with mock.patch('app.clients.dynamo.time.sleep'):
+        with pytest.raises(Exception, match='unprocessed items'):
+            dynamo_client.batch_delete([key], parallel=True)
+
+
+def test_parallel_batch_write_caps_in_flight_requests(dynamo_client):
+    dynamo_client.batch_write_max_workers = 2
+    generated_cnt, completed_cnt = 0, 0
+
+    def generate_items():
+        nonlocal generated_cnt
+        for i in range(500):
+            generated_cnt += 1
+            yield {'partitionKey': f'pk/{i}', 'sortKey': '-'}
+
+    def batch_write_item(RequestItems):
+        nonlocal completed_cnt
+        # two calls per worker queued or in flight, plus the chunk being assembled
+        assert generated_cnt <= (completed_cnt + 2 * 2 + 1) * 25
+        completed_cnt += 1
+        return {}
+
+    dynamo_client.boto3_client = mock.Mock(dynamo_client.boto3_client)
+    dynamo_client.boto3_client.batch_write_item.side_effect = batch_write_item
+    assert dynamo_client.batch_put_items(generate_items(), parallel=True) == 500
+    assert dynamo_client.boto3_client.batch_write_item.call_count == 20
+
+
+def test_counter_batch_coalesces_deferrable_counts(dynamo_client, item):
+    key = {k: item[k] for k in ('partitionKey', 'sortKey')}
+    dynamo_client.table = mock.Mock(wraps=dynamo_client.table)
+
+    with dynamo_client.counter_batch():
+        for _ in range(100):
+            assert dynamo_client.increment_count(key, 'cnt', deferrable=True) is None
+        with dynamo_client.counter_batch():
+            dynamo_client.decrement_count(key, 'cnt', deferrable=True)
+            dynamo_client.increment_count(key, 'other', deferrable=True)
+            dynamo_client.decrement_count(key, 'other', deferrable=True)
+            assert dynamo_client.add_count(key, 'cnt', 3, deferrable=True) is None
+            dynamo_client.add_count(key, 'cnt', -3, deferrable=True)
+        # non-deferrable counts are written immediately
+        assert dynamo_client.increment_count(key, 'cnt')['cnt'] == 2
+        assert dynamo_client.table.update_item.call_count == 1
+
+    # one write for the net delta of 'cnt', none for the net-zero 'other'
+    assert dynamo_client.table.update_item.call_count == 2
+    assert dynamo_client.get_item(key) == {**item, 'cnt': 101}
+
+    # outside of a batch, deferrable counts are written immediately
+    assert dynamo_client.increment_count(key, 'cnt', deferrable=True)['cnt'] == 102
+
+
+def test_counter_batch_from_several_threads(dynamo_client, item):
+    key = {k: item[k] for k in ('partitionKey', 'sortKey')}
+
+    def increment_many():
+        for _ in range(1000):
+            dynamo_client.increment_count(key, 'cnt', deferrable=True)
+
+    with dynamo_client.counter_batch():
+        gather(*[increment_many] * 4)
+    assert dynamo_client.get_item(key)['cnt'] == 4001
+
+
+def test_counter_call_drops_deltas_of_failed_calls(dynamo_client, item):
+    key = {k: item[k] for k in ('partitionKey', 'sortKey')}
+
+    def increment_then_fail():
+        dynamo_client.increment_count(key, 'cnt', deferrable=True)
+        raise Exception('nope')
+
+    with dynamo_client.counter_batch():
+        with dynamo_client.counter_call():
+            gather(*[lambda: dynamo_client.increment_count(key, 'cnt', deferrable=True)] * 3)
+        with pytest.raises(Exception, match='nope'):
+            with dynamo_client.counter_call():
+                dynamo_client.add_count(key, 'cnt', 10, deferrable=True)
+                gather(lambda: None, increment_then_fail)
+        with dynamo_client.counter_call():
+            # nested calls are merged into the enclosing call
+            with dynamo_client.counter_call():
+                dynamo_client.increment_count(key, 'cnt', deferrable=True)
+            with pytest.raises(Exception, match='nope'):
+                with dynamo_client.counter_call():
+                    increment_then_fail()
+    assert dynamo_client.get_item(key)['cnt'] == 5
+
+    # outside of a batch, counts are written immediately
+    with pytest.raises(Exception, match='nope'):
+        with dynamo_client.counter_call():
+            increment_then_fail()
+    assert dynamo_client.get_item(key)['cnt'] == 6
+
+
+def test_counter_batch_net_decrement_clamps_to_zero(dynamo_client, item, caplog):
+    key = {k: item[k] for k in ('partitionKey', 'sortKey')}
+    missing_key = {'partitionKey': 'pk', 'sortKey': 'nope'}
+
+    with dynamo_client.counter_batch():
+        for _ in range(3):
+            dynamo_client.decrement_count(key, 'cnt', deferrable=True)
+            dynamo_client.increment_count(missing_key, 'cnt', deferrable=True)
+    assert dynamo_client.get_item(key)['cnt'] == 0
+    assert dynamo_client.get_item(missing_key) is None
+    assert len(caplog.records) == 2
+    assert 'clamping to zero' in caplog.records[0].msg
+    assert 'Failed to add 3 to cnt' in caplog.records[1].msg
+
+    # a counter already at zero is left alone
+    caplog.clear()
+    assert dynamo_client.add_count(key, 'cnt', -2) is None
+    assert dynamo_client.get_item(key)['cnt'] == 0
+    assert len(caplog.records) == 2
+    assert 'Failed to decrement cnt' in caplog.records[1].msg
+
+    # a decrement that fits is applied as-is
+    dynamo_client.add_count(key, 'cnt', 5)
+    assert dynamo_client.add_count(key, 'cnt', -4)['cnt'] == 1
+
+
+def typed_increment(pk, sk='-', condition='attribute_exists(partitionKey)'):
+    return {
+        'Update': {
+            'Key': {'partitionKey': {'S': pk}, 'sortKey': {'S': sk}},
+            'UpdateExpression': 'ADD cnt :one',
+            'ExpressionAttributeValues': {':one': {'N': '1'}},
+            'ConditionExpression': condition,
+        }
+    }
+
+
+@pytest.mark.parametrize('parallel', [False, True])
+def test_pipeline_write_items(dynamo_client, parallel):
+    dynamo_client.batch_put_items({'partitionKey': f'pk/{i}', 'sortKey': '-', 'cnt': 0} for i in range(150))
+    dynamo_client.boto3_client = mock.Mock(wraps=dynamo_client.boto3_client)
+
+    # two operations on the same item cannot share a transaction
+    transact_items = [typed_increment(f'pk/{i}') for i in range(150)] + [typed_increment('pk/149')]
+    assert dynamo_client.pipeline_write_items(transact_items, parallel=parallel) == [None] * 151
+    assert dynamo_client.boto3_client.transact_write_items.call_count == 3
+    assert dynamo_client.get_item({'partitionKey': 'pk/0', 'sortKey': '-'})['cnt'] == 1
+    assert dynamo_client.get_item({'partitionKey': 'pk/149', 'sortKey': '-'})['cnt'] == 2
+
+
+def test_pipeline_write_items_maps_failures(dynamo_client):
+    dynamo_client.batch_put_items({'partitionKey': f'pk/{i}', 'sortKey': '-', 'cnt': 0} for i in range(3))
+    transact_items = [
+        typed_increment('pk/0'),
+        typed_increment('pk/nope'),
+        typed_increment('pk/1'),
+        typed_increment('pk/2', condition='cnt > :one'),
+    ]
+    failures = dynamo_client.pipeline_write_items(transact_items)
+    assert failures == [None, 'ConditionalCheckFailed', None, 'ConditionalCheckFailed']
+    assert dynamo_client.get_item({'partitionKey': 'pk/0', 'sortKey': '-'})['cnt'] == 1
+    assert dynamo_client.get_item({'partitionKey': 'pk/1', 'sortKey': '-'})['cnt'] == 1
+    assert dynamo_client.get_item({'partitionKey': 'pk/2', 'sortKey': '-'})['cnt'] == 0
+
+
+def test_transact_write_chunk_retries_contention(dynamo_client):
+    exceptions = dynamo_client.boto3_client.exceptions
+    conflict = exceptions.TransactionCanceledException(
+        {
+            'Error': {'Code': 'TransactionCanceledException', 'Message': 'Transaction cancelled'},
+            'CancellationReasons': [{'Code': 'TransactionConflict'}, {'Code': 'None'}],
+        },
+        'TransactWriteItems',
+    )
+    dynamo_client.boto3_client = mock.Mock(exceptions=exceptions)
+    dynamo_client.boto3_client.transact_write_items.side_effect = [conflict, {}]
+    dynamo_client.backoff = mock.Mock()
+    assert dynamo_client.transact_write_chunk([typed_increment('pk/0'), typed_increment('pk/1')]) == {}
+    assert dynamo_client.boto3_client.transact_write_items.call_count == 2
+    assert dynamo_client.backoff.call_count == 1
+
+    # gives up, eventually
+    dynamo_client.boto3_client.transact_write_items.side_effect = conflict
+    assert dynamo_client.transact_write_chunk([typed_increment('pk/0'), typed_increment('pk/1')]) == {
+        0: 'TransactionConflict',
+        1: 'TransactionConflict',
+    }
+    assert (
+        dynamo_client.boto3_client.transact_write_items.call_count
+        == 2 + dynamo_client.transact_write_max_attempts
+    )
+
+
+def test_tracer_records_calls_by_invocation(dynamo_client, dynamo_tracer, item):
+    key = {k: item[k] for k in ('partitionKey', 'sortKey')}
+    with dynamo_tracer.invocation('first'):
+        dynamo_client.get_item(key)
+        dynamo_client.get_item(key)
+        dynamo_client.get_item(key, ConsistentRead=True)
+        dynamo_client.increment_count(key, 'cnt')
+    with dynamo_tracer.invocation('second'):
+        dynamo_client.query(
+            {'KeyConditionExpression': 'partitionKey = :pk', 'ExpressionAttributeValues': {':pk': 'pk'}}
+        )
+        dynamo_client.get_many([key, {'partitionKey': 'other/pk', 'sortKey': '-'}])
+        dynamo_client.get_item(key)
+    dynamo_client.get_item(key)
+
+    first = dynamo_tracer.calls('first')
+    assert [call['operation'] for call in first] == ['GetItem', 'GetItem', 'GetItem', 'UpdateItem']
+    assert [call['itemCount'] for call in first] == [1, 1, 1, None]
+    assert [call['consistentRead'] for call in first] == [False, False, True, False]
+    assert all(call['keyPrefix'] == ('pk', 'sk') for call in first)
+    assert dynamo_tracer.repeated_get_items('first') == {('main-table', ('pk', 'sk')): 2}
+
+    second = dynamo_tracer.calls('second')
+    assert [call['operation'] for call in second] == ['Query', 'BatchGetItem', 'GetItem']
+    assert [call['itemCount'] for call in second] == [1, 1, 1]
+    assert dynamo_tracer.repeated_get_items('second') == {}
+    assert dynamo_tracer.summary('second') == {
+        ('Query', 'main-table', None, None): 1,
+        ('BatchGetItem', 'main-table', None, None): 1,
+        ('GetItem', 'main-table', None, ('pk', 'sk')): 1,
+    }
+
+    # the PutItem of the `item` fixture and the last GetItem are not in any invocation
+    assert [call['operation'] for call in dynamo_tracer.calls()] == ['PutItem', 'GetItem']
+    assert len(dynamo_tracer.all_calls()) == 9
+
+
+def test_tracer_detached(dynamo_client, item):
+    assert dynamo_client.tracer is None
+    key = {k: item[k] for k in ('partitionKey', 'sortKey')}
+    assert dynamo_client.get_item(key) == item
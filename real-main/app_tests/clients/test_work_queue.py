@@ -0,0 +1,208 @@
+import json
+import time
+from unittest.mock import Mock, patch
+
+import pytest
+
+from app.clients import LocalWorkQueueClient, WorkQueueClient
+
+
+def count_to(limit, cursor=None):
+    "A task function that works one number at a time"
+    cursor = (cursor or 0) + 1
+    counted.append(cursor)
+    return cursor if cursor < limit else None
+
+
+counted = []
+
+
+@pytest.fixture(autouse=True)
+def clear_counted():
+    counted.clear()
+
+
+@pytest.fixture
+def work_queue_client(dynamo_client):
+    client = WorkQueueClient(dynamo_client, queue_url='https://queue-url')
+    client.boto3_client = Mock(**{'send_message_batch.return_value': {'Successful': []}})
+    client.register('count_to', count_to)
+    yield client
+
+
+def sent_tasks(client):
+    return [
+        json.loads(entry['MessageBody'])
+        for call in client.boto3_client.send_message_batch.call_args_list
+        for entry in call.kwargs['Entries']
+    ]
+
+
+def test_local_work_queue_works_tasks_inline():
+    client = LocalWorkQueueClient()
+    client.register('count_to', count_to)
+    assert client.send_tasks([{'name': 'count_to', 'key': 'k', 'args': {'limit': 3}}]) == 1
+    assert counted == [1, 2, 3]
+    assert not client.tasks
+
+
+def test_local_work_queue_deferred():
+    client = LocalWorkQueueClient(deferred=True)
+    client.register('count_to', count_to)
+    client.send_tasks([{'name': 'count_to', 'key': 'k', 'args': {'limit': 2}}])
+    assert counted == []
+    assert len(client.tasks) == 1
+
+    # out of time after the first chunk, so the task is continued from its cursor
+    client.work(deadline=time.monotonic())
+    assert counted == [1]
+    assert list(client.tasks) == [{'name': 'count_to', 'key': 'k', 'args': {'limit': 2}, 'cursor': 1}]
+
+    client.work()
+    assert counted == [1, 2]
+    assert not client.tasks
+
+
+def test_local_work_queue_keeps_order_of_task_split_across_deadline():
+    client = LocalWorkQueueClient(deferred=True)
+    client.register('count_to', count_to)
+    client.send_tasks([{'name': 'count_to', 'key': 'k', 'args': {'limit': 2}}])
+    client.work(deadline=time.monotonic())
+    client.send_tasks([{'name': 'count_to', 'key': 'k', 'args': {'limit': 1}}])
+
+    # the continuation goes ahead of the task sent after it
+    client.work()
+    assert counted == [1, 2, 1]
+
+
+def test_local_work_queue_tasks_sent_while_working():
+    client = LocalWorkQueueClient()
+    client.register('count_to', count_to)
+
+    def spawn(cursor=None):
+        spawned.append(client.send_tasks([{'name': 'count_to', 'key': 'k', 'args': {'limit': 1}}]))
+
+    spawned = []
+    client.register('spawn', spawn)
+    client.send_tasks([{'name': 'spawn', 'key': 'k', 'args': {}}])
+    assert spawned == [1]
+    assert counted == [1]
+
+
+def test_send_tasks_in_batches(work_queue_client):
+    tasks = [{'name': 'count_to', 'key': f'k{i % 2}', 'args': {'limit': i}} for i in range(12)]
+    assert work_queue_client.send_tasks(tasks) == 12
+    assert sent_tasks(work_queue_client) == tasks
+
+    batches = [call.kwargs for call in work_queue_client.boto3_client.send_message_batch.call_args_list]
+    assert [len(batch['Entries']) for batch in batches] == [10, 2]
+    assert all(batch['QueueUrl'] == 'https://queue-url' for batch in batches)
+    assert [entry['MessageGroupId'] for entry in batches[1]['Entries']] == ['k0', 'k1']
+    assert len({entry['MessageDeduplicationId'] for batch in batches for entry in batch['Entries']}) == 12
+
+    work_queue_client.boto3_client.send_message_batch.return_value = {'Failed': [{'Id': '0'}]}
+    with pytest.raises(Exception, match='Failed to send tasks'):
+        work_queue_client.send_tasks(tasks[:1])
+
+
+def message(message_id, task):
+    return {'messageId': message_id, 'body': json.dumps(task)}
+
+
+def test_work_messages_holds_continuations(work_queue_client):
+    task1 = {'name': 'count_to', 'key': 'k1', 'args': {'limit': 2}}
+    task2 = {'name': 'count_to', 'key': 'k2', 'args': {'limit': 1}}
+    messages = [message('m1', task1), message('m2', task2)]
+    # plenty of time, all done
+    assert work_queue_client.work_messages(messages, deadline=time.monotonic() + 60) == []
+    assert counted == [1, 2, 1]
+    assert sent_tasks(work_queue_client) == []
+
+    # out of time after the first chunk, first is held with its cursor and second is held untouched
+    counted.clear()
+    with patch('app.clients.work_queue.time.monotonic', side_effect=[0, 10, 10]):
+        assert work_queue_client.work_messages(messages, deadline=5) == []
+    assert counted == [1]
+    assert work_queue_client.get_held_tasks('k1') == [{**task1, 'cursor': 1}]
+    assert work_queue_client.get_held_tasks('k2') == [task2]
+    resumes = sent_tasks(work_queue_client)
+    assert resumes == [
+        {'name': 'workQueue.resume', 'key': 'k1', 'args': {}},
+        {'name': 'workQueue.resume', 'key': 'k2', 'args': {}},
+    ]
+
+    # the resume tasks work the held tasks
+    resume_messages = [message(f'r{i}', task) for i, task in enumerate(resumes)]
+    assert work_queue_client.work_messages(resume_messages, deadline=time.monotonic() + 60) == []
+    assert counted == [1, 2, 1]
+    assert work_queue_client.get_held_tasks('k1') == []
+    assert work_queue_client.get_held_tasks('k2') == []
+    assert len(sent_tasks(work_queue_client)) == 2
+
+    # a resume task with nothing held does nothing
+    assert work_queue_client.work_messages(resume_messages, deadline=time.monotonic() + 60) == []
+    assert counted == [1, 2, 1]
+    assert len(sent_tasks(work_queue_client)) == 2
+
+
+def test_work_messages_keeps_order_of_task_split_across_deadline(work_queue_client):
+    log = []
+
+    def add(item, cursor=None):
+        log.append(f'add {item} {cursor}')
+        return None if cursor else 'half'
+
+    def remove(item, cursor=None):
+        log.append(f'remove {item}')
+
+    work_queue_client.register('add', add)
+    work_queue_client.register('remove', remove)
+    messages = [
+        message('m1', {'name': 'add', 'key': 'k', 'args': {'item': 'x'}}),
+        message('m2', {'name': 'remove', 'key': 'k', 'args': {'item': 'x'}}),
+    ]
+    # out of time after the first half of the add
+    with patch('app.clients.work_queue.time.monotonic', side_effect=[0, 10, 10]):
+        assert work_queue_client.work_messages(messages, deadline=5) == []
+    assert log == ['add x None']
+
+    # the remove was delivered before the resume, so it is held behind the rest of the add
+    [resume] = sent_tasks(work_queue_client)
+    assert resume == {'name': 'workQueue.resume', 'key': 'k', 'args': {}}
+    assert work_queue_client.work_messages([message('r1', resume)], deadline=time.monotonic() + 60) == []
+    assert log == ['add x None', 'add x half', 'remove x']
+    assert work_queue_client.get_held_tasks('k') == []
+    assert len(sent_tasks(work_queue_client)) == 1
+
+
+def test_work_messages_works_held_tasks_first(work_queue_client):
+    held = [{'name': 'count_to', 'key': 'k', 'args': {'limit': 2}, 'cursor': 1}]
+    work_queue_client.set_held_tasks('k', held, [])
+    task = {'name': 'count_to', 'key': 'k', 'args': {'limit': 1}}
+    assert work_queue_client.work_messages([message('m1', task)], deadline=time.monotonic() + 60) == []
+    assert counted == [2, 1]
+    assert work_queue_client.get_held_tasks('k') == []
+    # the resume task that was sent along with the held tasks is still outstanding
+    assert sent_tasks(work_queue_client) == []
+
+
+def test_work_messages_failed_task_not_held(work_queue_client):
+    work_queue_client.register('boom', Mock(side_effect=Exception('boom')))
+    held = [{'name': 'count_to', 'key': 'k', 'args': {'limit': 1}}, {'name': 'boom', 'key': 'k', 'args': {}}]
+    work_queue_client.set_held_tasks('k', held, [])
+    task = {'name': 'count_to', 'key': 'k', 'args': {'limit': 1}}
+    assert work_queue_client.work_messages([message('m1', task)]) == ['m1']
+    assert counted == [1]
+    # the failed held task stays held, and the message's own task comes back with the message
+    assert work_queue_client.get_held_tasks('k') == held[1:]
+
+
+def test_work_messages_fails_rest_of_batch(work_queue_client):
+    work_queue_client.register('boom', Mock(side_effect=Exception('boom')))
+    messages = [
+        {'messageId': 'm1', 'body': json.dumps({'name': 'count_to', 'key': 'k1', 'args': {'limit': 1}})},
+        {'messageId': 'm2', 'body': json.dumps({'name': 'boom', 'key': 'k2', 'args': {}})},
+        {'messageId': 'm3', 'body': json.dumps({'name': 'count_to', 'key': 'k1', 'args': {'limit': 1}})},
+    ]
+    assert work_queue_client.work_messages(messages) == ['m2', 'm3']
+    assert counted == [1]
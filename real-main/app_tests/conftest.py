@@ -118,6 +118,43 @@ def dynamo_client(dynamo_clients):
     yield dynamo_clients[0]
 
 
+@pytest.fixture
+def dynamo_tracer(request, dynamo_clients):
+    """
+    Records all calls made to the mocked dynamo tables.
+    Group the calls of the code path under test with `with dynamo_tracer.invocation('name'):`
+    and mark the test with `@max_dynamo_calls(n)` to enforce a round-trip budget on each group.
+    """
+    tracer = clients.DynamoCallTracer()
+    for dynamo_client in dynamo_clients:
+        dynamo_client.tracer = tracer
+    yield tracer
+    for dynamo_client in dynamo_clients:
+        dynamo_client.tracer = None
+
+    marker = request.node.get_closest_marker('max_dynamo_calls')
+    if not marker:
+        return
+    max_calls = marker.args[0]
+    allow_repeated_get_items = marker.kwargs.get('allow_repeated_get_items', True)
+    for name in tracer.invocations:
+        if name is None:
+            continue
+        calls, repeated = tracer.calls(name), tracer.repeated_get_items(name)
+        details = f'summary: {tracer.summary(name)}, repeated GetItems: {repeated}'
+        if len(calls) > max_calls:
+            pytest.fail(f'Invocation `{name}` made {len(calls)} dynamo calls, max is {max_calls} ({details})')
+        if repeated and not allow_repeated_get_items:
+            pytest.fail(f'Invocation `{name}` repeated GetItems ({details})')
+
+
+@pytest.fixture(autouse=True)
+def max_dynamo_calls_requires_tracer(request):
+    if request.node.get_closest_marker('max_dynamo_calls'):
+        request.getfixturevalue('dynamo_tracer')
+    yield
+
+
 @pytest.fixture
 def dynamo_feed_client(dynamo_clients):
     yield dynamo_clients[1]
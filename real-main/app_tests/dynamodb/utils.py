@@ -1,4 +1,8 @@
 # a few handy testing utils
+import pytest
+
+# enforce a round-trip budget on the code paths traced by the `dynamo_tracer` fixture
+max_dynamo_calls = pytest.mark.max_dynamo_calls
 
 
 def pk(item):
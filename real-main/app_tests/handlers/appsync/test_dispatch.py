@@ -1,10 +1,14 @@
 import os
+from unittest.mock import patch
 
 import pytest
 
+from app.handlers import warmup
+
 # turning off route autodiscovery
 os.environ['APPSYNC_ROUTE_AUTODISCOVERY_PATH'] = ''
 from app.handlers.appsync import dispatch, routes  # noqa: E402 isort:skip
+from app.handlers.appsync.exceptions import ClientException  # noqa: E402 isort:skip
 
 
 @pytest.fixture
@@ -29,6 +33,10 @@ def api_key_authed_event():
     }
 
 
+# events from request templates that don't pass along the selection set
+no_selection = {'selection_set': None}
+
+
 @pytest.fixture
 def setup_one_route():
     routes.clear()
@@ -49,7 +57,12 @@ def test_basic_success(setup_one_route, cognito_authed_event):
         'success': {
             'caller_user_id': '42-42',
             'arguments': ['arg1', 'arg2'],
-            'kwargs': {'source': {'anotherField': 42}, 'context': {}, 'client': {'version': '1.2.3(456)'}},
+            'kwargs': {
+                'source': {'anotherField': 42},
+                'context': {},
+                'client': {'version': '1.2.3(456)'},
+                **no_selection,
+            },
         },
     }
 
@@ -60,7 +73,7 @@ def test_no_source(setup_one_route, cognito_authed_event):
         'success': {
             'caller_user_id': '42-42',
             'arguments': ['arg1', 'arg2'],
-            'kwargs': {'source': None, 'context': {}, 'client': {'version': '1.2.3(456)'}},
+            'kwargs': {'source': None, 'context': {}, 'client': {'version': '1.2.3(456)'}, **no_selection},
         },
     }
 
@@ -70,7 +83,7 @@ def test_api_key_authenticated(setup_one_route, api_key_authed_event):
         'success': {
             'caller_user_id': None,
             'arguments': ['arg1', 'arg2'],
-            'kwargs': {'source': {'anotherField': 42}, 'context': {}, 'client': {}},
+            'kwargs': {'source': {'anotherField': 42}, 'context': {}, 'client': {}, **no_selection},
         },
     }
 
@@ -80,6 +93,98 @@ def test_context_passed(setup_one_route, api_key_authed_event):
         'success': {
             'caller_user_id': None,
             'arguments': ['arg1', 'arg2'],
-            'kwargs': {'source': {'anotherField': 42}, 'context': {'foo': 'bar'}, 'client': {}},
+            'kwargs': {'source': {'anotherField': 42}, 'context': {'foo': 'bar'}, 'client': {}, **no_selection},
         },
     }
+
+
+@pytest.fixture
+def setup_batch_route():
+    routes.clear()
+
+    @routes.register('Type.batchField', batch=True)
+    def mocked_batch_handler(requests, **kwargs):  # pylint: disable=unused-variable
+        return [
+            ClientException(f'Bad {request["source"]["anotherField"]}')
+            if request['source']['anotherField'] < 0
+            else {'request': request, 'kwargs': kwargs}
+            for request in requests
+        ]
+
+
+def test_batch_of_events_to_batch_handler(setup_batch_route, cognito_authed_event, api_key_authed_event):
+    cognito_authed_event['field'] = 'Type.batchField'
+    api_key_authed_event['field'] = 'Type.batchField'
+    api_key_authed_event['source'] = {'anotherField': -1}
+    assert dispatch([cognito_authed_event, api_key_authed_event], {}) == [
+        {
+            'success': {
+                'request': {
+                    'caller_user_id': '42-42',
+                    'arguments': ['arg1', 'arg2'],
+                    'source': {'anotherField': 42},
+                    'client': {'version': '1.2.3(456)'},
+                    'selection_set': None,
+                },
+                'kwargs': {'context': {}},
+            },
+        },
+        {'error': {'message': 'ClientError: Bad -1', 'data': None, 'info': None}},
+    ]
+
+
+def test_single_event_to_batch_handler(setup_batch_route, api_key_authed_event):
+    api_key_authed_event['field'] = 'Type.batchField'
+    api_key_authed_event['selectionSetList'] = ['anotherField']
+    assert dispatch(api_key_authed_event, {'foo': 'bar'}) == {
+        'success': {
+            'request': {
+                'caller_user_id': None,
+                'arguments': ['arg1', 'arg2'],
+                'source': {'anotherField': 42},
+                'client': {},
+                'selection_set': ['anotherField'],
+            },
+            'kwargs': {'context': {'foo': 'bar'}},
+        },
+    }
+
+
+def test_batch_handler_raises_client_exception(setup_batch_route, cognito_authed_event):
+    cognito_authed_event['field'] = 'Type.batchField'
+
+    def raise_client_exception(requests, **kwargs):
+        raise ClientException('Nope')
+
+    routes.register('Type.batchField', batch=True)(raise_client_exception)
+    error = {'error': {'message': 'ClientError: Nope', 'data': None, 'info': None}}
+    assert dispatch([cognito_authed_event, cognito_authed_event], {}) == [error, error]
+
+
+def test_batch_handler_result_count_mismatch(setup_batch_route, cognito_authed_event):
+    cognito_authed_event['field'] = 'Type.batchField'
+    routes.register('Type.batchField', batch=True)(lambda requests, **kwargs: [])
+    with pytest.raises(Exception, match='returned 0 results for 1 events'):
+        dispatch([cognito_authed_event], {})
+
+
+def test_batch_of_events_to_single_handler(setup_one_route, cognito_authed_event, api_key_authed_event):
+    assert dispatch([cognito_authed_event, api_key_authed_event], {}) == [
+        dispatch(cognito_authed_event, {}),
+        dispatch(api_key_authed_event, {}),
+    ]
+
+
+def test_selection_set_passed(setup_one_route, api_key_authed_event):
+    api_key_authed_event['selectionSetList'] = ['userId', 'photo', 'photo/url']
+    assert dispatch(api_key_authed_event, {})['success']['kwargs']['selection_set'] == [
+        'userId',
+        'photo',
+        'photo/url',
+    ]
+
+
+def test_warmup_event(setup_one_route):
+    with patch.object(warmup, 'prime', return_value={'cloudfront_key': 4.2}) as prime:
+        assert dispatch({'source': 'serverless-plugin-warmup'}, {}) == {'cloudfront_key': 4.2}
+    assert 'cloudfront_key' in prime.call_args.args[0]
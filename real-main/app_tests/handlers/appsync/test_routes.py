@@ -36,3 +36,21 @@ def test_discover():
         'Type.field1': mock_handlers.handler_1,
         'Type.field2': mock_handlers.handler_2,
     }
+
+
+def test_register_batch():
+    @routes.register('Mytype.myfield', batch=True)
+    def myfunc():
+        pass
+
+    assert routes.cache == {'Mytype.myfield': myfunc}
+    assert routes.is_batch('Mytype.myfield')
+    assert not routes.is_batch('Mytype.otherfield')
+
+    # re-registering without batch clears the flag
+    routes.register('Mytype.myfield')(myfunc)
+    assert not routes.is_batch('Mytype.myfield')
+
+    routes.register('Mytype.myfield', batch=True)(myfunc)
+    routes.clear()
+    assert not routes.is_batch('Mytype.myfield')
@@ -1,6 +1,23 @@
-from unittest.mock import Mock
+import json
+import logging
+import threading
+import time
+from decimal import Decimal
+from unittest.mock import Mock, patch
 
+import pendulum
+import pytest
+from boto3.dynamodb.types import Binary
+
+from app.handlers.dynamo.coalesce import coalesce_calls
 from app.handlers.dynamo.dispatch import DynamoDispatch
+from app.handlers.dynamo.image import LazyImage, deserialize
+from app.handlers.dynamo.lanes import partition_lanes, process_in_lanes
+from app.handlers.dynamo.metrics import ListenerMetrics, count_method_calls, emf_logger, instrument
+from app.handlers.dynamo.progress import StreamBatchProgress, listener_name
+from app.utils import gather
+
+logger = logging.getLogger()
 
 
 def test_dynamo_dispatch_pk_sk_prefixes():
@@ -94,3 +111,337 @@ def test_dynamo_dispatch_attributes():
     assert dispatch.search('pkpre', 'skpre', 'INSERT', {}, {'k3': 'd'}) == []
     assert dispatch.search('pkpre', 'skpre', 'INSERT', {'k3': ''}, {}) == [f3]
     assert dispatch.search('pkpre', 'skpre', 'INSERT', {'k3': 42}, {}) == [f3]
+
+
+def test_dynamo_dispatch_shared_change_detection():
+    dispatch = DynamoDispatch()
+    f1, f2, f3, f4 = Mock(), Mock(), Mock(), Mock()
+    dispatch.register('pkpre', 'skpre', ['MODIFY'], f1, {'k1': 0})
+    dispatch.register('pkpre', 'skpre', ['MODIFY'], f2, {'k1': 0})
+    dispatch.register('pkpre', 'skpre', ['MODIFY'], f3, {'k2': [], 'k1': 0})
+    dispatch.register('pkpre', 'skpre', ['MODIFY'], f4, {'k1': False})
+
+    tests, listeners = dispatch.compile()[('pkpre', 'skpre', 'MODIFY')]
+    assert tests == (('k1', 0), ('k2', []), ('k1', False))
+    assert listeners == ((f1, (0,)), (f2, (0,)), (f3, (1, 0)), (f4, (2,)))
+
+    old_item, new_item = Mock(), Mock()
+    old_item.get.side_effect = lambda name, default: {'k1': 1}.get(name, default)
+    new_item.get.side_effect = lambda name, default: {'k1': 2}.get(name, default)
+    assert dispatch.search('pkpre', 'skpre', 'MODIFY', old_item, new_item) == [f1, f2, f3, f4]
+    # each distinct test is run once
+    assert old_item.get.call_count == 3
+    assert new_item.get.call_count == 3
+
+
+def test_dynamo_dispatch_has_listeners():
+    dispatch = DynamoDispatch()
+    assert dispatch.has_listeners('pkpre', 'skpre', 'INSERT') is False
+
+    f1 = Mock()
+    dispatch.register('pkpre', 'skpre', ['INSERT'], f1, {'k1': 0})
+    assert dispatch.has_listeners('pkpre', 'skpre', 'INSERT') is True
+    assert dispatch.has_listeners('pkpre', 'skpre', 'MODIFY') is False
+    assert dispatch.has_listeners('pkpre', 'other', 'INSERT') is False
+
+    # searching for unknown prefixes does not add entries to the index
+    assert dispatch.search('other', 'skpre', 'INSERT', {}, {}) == []
+    assert list(dispatch.index) == [('pkpre', 'skpre', 'INSERT')]
+
+
+def test_deserialize():
+    assert deserialize({'S': 'lore'}) == 'lore'
+    assert deserialize({'N': '42'}) == 42
+    assert isinstance(deserialize({'N': '4.2'}), Decimal)
+    assert deserialize({'BOOL': False}) is False
+    assert deserialize({'NULL': True}) is None
+    assert deserialize({'B': b'ipsum'}) == Binary(b'ipsum')
+    assert deserialize({'SS': ['a']}) == {'a'}
+    assert deserialize({'L': [{'S': 'a'}, {'N': '1'}]}) == ['a', 1]
+    assert deserialize({'M': {'a': {'BOOL': True}}}) == {'a': True}
+
+
+def test_lazy_image():
+    typed_image = {'a': {'S': 'lore'}, 'b': {'N': '1'}, 'c': {'L': [{'S': 'x'}]}}
+    image = LazyImage(typed_image)
+    assert len(image) == 3
+    assert list(image) == ['a', 'b', 'c']
+    assert 'a' in image and 'd' not in image
+    assert image.get('d') is None
+    assert image.get('d', 'default') == 'default'
+
+    # attributes are deserialized on first access only
+    with patch('app.handlers.dynamo.image.deserialize', wraps=deserialize) as deserialize_mock:
+        assert image['b'] == 1
+        assert image['b'] == 1
+        assert deserialize_mock.call_count == 1
+        assert image.to_dict() == {'a': 'lore', 'b': 1, 'c': ['x']}
+        assert deserialize_mock.call_count == 3
+
+    assert not LazyImage({})
+    assert LazyImage({}).to_dict() == {}
+
+
+def test_dynamo_dispatch_lazy_images():
+    dispatch = DynamoDispatch()
+    f1 = Mock()
+    dispatch.register('pkpre', 'skpre', ['MODIFY'], f1, {'k1': 0})
+
+    old_image = LazyImage({'k1': {'N': '1'}, 'k2': {'S': 'unwatched'}})
+    new_image = LazyImage({'k1': {'N': '2'}, 'k2': {'S': 'unwatched'}})
+    assert dispatch.search('pkpre', 'skpre', 'MODIFY', old_image, new_image) == [f1]
+    assert old_image.values == {'k1': 1}
+    assert new_image.values == {'k1': 2}
+
+
+def test_dynamo_dispatch_batch():
+    dispatch = DynamoDispatch()
+    f1, f2 = Mock(), Mock()
+    dispatch.register('pkpre', 'skpre', ['INSERT', 'REMOVE'], f1, batch=True)
+    dispatch.register('pkpre', 'skpre', ['INSERT'], f2)
+    assert dispatch.is_batch(f1) is True
+    assert dispatch.is_batch(f2) is False
+
+    # batch listeners are matched just like per-record listeners
+    assert dispatch.search('pkpre', 'skpre', 'INSERT', {}, {}) == [f1, f2]
+    assert dispatch.search('pkpre', 'skpre', 'REMOVE', {}, {}) == [f1]
+
+
+def test_dynamo_dispatch_coalesce():
+    dispatch = DynamoDispatch()
+    f1, f2 = Mock(), Mock()
+    dispatch.register('pkpre', 'skpre', ['INSERT', 'MODIFY'], f1, {'cnt': 0}, coalesce=True)
+    dispatch.register('pkpre', 'skpre', ['MODIFY'], f2)
+    assert dispatch.is_coalesced(f1) is True
+    assert dispatch.is_coalesced(f2) is False
+    assert dispatch.is_batch(f1) is False
+    assert dispatch.search('pkpre', 'skpre', 'MODIFY', {'cnt': 1}, {'cnt': 2}) == [f1, f2]
+
+
+def test_coalesce_calls():
+    f1, f2 = Mock(), Mock()
+    key_a, key_b = ('post/a', '-'), ('post/b', '-')
+
+    def call(func, seq, event_name, key, old_cnt, new_cnt):
+        old_item = {'cnt': old_cnt} if old_cnt is not None else None
+        new_item = {'cnt': new_cnt} if new_cnt is not None else None
+        return (func, seq, event_name, key, (key[0][5:], old_item, new_item))
+
+    assert coalesce_calls([]) == []
+    calls = [
+        call(f1, '1', 'INSERT', key_a, None, 0),
+        call(f1, '2', 'MODIFY', key_a, 0, 1),
+        call(f1, '3', 'MODIFY', key_b, 5, 6),
+        call(f2, '3', 'MODIFY', key_b, 5, 6),
+        call(f1, '4', 'MODIFY', key_a, 1, 2),
+        call(f1, '5', 'MODIFY', key_a, 2, 3),
+        call(f1, '6', 'REMOVE', key_b, 6, None),
+        call(f1, '7', 'MODIFY', key_b, None, 7),
+        call(f1, '8', 'MODIFY', key_a, 3, 4),
+    ]
+    assert coalesce_calls(calls) == [
+        (f1, ['1'], 'INSERT', key_a, ('a', None, {'cnt': 0})),
+        # runs of MODIFYs on the same item by the same listener are collapsed, even if not adjacent in the stream
+        (f1, ['2', '4', '5', '8'], 'MODIFY', key_a, ('a', {'cnt': 0}, {'cnt': 4})),
+        (f1, ['3'], 'MODIFY', key_b, ('b', {'cnt': 5}, {'cnt': 6})),
+        (f2, ['3'], 'MODIFY', key_b, ('b', {'cnt': 5}, {'cnt': 6})),
+        # any other event breaks the run
+        (f1, ['6'], 'REMOVE', key_b, ('b', {'cnt': 6}, None)),
+        (f1, ['7'], 'MODIFY', key_b, ('b', None, {'cnt': 7})),
+    ]
+
+
+def stream_record(pk, seq):
+    return {'dynamodb': {'Keys': {'partitionKey': {'S': pk}, 'sortKey': {'S': '-'}}, 'seq': seq}}
+
+
+def test_partition_lanes():
+    assert partition_lanes([], 4) == []
+
+    records = [stream_record(pk, seq) for seq, pk in enumerate(['a', 'b', 'a', 'c', 'a', 'b', 'd'])]
+    lanes = partition_lanes(records, 2)
+    assert [[idx for idx, _ in lane] for lane in lanes] == [[0, 2, 4, 6], [1, 5, 3]]
+    assert all(records[idx] is record for lane in lanes for idx, record in lane)
+
+    # no more lanes than partition keys
+    assert len(partition_lanes(records, 10)) == 4
+    assert [[idx for idx, _ in lane] for lane in partition_lanes(records, 1)] == [[0, 2, 4, 1, 5, 3, 6]]
+
+
+def test_process_in_lanes():
+    records = [stream_record(pk, seq) for seq, pk in enumerate(['a', 'b', 'a', 'c', 'b', 'a'] * 5)]
+    lock = threading.Lock()
+    seen, threads = {}, set()
+
+    def process_record(record):
+        time.sleep(0.001)
+        with lock:
+            seen.setdefault(record['dynamodb']['Keys']['partitionKey']['S'], []).append(record['dynamodb']['seq'])
+            threads.add(threading.current_thread())
+        return record['dynamodb']['seq']
+
+    assert process_in_lanes(records, process_record, 3) == list(range(30))
+    # records of the same partition key are processed in stream order, different ones concurrently
+    assert seen == {
+        pk: [seq for seq, r in enumerate(records) if r['dynamodb']['Keys']['partitionKey']['S'] == pk]
+        for pk in 'abc'
+    }
+    assert len(threads) == 3
+
+
+def test_process_in_lanes_own_pool():
+    # more lanes than the shared pool has workers, each running a gather of its own
+    concurrency = 12
+    records = [stream_record(f'pk{seq}', seq) for seq in range(concurrency)]
+    lanes_barrier = threading.Barrier(concurrency, timeout=5)
+
+    def process_record(record):
+        lanes_barrier.wait()
+        gather_barrier = threading.Barrier(2, timeout=5)
+        gather(gather_barrier.wait, gather_barrier.wait)
+        return record['dynamodb']['seq']
+
+    assert process_in_lanes(records, process_record, concurrency) == list(range(concurrency))
+
+
+def test_listener_name():
+    class FlagMixin:
+        def on_flag_add(self):
+            pass
+
+    class PostManager(FlagMixin):
+        pass
+
+    class CommentManager(FlagMixin):
+        pass
+
+    assert listener_name(PostManager().on_flag_add) == 'PostManager.on_flag_add'
+    assert listener_name(CommentManager().on_flag_add) == 'CommentManager.on_flag_add'
+    assert listener_name(test_listener_name) == 'test_listener_name'
+
+
+def test_stream_batch_progress(dynamo_client):
+    f1, f2 = Mock(__self__=None, __qualname__='f1'), Mock(__self__=None, __qualname__='f2')
+    records = [{'dynamodb': {'SequenceNumber': str(seq)}} for seq in range(100, 105)]
+
+    # first attempt, nothing completed yet
+    progress = StreamBatchProgress(dynamo_client, records)
+    progress.load()
+    assert progress.marker is None
+    for seq in ('100', '101', '102', '103', '104'):
+        progress.complete(seq, f1)
+    progress.complete('101', f2)
+    progress.complete('103', f2)
+    progress.fail('102')
+    progress.fail('104')
+    assert progress.save() == [{'itemIdentifier': '102'}, {'itemIdentifier': '104'}]
+
+    # only what completed on re-delivered records is kept
+    marker = dynamo_client.get_item(progress.pk('102'))
+    assert marker['completedListeners'] == {'102': ['f1'], '103': ['f1', 'f2'], '104': ['f1']}
+    # expires once the stream no longer has the records
+    assert marker['ttlExpiresAt'] == pytest.approx(pendulum.now('utc').add(days=2).int_timestamp, abs=60)
+
+    # the retry starts at the first failed record
+    progress = StreamBatchProgress(dynamo_client, records[2:])
+    progress.load()
+    assert progress.is_completed('102', f1) is True
+    assert progress.is_completed('102', f2) is False
+    assert progress.is_completed('103', f2) is True
+    progress.complete('102', f2)
+    progress.complete('104', f2)
+    progress.fail('104')
+    assert progress.save() == [{'itemIdentifier': '104'}]
+    assert dynamo_client.get_item(progress.pk('102')) is None
+    assert dynamo_client.get_item(progress.pk('104'))['completedListeners'] == {'104': ['f1', 'f2']}
+
+    # a successful retry clears the marker
+    progress = StreamBatchProgress(dynamo_client, records[4:])
+    progress.load()
+    assert progress.save() == []
+    assert dynamo_client.get_item(progress.pk('104')) is None
+
+    assert StreamBatchProgress(dynamo_client, []).save() == []
+
+
+def test_listener_metrics(dynamo_client):
+    class FeedManager:
+        def on_post_change(self, post_id):
+            gather(lambda: dynamo_client.get_item({'partitionKey': 'p', 'sortKey': 's'}), lambda: appsync.send())
+            dynamo_client.get_item({'partitionKey': 'p', 'sortKey': 's'})
+
+        def on_post_delete(self, post_id):
+            raise Exception('nope')
+
+    send = Mock()
+    appsync = Mock(send=send)
+    count_method_calls(appsync, 'appsync', ['send'])
+    instrument({'dynamo': dynamo_client})
+    feed_manager = FeedManager()
+
+    metrics = ListenerMetrics()
+    for pk in ('post/1', 'post/2'):
+        with metrics.listener(feed_manager.on_post_change, 'MODIFY', pk=pk, sk='-'):
+            feed_manager.on_post_change('1')
+    with pytest.raises(Exception, match='nope'):
+        with metrics.listener(feed_manager.on_post_delete, 'REMOVE', pk='post/3', sk='-'):
+            feed_manager.on_post_delete('3')
+
+    # calls made outside of a listener are not counted
+    dynamo_client.get_item({'partitionKey': 'p', 'sortKey': 's'})
+    assert send.call_count == 2
+
+    summary = metrics.summary()
+    stats = {(s['listener'], s['eventName']): s for s in summary['listeners']}
+    assert stats.keys() == {('FeedManager.on_post_change', 'MODIFY'), ('FeedManager.on_post_delete', 'REMOVE')}
+    change_stats = stats[('FeedManager.on_post_change', 'MODIFY')]
+    assert (change_stats['calls'], change_stats['errors']) == (2, 0)
+    assert (change_stats['dynamo'], change_stats['appsync'], change_stats['s3']) == (4, 2, 0)
+    assert change_stats['maxDurationMs'] <= change_stats['durationMs']
+    delete_stats = stats[('FeedManager.on_post_delete', 'REMOVE')]
+    assert (delete_stats['calls'], delete_stats['errors'], delete_stats['dynamo']) == (1, 1, 0)
+    assert sorted(s['pk'] for s in summary['slowest']) == ['post/1', 'post/2', 'post/3']
+    durations = [s['durationMs'] for s in summary['slowest']]
+    assert durations == sorted(durations, reverse=True)
+
+    # one EMF document per listener and event name
+    documents = list(metrics.emf_documents(timestamp_ms=42))
+    assert len(documents) == 2
+    document = next(d for d in documents if d['EventName'] == 'MODIFY')
+    assert document['_aws']['Timestamp'] == 42
+    assert document['_aws']['CloudWatchMetrics'][0]['Dimensions'] == [['Listener', 'EventName']]
+    metric_names = [m['Name'] for m in document['_aws']['CloudWatchMetrics'][0]['Metrics']]
+    assert all(name in document for name in metric_names)
+    assert (document['Listener'], document['Calls'], document['DynamoCalls'], document['AppSyncCalls']) == (
+        'FeedManager.on_post_change',
+        2,
+        4,
+        2,
+    )
+
+
+def test_listener_metrics_emit(caplog):
+    metrics = ListenerMetrics()
+    metrics.emit(logger)
+    assert caplog.records == []
+
+    metrics.record('f', 'INSERT', 5, {'dynamo': 1})
+    # EMF documents don't reach the handlers of the root logger, as lambda needs them as bare json lines
+    emf_logger.addHandler(caplog.handler)
+    try:
+        metrics.emit(logger)
+    finally:
+        emf_logger.removeHandler(caplog.handler)
+    emf_records = [record for record in caplog.records if record.name == 'emf']
+    assert [json.loads(record.getMessage())['Listener'] for record in emf_records] == ['f']
+    assert caplog.records[-1].getMessage().startswith('Listener metrics: ')
+
+
+def test_listener_metrics_slowest():
+    metrics = ListenerMetrics()
+    metrics.slowest_count = 2
+    for idx, duration_ms in enumerate([5, 50, 1, 20]):
+        metrics.record('f', 'INSERT', duration_ms, {'dynamo': 1}, pk=f'pk{idx}')
+    assert [(s['pk'], s['durationMs']) for s in metrics.summary()['slowest']] == [('pk1', 50), ('pk3', 20)]
+    assert metrics.stats[('f', 'INSERT')]['calls'] == 4
+    assert metrics.stats[('f', 'INSERT')]['dynamo'] == 4
@@ -0,0 +1,81 @@
+from unittest.mock import Mock, patch
+
+import pytest
+
+from app.handlers import registry
+from app.handlers.registry import Lazy, Registry
+
+
+@pytest.fixture
+def client_factories():
+    factories = {'dynamo': Mock(), 'pinpoint': Mock()}
+    with patch.object(registry, 'client_factories', factories), patch.object(
+        registry, '_clients', {}
+    ), patch.object(registry, '_client_created_callbacks', []):
+        yield factories
+
+
+def test_lazy():
+    factory = Mock()
+    proxy = Lazy(factory)
+    factory.assert_not_called()
+
+    assert proxy.attr is factory.return_value.attr
+    assert factory.call_count == 1
+
+    proxy.attr = 42
+    assert factory.return_value.attr == 42
+    assert factory.call_count == 2
+
+
+def test_clients_created_once_upon_first_use(client_factories):
+    reg = Registry(['dynamo', 'pinpoint'])
+    assert list(reg.clients) == ['dynamo', 'pinpoint']
+    client_factories['dynamo'].assert_not_called()
+    client_factories['pinpoint'].assert_not_called()
+
+    reg.clients['dynamo'].get_item('pk')
+    reg.clients['dynamo'].get_item('pk2')
+    assert client_factories['dynamo'].call_count == 1
+    assert client_factories['dynamo'].return_value.get_item.call_count == 2
+    client_factories['pinpoint'].assert_not_called()
+
+    # clients are shared between registries
+    Registry(['dynamo']).clients['dynamo'].get_item('pk3')
+    assert client_factories['dynamo'].call_count == 1
+    assert registry.get_client('dynamo') is client_factories['dynamo'].return_value
+
+
+def test_unknown_client(client_factories):
+    with pytest.raises(AssertionError, match='Unknown clients'):
+        Registry(['dynamo', 'nope'])
+
+
+def test_on_client_created(client_factories):
+    callback = Mock()
+    registry.on_client_created(callback)
+    reg = Registry(['dynamo', 'pinpoint'])
+    callback.assert_not_called()
+
+    reg.clients['pinpoint'].send()
+    reg.clients['pinpoint'].send()
+    callback.assert_called_once_with('pinpoint', client_factories['pinpoint'].return_value)
+
+
+def test_managers_created_upon_first_use(client_factories):
+    reg = Registry(['dynamo'])
+    block_manager = reg.manager('block')
+    assert reg.managers == {}
+
+    assert block_manager.get_block_status is not None
+    # managers share one table, so a manager's dependencies are created alongside it
+    assert 'block' in reg.managers
+    assert 'follower' in reg.managers
+    assert reg.get_manager('block') is reg.managers['block']
+    assert reg.get_manager('follower') is reg.managers['block'].follower_manager
+    client_factories['dynamo'].assert_not_called()
+
+
+def test_unknown_manager(client_factories):
+    with pytest.raises(AssertionError, match='Unknown manager'):
+        Registry([]).manager('nope')
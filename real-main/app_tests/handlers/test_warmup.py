@@ -0,0 +1,93 @@
+from unittest.mock import Mock, patch
+
+import pytest
+
+from app.handlers import registry, warmup
+from app.models.post import text_image
+
+warmup_event = {'source': 'serverless-plugin-warmup'}
+
+
+@pytest.fixture
+def fake_steps():
+    steps = {'one': Mock(), 'two': Mock(), 'three': Mock()}
+    with patch.object(warmup, 'steps', steps):
+        yield steps
+
+
+@pytest.fixture
+def primed_clients(cloudfront_client, dynamo_client, mediaconvert_client, s3_uploads_client):
+    clients = {
+        'cloudfront': cloudfront_client,
+        'dynamo': dynamo_client,
+        'mediaconvert': mediaconvert_client,
+        's3_uploads': s3_uploads_client,
+    }
+    with patch.object(registry, '_clients', clients):
+        yield clients
+
+
+def test_prime(fake_steps):
+    durations = warmup.prime(['two', 'one'])
+    assert list(durations) == ['two', 'one']
+    assert all(isinstance(duration, float) for duration in durations.values())
+    fake_steps['one'].assert_called_once_with()
+    fake_steps['two'].assert_called_once_with()
+    fake_steps['three'].assert_not_called()
+
+
+def test_prime_step_fails(fake_steps, caplog):
+    fake_steps['one'].side_effect = Exception('nope')
+    durations = warmup.prime(['one', 'two'])
+    assert durations['one'] is None
+    assert isinstance(durations['two'], float)
+    assert 'Warm-up step `one` failed: nope' in caplog.text
+
+
+def test_prime_all_steps(primed_clients):
+    durations = warmup.prime(list(warmup.steps))
+    assert list(durations) == list(warmup.steps)
+    # the cloudfront and mediaconvert clients are mocks, but still had their one-time costs triggered
+    primed_clients['cloudfront'].get_private_key.assert_called_once_with()
+    assert all(duration is not None for duration in durations.values())
+
+
+def test_prime_text_image_font_reads_font_file_once():
+    text_image.read_font_file.cache_clear()
+    text_image.load_font.cache_clear()
+    with patch('builtins.open', wraps=open) as open_:
+        warmup.prime_text_image_font()
+        assert text_image.load_font(42)
+        assert text_image.load_font(10) is text_image.load_font(10)
+    assert open_.call_count == 1
+
+
+def test_prime_on_init(fake_steps):
+    with patch.object(warmup, 'PROVISIONED_CONCURRENCY', False):
+        warmup.prime_on_init(['one'])
+    fake_steps['one'].assert_not_called()
+
+    with patch.object(warmup, 'PROVISIONED_CONCURRENCY', True):
+        warmup.prime_on_init(['one'])
+    fake_steps['one'].assert_called_once_with()
+
+
+def test_handle_warmup(fake_steps):
+    handler = Mock(return_value='handled')
+    wrapped = warmup.handle_warmup(['one'])(handler)
+
+    assert wrapped({'Records': []}, 'context') == 'handled'
+    handler.assert_called_once_with({'Records': []}, 'context')
+    fake_steps['one'].assert_not_called()
+
+    handler.reset_mock()
+    durations = wrapped(warmup_event, 'context')
+    assert list(durations) == ['one']
+    handler.assert_not_called()
+    fake_steps['one'].assert_called_once_with()
+
+
+@pytest.mark.parametrize('event', [[], [warmup_event], {}, {'source': 'aws.events'}, None])
+def test_is_warmup_event(event):
+    assert warmup.is_warmup_event(warmup_event)
+    assert not warmup.is_warmup_event(event)
@@ -94,17 +94,32 @@ def test_on_album_add_edit_sync_delete_at(album_manager, user, album):
 
 
 def test_on_post_album_change_update_art_if_needed(album_manager, user, album):
+    task = {'name': 'album.update_art_if_needed', 'key': f'album/{album.id}', 'args': {'album_id': album.id}}
+
     # check for a new album
-    with patch.object(album_manager, 'init_album') as init_album_mock:
+    with patch.object(album_manager, 'work_queue_client') as work_queue_client_mock:
         album_manager.on_album_posts_last_updated_at_change_update_art_if_needed(album.id, new_item=album.item)
-    assert init_album_mock.mock_calls == [call(album.item), call().update_art_if_needed()]
+    assert work_queue_client_mock.mock_calls == [call.send_tasks([task])]
 
     # check for a changed album
-    with patch.object(album_manager, 'init_album') as init_album_mock:
+    with patch.object(album_manager, 'work_queue_client') as work_queue_client_mock:
         album_manager.on_album_posts_last_updated_at_change_update_art_if_needed(
             album.id, new_item=album.item, old_item={'un': 'used'}
         )
-    assert init_album_mock.mock_calls == [call(album.item), call().update_art_if_needed()]
+    assert work_queue_client_mock.mock_calls == [call.send_tasks([task])]
+
+
+def test_update_art_if_needed(album_manager, user, album):
+    # check the album is re-read
+    with patch.object(album_manager, 'init_album') as init_album_mock:
+        assert album_manager.update_art_if_needed(album.id) is None
+    assert init_album_mock.call_args_list == [call(album.item)]
+    assert init_album_mock.return_value.update_art_if_needed.mock_calls == [call()]
+
+    # check a since-deleted album is skipped
+    with patch.object(album_manager, 'init_album') as init_album_mock:
+        assert album_manager.update_art_if_needed(str(uuid4())) is None
+    assert init_album_mock.mock_calls == []
 
 
 def test_on_post_album_change_update_counts_and_timestamps(album_manager, user, album1, album2, post):
@@ -115,6 +115,25 @@ def test_get_art_image_url(album):
         assert album.get_art_image_url(size) == image_url
 
 
+def test_get_art_image_urls(album):
+    domain = 'here.there.com'
+    album.frontend_resources_domain = domain
+    sizes = [image_size.NATIVE, image_size.P480]
+
+    # placeholder images when album has no artHash
+    assert album.get_art_image_urls(sizes) == [album.get_art_image_url(size) for size in sizes]
+
+    # with an artHash, signed for all sizes at once
+    album.item['artHash'] = 'deadbeef'
+    image_urls = ['url1', 'url2']
+    album.cloudfront_client.configure_mock(**{'generate_presigned_urls.return_value': image_urls})
+    assert album.get_art_image_urls(sizes) == image_urls
+    path_prefix = album.get_art_image_path(image_size.NATIVE).rsplit('/', 1)[0]
+    album.cloudfront_client.generate_presigned_urls.assert_called_once_with(
+        path_prefix, ['native.jpg', '480p.jpg'], ['GET', 'HEAD']
+    )
+
+
 def test_delete_art_images(album):
     # set an art hash and put imagery in mocked s3
     art_hash = 'hashing'
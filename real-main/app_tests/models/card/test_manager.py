@@ -97,6 +97,23 @@ def test_add_or_update_card(user, template, card_manager):
     assert new_card.item == card.item
 
 
+def test_get_cards(user, card_manager, chat_card_template, comment_card_template, post):
+    card_manager.add_or_update_card(chat_card_template)
+    card_manager.add_or_update_card(comment_card_template)
+    card_ids = [comment_card_template.card_id, 'cid-dne', chat_card_template.card_id]
+    assert card_manager.get_cards([]) == []
+    cards = card_manager.get_cards(card_ids)
+    assert [card.id if card else None for card in cards] == card_ids[:1] + [None] + card_ids[2:]
+
+    # with posts, the cards don't go back to dynamo for them
+    cards = card_manager.get_cards(card_ids, with_posts=True)
+    with patch.object(card_manager.post_manager, 'get_post') as get_post_mock:
+        assert cards[0].post.id == post.id
+        assert cards[0].post.item == post.item
+        assert cards[2].post is None
+    assert get_post_mock.call_count == 0
+
+
 @pytest.mark.skip(reason="No cards with only_usernames set exist at the moment")
 def test_add_or_update_card_with_only_usernames(user, template, card_manager):
     # verify starting state
@@ -145,6 +145,28 @@ def test_on_post_view_count_change_updates_cards(card_manager, post, template):
     assert card_manager.get_card(template.card_id) is None
 
 
+def test_on_posts_view_count_change_update_cards(
+    card_manager, post, comment_card_template, post_likes_card_template, post_views_card_template
+):
+    template_card_ids = [
+        template.card_id
+        for template in (comment_card_template, post_likes_card_template, post_views_card_template)
+    ]
+    viewed = {'sortKey': f'view/{post.user_id}', 'viewCount': 1}
+    records = [
+        (post.id, None, {'sortKey': f'view/{uuid4()}', 'viewCount': 1}),
+        (post.id, None, viewed),
+        (post.id, viewed, {**viewed, 'viewCount': 2}),
+    ]
+    with patch.object(
+        card_manager.dynamo.client, 'batch_delete_items', wraps=card_manager.dynamo.client.batch_delete_items
+    ) as delete_mock:
+        card_manager.on_posts_view_count_change_update_cards(records)
+    # one batch delete for all the records
+    assert delete_mock.call_count == 1
+    assert all(card_manager.get_card(card_id) is None for card_id in template_card_ids)
+
+
 def test_on_card_add_sends_gql_notification(card_manager, card, user):
     with patch.object(card_manager, 'appsync') as appsync_mock:
         card_manager.on_card_add(card.id, card.item)
@@ -100,6 +100,17 @@ def test_on_message_added(chat_manager, chat, user1, user2, caplog, user1_messag
     assert user2_member_item['messagesUnviewedCount'] == 1
 
 
+def test_on_message_added_pipelines_member_updates(chat_manager, chat, user1, user2, user1_message):
+    client = chat_manager.dynamo.client
+    with patch.object(client, 'boto3_client', wraps=client.boto3_client) as boto3_client:
+        with client.counter_batch():
+            chat_manager.on_chat_message_add(user1_message.id, new_item=user1_message.item)
+            # one transaction for the activity updates, the unviewed count increment is deferred
+            assert boto3_client.transact_write_items.call_count == 1
+            assert 'messagesUnviewedCount' not in client.get_item(chat.member_dynamo.pk(chat.id, user2.id))
+    assert client.get_item(chat.member_dynamo.pk(chat.id, user2.id))['messagesUnviewedCount'] == 1
+
+
 def test_on_message_added_system_message(chat_manager, chat, user1, user2, system_message):
     # verify starting state
     chat.refresh_item()
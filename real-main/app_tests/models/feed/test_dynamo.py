@@ -141,6 +141,21 @@ def test_add_post_to_feeds(feed_dynamo):
     assert sorted([i['postId'] for i in feed_dynamo.generate_items(feed_uids[1])]) == sorted([post_id, post_id_2])
 
 
+def test_add_posts_to_feeds(feed_dynamo):
+    feed_uids = [str(uuid4()), str(uuid4())]
+    posted_at = pendulum.now('utc').to_iso8601_string()
+    post_items = [
+        {'postId': str(uuid4()), 'postedByUserId': str(uuid4()), 'postedAt': posted_at} for _ in range(3)
+    ]
+    assert feed_dynamo.add_posts_to_feeds(iter(feed_uids), []) == feed_uids
+    assert list(feed_dynamo.generate_items(feed_uids[0])) == []
+
+    assert feed_dynamo.add_posts_to_feeds(iter(feed_uids), post_items) == feed_uids
+    post_ids = sorted(post_item['postId'] for post_item in post_items)
+    assert sorted(i['postId'] for i in feed_dynamo.generate_items(feed_uids[0])) == post_ids
+    assert sorted(i['postId'] for i in feed_dynamo.generate_items(feed_uids[1])) == post_ids
+
+
 def test_delete_by_post(feed_dynamo):
     feed_uids = [str(uuid4()), str(uuid4())]
 
@@ -1,9 +1,10 @@
+from unittest.mock import patch
 from uuid import uuid4
 
 import pendulum
 import pytest
 
-from app.models.post.enums import PostType
+from app.models.post.enums import PostStatus, PostType
 
 
 @pytest.fixture
@@ -33,6 +34,33 @@ def test_add_users_posts_to_feed(feed_manager, post_manager, user, cognito_clien
     )
 
 
+def test_add_users_posts_to_feed_post_deleted_while_working_chunk(feed_manager, post_manager, user):
+    feed_manager.chunk_size = 2
+    feed_user_id = str(uuid4())
+    posts = [post_manager.add_post(user, str(uuid4()), PostType.TEXT_ONLY, text='t') for _ in range(3)]
+    add_posts_to_feed = feed_manager.dynamo.add_posts_to_feed
+
+    def archive_then_add(feed_user_id, post_item_generator):
+        # the page has been read, and before it is written a post of it is archived and synced out of all feeds
+        post_items = list(post_item_generator)
+        archived = next(p for p in posts if p.id == post_items[0]['postId'])
+        post_manager.dynamo.set_post_status(archived.item, PostStatus.ARCHIVED)
+        feed_manager.sync_posts_to_followers_feeds(user.id, [], [archived.id])
+        archived_post_ids.append(archived.id)
+        add_posts_to_feed(feed_user_id, iter(post_items))
+
+    archived_post_ids = []
+    with patch.object(feed_manager.dynamo, 'add_posts_to_feed', side_effect=archive_then_add):
+        cursor = feed_manager.add_users_posts_to_feed(feed_user_id, user.id)
+    assert cursor
+    assert feed_manager.add_users_posts_to_feed(feed_user_id, user.id, cursor=cursor) is None
+
+    # the archived post did not make it to the feed, the rest did
+    feed_post_ids = sorted(item['postId'] for item in feed_manager.dynamo.generate_items(feed_user_id))
+    assert feed_post_ids == sorted(post.id for post in posts if post.id not in archived_post_ids)
+    assert len(feed_post_ids) == 2
+
+
 def test_add_post_to_followers_feeds(feed_manager, user_manager):
     our_user = user_manager.init_user({'userId': 'ouid', 'privacyStatus': 'PUBLIC'})
     their_user = user_manager.init_user({'userId': 'tuid', 'privacyStatus': 'PUBLIC'})
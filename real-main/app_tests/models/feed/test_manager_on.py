@@ -3,6 +3,7 @@ from uuid import uuid4
 
 import pytest
 
+from app.clients import LocalWorkQueueClient
 from app.models.follower.enums import FollowStatus
 from app.models.post.enums import PostStatus, PostType
 from app.utils import GqlNotificationType
@@ -30,25 +31,28 @@ user2 = user1
 
 def test_on_user_follow_status_change_sync_feed_starts_following(feed_manager, follower, user1, user2):
     assert follower.item['followStatus'] == FollowStatus.FOLLOWING
-    with patch.object(feed_manager, 'add_users_posts_to_feed') as add_users_posts_to_feed_mock:
-        with patch.object(feed_manager, 'dynamo') as dynamo_mock:
-            with patch.object(feed_manager, 'appsync_client') as appsync_client_mock:
-                feed_manager.on_user_follow_status_change_sync_feed(user2.id, new_item=follower.item)
-    assert add_users_posts_to_feed_mock.mock_calls == [call(user1.id, user2.id)]
-    assert dynamo_mock.mock_calls == []
-    assert appsync_client_mock.mock_calls == [
-        call.fire_notification(user1.id, GqlNotificationType.USER_FEED_CHANGED),
+    with patch.object(feed_manager, 'work_queue_client') as work_queue_client_mock:
+        feed_manager.on_user_follow_status_change_sync_feed(user2.id, new_item=follower.item)
+    assert work_queue_client_mock.mock_calls == [
+        call.send_tasks(
+            [
+                {
+                    'name': 'feed.add_users_posts_to_feed',
+                    'key': f'feed/{user1.id}',
+                    'args': {'feed_user_id': user1.id, 'posted_by_user_id': user2.id},
+                }
+            ]
+        )
     ]
 
 
 @pytest.mark.parametrize('status', [None, FollowStatus.REQUESTED, FollowStatus.DENIED])
 def test_on_user_follow_status_change_sync_feed_stops_following(feed_manager, follower, user1, user2, status):
     follower.item['followStatus'] = status
-    with patch.object(feed_manager, 'add_users_posts_to_feed') as add_users_posts_to_feed_mock:
-        with patch.object(feed_manager, 'dynamo') as dynamo_mock:
-            with patch.object(feed_manager, 'appsync_client') as appsync_client_mock:
-                feed_manager.on_user_follow_status_change_sync_feed(user2.id, new_item=follower.item)
-    assert add_users_posts_to_feed_mock.mock_calls == []
+    with patch.object(feed_manager, 'dynamo') as dynamo_mock:
+        with patch.object(feed_manager, 'appsync_client') as appsync_client_mock:
+            feed_manager.on_user_follow_status_change_sync_feed(user2.id, new_item=follower.item)
+    # worked right away by the local work queue
     assert dynamo_mock.mock_calls == [call.delete_by_post_owner(user1.id, user2.id)]
     assert appsync_client_mock.mock_calls == [
         call.fire_notification(user1.id, GqlNotificationType.USER_FEED_CHANGED),
@@ -57,16 +61,23 @@ def test_on_user_follow_status_change_sync_feed_stops_following(feed_manager, fo
 
 def test_on_post_status_change_sync_feed_post_completed(feed_manager, post):
     assert post.item['postStatus'] == PostStatus.COMPLETED
-    user_ids = [str(uuid4()), str(uuid4())]
-    with patch.object(feed_manager, 'add_post_to_followers_feeds', return_value=user_ids) as add_post_mock:
-        with patch.object(feed_manager, 'dynamo') as dynamo_mock:
-            with patch.object(feed_manager, 'appsync_client') as appsync_client_mock:
-                feed_manager.on_post_status_change_sync_feed(post.id, new_item=post.item)
-    assert add_post_mock.mock_calls == [call(post.user_id, post.item)]
-    assert dynamo_mock.mock_calls == []
-    assert appsync_client_mock.mock_calls == [
-        call.fire_notification(user_ids[0], GqlNotificationType.USER_FEED_CHANGED),
-        call.fire_notification(user_ids[1], GqlNotificationType.USER_FEED_CHANGED),
+    with patch.object(feed_manager, 'work_queue_client') as work_queue_client_mock:
+        feed_manager.on_post_status_change_sync_feed(post.id, new_item=post.item)
+    post_item = {k: post.item[k] for k in ('postId', 'postedByUserId', 'postedAt')}
+    assert work_queue_client_mock.mock_calls == [
+        call.send_tasks(
+            [
+                {
+                    'name': 'feed.sync_posts_to_followers_feeds',
+                    'key': f'postsBy/{post.user_id}',
+                    'args': {
+                        'posted_by_user_id': post.user_id,
+                        'post_items': [post_item],
+                        'deleted_post_ids': [],
+                    },
+                }
+            ]
+        )
     ]
 
 
@@ -78,13 +89,97 @@ def test_on_post_status_change_sync_feed_post_uncompleted(feed_manager, post, st
     old_item = {**post.item, 'postStatus': 'COMPLETED'}
     new_item = {**post.item, 'postStatus': status}
     user_ids = [str(uuid4()), str(uuid4())]
-    with patch.object(feed_manager, 'add_post_to_followers_feeds') as add_post_mock:
-        with patch.object(feed_manager, 'dynamo', **{'delete_by_post.return_value': user_ids}) as dynamo_mock:
-            with patch.object(feed_manager, 'appsync_client') as appsync_client_mock:
-                feed_manager.on_post_status_change_sync_feed(post.id, new_item=new_item, old_item=old_item)
-    assert add_post_mock.mock_calls == []
+    with patch.object(feed_manager, 'dynamo', **{'delete_by_post.return_value': user_ids}) as dynamo_mock:
+        with patch.object(feed_manager, 'appsync_client') as appsync_client_mock:
+            feed_manager.on_post_status_change_sync_feed(post.id, new_item=new_item, old_item=old_item)
     assert dynamo_mock.mock_calls == [call.delete_by_post(post.id)]
     assert appsync_client_mock.mock_calls == [
         call.fire_notification(user_ids[0], GqlNotificationType.USER_FEED_CHANGED),
         call.fire_notification(user_ids[1], GqlNotificationType.USER_FEED_CHANGED),
     ]
+
+
+def test_on_posts_status_change_sync_feeds(feed_manager, user1, user2):
+    post_item = {'postedByUserId': user1.id, 'postStatus': PostStatus.COMPLETED, 'postedAt': 'pa'}
+    p1_item, p2_item, p3_item = ({**post_item, 'postId': pid} for pid in ('pid1', 'pid2', 'pid3'))
+    p4_item = {**post_item, 'postId': 'pid4', 'postedByUserId': user2.id}
+    records = [
+        (p1_item['postId'], None, p1_item),
+        (p2_item['postId'], None, p2_item),
+        (p3_item['postId'], None, p3_item),
+        (p4_item['postId'], None, p4_item),
+        # only the last change to a post matters
+        (p3_item['postId'], p3_item, {**p3_item, 'postStatus': PostStatus.ARCHIVED}),
+    ]
+    with patch.object(feed_manager, 'work_queue_client') as work_queue_client_mock:
+        feed_manager.on_posts_status_change_sync_feeds(records)
+
+    # one task per posting user
+    tasks = work_queue_client_mock.send_tasks.call_args.args[0]
+    assert [(task['key'], task['args']) for task in tasks] == [
+        (
+            f'postsBy/{user1.id}',
+            {
+                'posted_by_user_id': user1.id,
+                'post_items': [
+                    {k: item[k] for k in ('postId', 'postedByUserId', 'postedAt')} for item in (p1_item, p2_item)
+                ],
+                'deleted_post_ids': ['pid3'],
+            },
+        ),
+        (
+            f'postsBy/{user2.id}',
+            {
+                'posted_by_user_id': user2.id,
+                'post_items': [{k: p4_item[k] for k in ('postId', 'postedByUserId', 'postedAt')}],
+                'deleted_post_ids': [],
+            },
+        ),
+    ]
+
+
+def test_sync_posts_to_followers_feeds(feed_manager, user1):
+    post_items = [{'postId': pid, 'postedByUserId': user1.id, 'postedAt': 'pa'} for pid in ('pid1', 'pid2')]
+    feed_manager.chunk_size = 2
+    pages = {None: (['fuid1', 'fuid2'], 'token'), 'token': (['fuid3'], None)}
+    get_page = lambda user_id, limit, next_token: pages[next_token]  # noqa: E731
+    with patch.object(feed_manager.follower_manager, 'get_follower_user_ids_page', side_effect=get_page):
+        with patch.object(
+            feed_manager, 'dynamo', **{'delete_by_post.return_value': ['fuid1', 'fuid4']}
+        ) as dynamo_mock:
+            dynamo_mock.add_posts_to_feeds.side_effect = lambda user_ids, post_items: list(user_ids)
+            with patch.object(feed_manager, 'appsync_client') as appsync_client_mock:
+                # first chunk: deletes, then adds to the poster's own feed and the first page of followers
+                cursor = feed_manager.sync_posts_to_followers_feeds(user1.id, post_items, ['pid3'])
+                assert cursor == 'token'
+                assert dynamo_mock.mock_calls[0] == call.delete_by_post('pid3')
+                assert dynamo_mock.add_posts_to_feeds.call_args.args[1] == post_items
+                notified = [c.args[0] for c in appsync_client_mock.fire_notification.call_args_list]
+                assert notified == ['fuid1', 'fuid4', user1.id, 'fuid2']
+
+                # next chunk, only adds
+                dynamo_mock.reset_mock()
+                appsync_client_mock.reset_mock()
+                assert (
+                    feed_manager.sync_posts_to_followers_feeds(user1.id, post_items, ['pid3'], cursor=cursor)
+                    is None
+                )
+                assert dynamo_mock.delete_by_post.mock_calls == []
+                notified = [c.args[0] for c in appsync_client_mock.fire_notification.call_args_list]
+                assert notified == ['fuid3']
+
+
+def test_on_posts_status_change_sync_feeds_worked_in_chunks(feed_manager, follower_manager, user1, user2, post):
+    # user2 follows user1, and a deferred work queue is in use
+    follower_manager.request_to_follow(user2, user1)
+    feed_manager.work_queue_client = LocalWorkQueueClient(deferred=True)
+    feed_manager.work_queue_client.funcs = feed_manager.follower_manager.work_queue_client.funcs = {}
+    feed_manager.work_queue_client.register(
+        'feed.sync_posts_to_followers_feeds', feed_manager.sync_posts_to_followers_feeds
+    )
+    feed_manager.on_post_status_change_sync_feed(post.id, new_item=post.item)
+    assert list(feed_manager.dynamo.generate_items(user2.id)) == []
+
+    feed_manager.work_queue_client.work()
+    assert [item['postId'] for item in feed_manager.dynamo.generate_items(user1.id)] == [post.id]
+    assert [item['postId'] for item in feed_manager.dynamo.generate_items(user2.id)] == [post.id]
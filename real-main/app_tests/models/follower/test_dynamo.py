@@ -145,6 +145,10 @@ def test_generate_followers(follower_dynamo, user1, user2, user3):
     assert resp[1]['followerUserId'] == other2_user.id
     assert resp[1]['followedUserId'] == our_user.id
 
+    # generate with a projection
+    resp = list(follower_dynamo.generate_follower_items(our_user.id, projection=('followerUserId',)))
+    assert resp == [{'followerUserId': other1_user.id}, {'followerUserId': other2_user.id}]
+
 
 def test_generate_followeds(follower_dynamo, user1, user2, user3):
     our_user = user1
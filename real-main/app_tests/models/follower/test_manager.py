@@ -347,3 +347,53 @@ def test_on_first_story_post_id_change_fire_gql_notifications(follower_manager,
             followedUserId=their_user.id,
         )
     ]
+
+
+def test_get_follower_user_ids_page(follower_manager, users, other_users):
+    our_user, their_user = users
+    other_user = other_users[0]
+    assert follower_manager.get_follower_user_ids_page(our_user.id) == ([], None)
+
+    # they follow us, other requests to
+    follower_manager.request_to_follow(their_user, our_user)
+    our_user.set_privacy_status(UserPrivacyStatus.PRIVATE)
+    follower_manager.request_to_follow(other_user, our_user)
+
+    uids, next_token = follower_manager.get_follower_user_ids_page(our_user.id)
+    assert sorted(uids) == sorted([their_user.id, other_user.id])
+    assert next_token is None
+    uids, next_token = follower_manager.get_follower_user_ids_page(
+        our_user.id, follow_status=FollowStatus.FOLLOWING, limit=10
+    )
+    assert uids == [their_user.id]
+    assert next_token is None
+
+
+def test_sync_first_story_in_chunks(follower_manager, users):
+    our_user, their_user = users
+    story = {'postId': 'pid', 'postedByUserId': our_user.id, 'expiresAt': pendulum.now('utc').to_iso8601_string()}
+    pages = {None: (['uid1', 'uid2'], 'token'), 'token': (['uid3'], None)}
+    get_page = lambda user_id, follow_status, limit, next_token: pages[next_token]  # noqa: E731
+
+    # set the story a chunk at a time
+    follower_manager.first_story_chunk_size = 2
+    with patch.object(follower_manager, 'get_follower_user_ids_page', side_effect=get_page) as get_page_mock:
+        with patch.object(follower_manager, 'first_story_dynamo') as first_story_dynamo_mock:
+            assert follower_manager.sync_first_story(our_user.id, story=story) == 'token'
+            assert follower_manager.sync_first_story(our_user.id, story=story, cursor='token') is None
+    assert get_page_mock.mock_calls == [
+        call(our_user.id, follow_status=FollowStatus.FOLLOWING, limit=2, next_token=None),
+        call(our_user.id, follow_status=FollowStatus.FOLLOWING, limit=2, next_token='token'),
+    ]
+    assert [(list(c.args[0]), c.args[1]) for c in first_story_dynamo_mock.set_all.call_args_list] == [
+        (['uid1', 'uid2'], story),
+        (['uid3'], story),
+    ]
+
+    # delete it, from real followers
+    follower_manager.request_to_follow(their_user, our_user)
+    with patch.object(follower_manager, 'first_story_dynamo') as first_story_dynamo_mock:
+        assert follower_manager.sync_first_story(our_user.id) is None
+    assert [(list(c.args[0]), c.args[1]) for c in first_story_dynamo_mock.delete_all.call_args_list] == [
+        ([their_user.id], our_user.id),
+    ]
@@ -152,6 +152,13 @@ def test_generate_of_post(like_dynamo):
     liked_by_and_post_ids = sorted([(li['likedByUserId'], li['postId']) for li in like_items])
     assert liked_by_and_post_ids == [('luid1', 'pid'), ('luid2', 'pid')]
 
+    # generate with a projection
+    like_items = like_dynamo.generate_of_post(post_id, projection=('likedByUserId', 'likeStatus'))
+    assert sorted(like_items, key=lambda li: li['likedByUserId']) == [
+        {'likedByUserId': 'luid1', 'likeStatus': LikeStatus.ONYMOUSLY_LIKED},
+        {'likedByUserId': 'luid2', 'likeStatus': LikeStatus.ONYMOUSLY_LIKED},
+    ]
+
 
 def test_generate_by_liked_by(like_dynamo):
     liked_by_user_id = 'luid'
@@ -1,5 +1,6 @@
 import logging
 import uuid
+from unittest.mock import patch
 
 import pendulum
 import pytest
@@ -45,6 +46,28 @@ def test_get_post_dne(post_manager):
     assert post_manager.get_post('pid-dne') is None
 
 
+def test_get_posts(post_manager, posts):
+    post1, post2 = posts
+    assert post_manager.get_posts([]) == []
+    fetched = post_manager.get_posts([post2.id, 'pid-dne', post1.id])
+    assert [post.id if post else None for post in fetched] == [post2.id, None, post1.id]
+    assert fetched[0].item == post2.item
+    assert fetched[2].item == post1.item
+
+
+def test_get_posts_with_image_items(post_manager, posts):
+    post1, post2 = posts
+    post_manager.image_dynamo.set_initial_attributes(post1.id, image_format='HEIC')
+    fetched = post_manager.get_posts([post1.id, 'pid-dne', post2.id], with_image_items=True)
+    assert fetched[1] is None
+
+    # the image items are already loaded, so the posts don't go back to dynamo for them
+    with patch.object(post_manager.image_dynamo, 'get') as get_mock:
+        assert fetched[0].image_item['imageFormat'] == 'HEIC'
+        assert fetched[2].image_item == {}
+    assert get_mock.call_count == 0
+
+
 def test_add_post_errors(post_manager, user):
     # try to add a post without any content (no text or media)
     with pytest.raises(PostException, match='without text'):
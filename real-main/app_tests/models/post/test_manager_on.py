@@ -82,7 +82,7 @@ def test_on_flag_add_force_archive_by_crowdsourced_criteria(post_manager, post,
     assert post.status == PostStatus.ARCHIVED
 
 
-def test_on_like_add(post_manager, post, like_onymous, like_anonymous):
+def test_on_like_add(post_manager, post, like_onymous, like_anonymous, caplog):
     # check starting state
     post.refresh_item()
     assert post.item.get('onymousLikeCount', 0) == 0
@@ -107,13 +107,52 @@ def test_on_like_add(post_manager, post, like_onymous, like_anonymous):
     assert post.item.get('anonymousLikeCount', 0) == 2
 
     # checking junk like status
-    with pytest.raises(Exception, match='junkjunk'):
+    caplog.clear()
+    with caplog.at_level(logging.WARNING):
         post_manager.on_like_add(post.id, {**like_onymous.item, 'likeStatus': 'junkjunk'})
+    assert len(caplog.records) == 1
+    assert 'Unrecognized like status `junkjunk`' in caplog.records[0].msg
     post.refresh_item()
     assert post.item.get('onymousLikeCount', 0) == 1
     assert post.item.get('anonymousLikeCount', 0) == 2
 
 
+def test_on_like_add_coalesced_in_counter_batch(post_manager, post, like_onymous, like_anonymous):
+    with patch.object(post_manager.dynamo.client, 'update_item', wraps=post_manager.dynamo.client.update_item):
+        with post_manager.dynamo.client.counter_batch():
+            for _ in range(100):
+                post_manager.on_like_add(post.id, like_onymous.item)
+            post_manager.on_like_add(post.id, like_anonymous.item)
+            post_manager.on_like_delete(post.id, like_onymous.item)
+            assert post_manager.dynamo.client.update_item.call_count == 0
+        assert post_manager.dynamo.client.update_item.call_count == 2
+
+    post.refresh_item()
+    assert post.item['onymousLikeCount'] == 99
+    assert post.item['anonymousLikeCount'] == 1
+
+
+def test_on_likes_change_sync_counts(post_manager, post, like_onymous, like_anonymous, caplog):
+    post_manager.dynamo.increment_anonymous_like_count(post.id)
+    records = [
+        (post.id, None, like_onymous.item),
+        (post.id, None, like_onymous.item),
+        (post.id, like_anonymous.item, None),
+        (post.id, None, {**like_onymous.item, 'likeStatus': 'junkjunk'}),
+        (post.id, None, like_onymous.item),
+    ]
+    with patch.object(post_manager.dynamo.client, 'update_item', wraps=post_manager.dynamo.client.update_item):
+        # unrecognized statuses are logged and skipped, the rest of the batch is applied
+        with caplog.at_level(logging.WARNING):
+            post_manager.on_likes_change_sync_counts(records)
+        assert post_manager.dynamo.client.update_item.call_count == 2
+    assert len(caplog.records) == 1
+    assert 'Unrecognized like status `junkjunk`' in caplog.records[0].msg
+    post.refresh_item()
+    assert post.item['onymousLikeCount'] == 3
+    assert post.item['anonymousLikeCount'] == 0
+
+
 def test_on_like_delete(post_manager, post, like_onymous, like_anonymous, caplog):
     # configure and check starting state
     post_manager.dynamo.increment_onymous_like_count(post.id)
@@ -146,8 +185,11 @@ def test_on_like_delete(post_manager, post, like_onymous, like_anonymous, caplog
     assert post.item.get('anonymousLikeCount', 0) == 0
 
     # checking junk like status
-    with pytest.raises(Exception, match='junkjunk'):
+    caplog.clear()
+    with caplog.at_level(logging.WARNING):
         post_manager.on_like_delete(post.id, {**like_onymous.item, 'likeStatus': 'junkjunk'})
+    assert len(caplog.records) == 1
+    assert 'Unrecognized like status `junkjunk`' in caplog.records[0].msg
     post.refresh_item()
     assert post.item.get('onymousLikeCount', 0) == 0
     assert post.item.get('anonymousLikeCount', 0) == 0
@@ -445,3 +487,33 @@ def test_on_post_verification_hidden_change_update_is_verified(post_manager, pos
         post.refresh_item()
         assert post.item['isVerified'] is is_verified
         assert 'isVerifiedHiddenValue' not in post.item
+
+
+def test_remove_posts_from_album_in_chunks(post_manager, album_manager, user):
+    album = album_manager.add_album(user.id, str(uuid4()), 'a1')
+    post1 = post_manager.add_post(user, str(uuid4()), PostType.TEXT_ONLY, text='hey!', album_id=album.id)
+    post2 = post_manager.add_post(user, str(uuid4()), PostType.TEXT_ONLY, text='hey!', album_id=album.id)
+
+    # the listener just queues the task
+    with patch.object(post_manager, 'work_queue_client') as work_queue_client_mock:
+        post_manager.on_album_delete_remove_posts(album.id, old_item=album.item)
+    assert work_queue_client_mock.mock_calls == [
+        call.send_tasks(
+            [{'name': 'post.remove_posts_from_album', 'key': f'album/{album.id}', 'args': {'album_id': album.id}}]
+        )
+    ]
+
+    # work the task a chunk at a time
+    post_manager.remove_from_album_chunk_size = 1
+    pages = {None: ([post1.id], 'token'), 'token': ([post2.id], None)}
+    get_page = lambda album_id, limit, next_token: pages[next_token]  # noqa: E731
+    with patch.object(post_manager.dynamo, 'query_post_ids_in_album', side_effect=get_page) as query_mock:
+        assert post_manager.remove_posts_from_album(album.id) == 'token'
+        assert 'albumId' not in post1.refresh_item().item
+        assert post2.refresh_item().item['albumId'] == album.id
+        assert post_manager.remove_posts_from_album(album.id, cursor='token') is None
+        assert 'albumId' not in post2.refresh_item().item
+    assert query_mock.mock_calls == [
+        call(album.id, limit=1, next_token=None),
+        call(album.id, limit=1, next_token='token'),
+    ]
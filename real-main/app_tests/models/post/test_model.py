@@ -12,6 +12,7 @@ from app.models.post.exceptions import PostException
 from app.models.post.model import Post
 from app.models.user.enums import UserSubscriptionLevel
 from app.utils import image_size
+from app_tests.dynamodb.utils import max_dynamo_calls
 
 grant_height = 320
 grant_width = 240
@@ -157,6 +158,25 @@ def test_get_image_readonly_url(cloudfront_client, s3_uploads_client):
     assert cloudfront_client.mock_calls == [mock.call.generate_presigned_url(expected_path, ['GET', 'HEAD'])]
 
 
+def test_get_image_readonly_urls(cloudfront_client, s3_uploads_client):
+    item = {
+        'postedByUserId': 'user-id',
+        'postId': 'post-id',
+        'postType': PostType.IMAGE,
+        'postStatus': PostStatus.COMPLETED,
+    }
+    expected_urls = ['url-native', 'url-64p']
+    cloudfront_client.configure_mock(**{'generate_presigned_urls.return_value': expected_urls})
+
+    post = Post(item, cloudfront_client=cloudfront_client, s3_uploads_client=s3_uploads_client)
+    assert post.get_image_readonly_urls([image_size.NATIVE, image_size.P64]) == expected_urls
+    assert cloudfront_client.mock_calls == [
+        mock.call.generate_presigned_urls(
+            'user-id/post/post-id/image', ['native.jpg', '64p.jpg'], ['GET', 'HEAD']
+        )
+    ]
+
+
 def test_get_hls_access_cookies(cloudfront_client, s3_uploads_client):
     user_id = 'uid'
     post_id = 'pid'
@@ -399,6 +419,37 @@ def test_serailize(user, post, user_manager):
     assert resp == post.item
 
 
+@max_dynamo_calls(2, allow_repeated_get_items=False)
+def test_serialize_reuses_loaded_user(post, dynamo_tracer):
+    assert post.user
+    with dynamo_tracer.invocation('serialize'):
+        post.serialize('caller-uid')
+    assert dynamo_tracer.summary('serialize') == {
+        ('GetItem', 'main-table', None, ('user', 'blocker')): 1,
+        ('GetItem', 'main-table', None, ('user', 'follower')): 1,
+    }
+
+
+@pytest.mark.parametrize(
+    'selection_set, has_posted_by, reads',
+    [
+        [['postId'], False, {}],
+        [['postId', 'postedBy', 'postedBy/username'], True, {}],
+        [['viewedByCount'], True, {}],
+        [['postedBy', 'postedBy/followedStatus'], True, {('user', 'follower'): 1}],
+        [['album', 'album/ownedBy', 'album/ownedBy/blockerStatus'], True, {('user', 'blocker'): 1}],
+    ],
+)
+def test_serialize_selection_set(post, dynamo_tracer, selection_set, has_posted_by, reads):
+    assert post.user
+    with dynamo_tracer.invocation('serialize'):
+        resp = post.serialize('caller-uid', selection_set=selection_set)
+    assert ('postedBy' in resp) is has_posted_by
+    assert dynamo_tracer.summary('serialize') == {
+        ('GetItem', 'main-table', None, key_prefix): count for key_prefix, count in reads.items()
+    }
+
+
 def test_error_failure(post_manager, post):
     # verify can't change a completed post to error
     with pytest.raises(PostException, match='PENDING'):
@@ -54,6 +54,16 @@ def test_on_comment_add_adjusts_counts(user_manager, user, comment):
     assert new_item == org_item
 
 
+def test_on_comments_change_sync_counts(user_manager, user, comment):
+    records = [(comment.id, None, comment.item)] * 3 + [(comment.id, comment.item, None)]
+    with patch.object(user_manager.dynamo.client, 'update_item', wraps=user_manager.dynamo.client.update_item):
+        user_manager.on_comments_change_sync_counts(records)
+        assert user_manager.dynamo.client.update_item.call_count == 2
+    user.refresh_item()
+    assert user.item['commentCount'] == 2
+    assert user.item['commentDeletedCount'] == 1
+
+
 def test_on_comment_delete_adjusts_counts(user_manager, user, comment, caplog):
     # configure, check & save starting state
     user_manager.on_comment_add(comment.id, comment.item)
@@ -1,4 +1,7 @@
+import glob
 import logging
+import os
+import re
 from unittest.mock import Mock, call, patch
 from uuid import uuid4
 
@@ -7,6 +10,7 @@ import pytest
 
 from app.models.follower.enums import FollowStatus
 from app.models.user.enums import UserPrivacyStatus, UserStatus, UserSubscriptionLevel
+from app.models.user.model import User
 from app.models.user.exceptions import (
     UserAlreadyGrantedSubscription,
     UserException,
@@ -480,6 +484,52 @@ def test_serialize_deleting(user, user2):
         user.serialize(user.id)
 
 
+def test_serialize_selection_set(user, user2, dynamo_tracer):
+    with dynamo_tracer.invocation('serialize'):
+        resp = user.serialize(user2.id, selection_set=['userId', 'username', 'photo', 'photo/url'])
+    assert resp['userId'] == user.id
+    assert 'blockerStatus' not in resp
+    assert 'followedStatus' not in resp
+    assert dynamo_tracer.summary('serialize') == {}
+
+    resp = user.serialize(user2.id, selection_set=['userId', 'blockerStatus'])
+    assert resp['blockerStatus'] == 'NOT_BLOCKING'
+    assert 'followedStatus' not in resp
+
+    # the resolvers of some fields need the statuses whether they are selected or not
+    resp = user.serialize(user2.id, selection_set=['userId', 'followerCount'])
+    assert resp['blockerStatus'] == 'NOT_BLOCKING'
+    assert resp['followedStatus'] == 'NOT_FOLLOWING'
+    resp = user.serialize(user2.id, selection_set=['postCount'])
+    assert resp['blockerStatus'] == 'NOT_BLOCKING'
+    assert 'followedStatus' not in resp
+
+    # each field alone, with its resolver as it hides content of blocking and private users
+    for field in ['bio', 'posts', 'stories', 'albums', 'albumCount']:
+        resp = user.serialize(user2.id, selection_set=[field])
+        assert resp['blockerStatus'] == 'NOT_BLOCKING'
+        assert resp['followedStatus'] == 'NOT_FOLLOWING'
+    resp = user.serialize(user2.id, selection_set=['subscriptionLevel'])
+    assert resp['blockerStatus'] == 'NOT_BLOCKING'
+    assert 'followedStatus' not in resp
+
+
+def test_serialized_field_dependents_match_mapping_templates():
+    templates_dir = os.path.join(os.path.dirname(__file__), '..', '..', '..', 'mapping-templates')
+    dependents = {field: [] for field in User.serialized_field_dependents}
+    for path in sorted(glob.glob(os.path.join(templates_dir, 'User.*.request.vtl'))):
+        with open(path) as fh:
+            template = fh.read()
+        for field in dependents:
+            # the templates alias $ctx.source, ex: `#set ($user = $ctx.source)` then `$user.blockerStatus`
+            if re.search(rf'\.{field}\b', template):
+                dependents[field].append(os.path.basename(path).split('.')[1])
+    assert dependents['blockerStatus']
+    assert {field: sorted(names) for field, names in User.serialized_field_dependents.items()} == {
+        field: sorted(names) for field, names in dependents.items()
+    }
+
+
 def test_is_forced_disabling_criteria_met_by_posts(user):
     # check starting state
     assert user.item.get('postCount', 0) == 0
@@ -109,6 +109,31 @@ def test_get_photo_url(user, uploaded_post, cloudfront_client):
         cloudfront_client.reset_mock()
 
 
+def test_get_photo_urls(user, uploaded_post, cloudfront_client):
+    user.placeholder_photos_directory = 'pp-photo-dir'
+    user.frontend_resources_domain = 'pp-photo-domain'
+
+    # neither set
+    assert user.get_photo_urls(image_size.JPEGS) == [None] * len(image_size.JPEGS)
+
+    # placeholder code set, no signing needed
+    user.item['placeholderPhotoCode'] = 'pp-code'
+    assert user.get_photo_urls(image_size.JPEGS) == [user.get_photo_url(size) for size in image_size.JPEGS]
+
+    # photo post set, signed for all sizes at once
+    user.update_photo(uploaded_post.id)
+    presigned_urls = ['url1', 'url2']
+    cloudfront_client.configure_mock(**{'generate_presigned_urls.return_value': presigned_urls})
+    cloudfront_client.reset_mock()
+    sizes = [image_size.NATIVE, image_size.K4]
+    assert user.get_photo_urls(sizes) is presigned_urls
+    path_prefix = f'{user.id}/profile-photo/{uploaded_post.id}'
+    assert user.get_photo_path(image_size.NATIVE).startswith(path_prefix + '/')
+    assert cloudfront_client.mock_calls == [
+        mock.call.generate_presigned_urls(path_prefix, ['native.jpg', '4K.jpg'], ['GET', 'HEAD'])
+    ]
+
+
 def test_set_photo_multiple_times(user, uploaded_post, another_uploaded_post):
     # verify it's not already set
     user.refresh_item()
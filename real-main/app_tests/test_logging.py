@@ -0,0 +1,41 @@
+import logging
+import threading
+
+from app.logging import LogLevelContext
+
+
+def test_log_level_context(caplog):
+    logger = logging.getLogger('test_log_level_context')
+    logger.setLevel(logging.WARNING)
+    with LogLevelContext(logger, logging.INFO):
+        logger.info('inside')
+        logger.debug('too verbose')
+    logger.info('outside')
+    assert [record.getMessage() for record in caplog.records] == ['inside']
+    assert logger.level == logging.WARNING
+
+
+def test_log_level_context_per_thread(caplog):
+    logger = logging.getLogger('test_log_level_context_per_thread')
+    logger.setLevel(logging.WARNING)
+    entered, done = threading.Event(), threading.Event()
+    overlapped = []
+
+    def other_thread():
+        # overlaps with the context of the main thread, without waiting for it to exit
+        with LogLevelContext(logger, logging.INFO):
+            entered.set()
+            overlapped.append(done.wait(timeout=5))
+            logger.info('other thread')
+
+    thread = threading.Thread(target=other_thread)
+    thread.start()
+    assert entered.wait(timeout=5)
+    with LogLevelContext(logger, logging.ERROR):
+        logger.info('main thread')
+        logger.warning('main thread warning')
+        done.set()
+        thread.join(timeout=5)
+    logger.info('main thread outside')
+    assert overlapped == [True]
+    assert [record.getMessage() for record in caplog.records] == ['other thread']
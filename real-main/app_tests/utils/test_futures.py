@@ -0,0 +1,51 @@
+import contextvars
+import threading
+import time
+
+import pytest
+
+from app.utils import gather
+
+
+def test_gather_returns_results_in_order():
+    assert gather() == []
+    assert gather(lambda: 1) == [1]
+    assert gather(lambda: 1, lambda: 2, lambda: 3) == [1, 2, 3]
+
+
+def test_gather_runs_concurrently():
+    barrier = threading.Barrier(3, timeout=5)
+
+    def wait_for_all():
+        barrier.wait()
+        return threading.get_ident()
+
+    thread_ids = gather(wait_for_all, wait_for_all, wait_for_all)
+    # first callable runs in the calling thread, the rest elsewhere
+    assert thread_ids[0] == threading.get_ident()
+    assert len(set(thread_ids)) == 3
+
+
+def test_gather_raises_first_error_after_all_complete():
+    completed = []
+
+    def slow():
+        time.sleep(0.1)
+        completed.append('slow')
+
+    def fail(msg):
+        raise Exception(msg)
+
+    with pytest.raises(Exception, match='first'):
+        gather(lambda: fail('first'), slow, lambda: fail('second'))
+    assert completed == ['slow']
+
+
+def test_gather_nested():
+    assert gather(lambda: gather(lambda: 1, lambda: 2), lambda: gather(lambda: 3, lambda: 4)) == [[1, 2], [3, 4]]
+
+
+def test_gather_carries_context_variables():
+    var = contextvars.ContextVar('var', default=None)
+    var.set('outer')
+    assert gather(var.get, var.get, var.get) == ['outer', 'outer', 'outer']
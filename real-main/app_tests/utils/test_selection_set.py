@@ -0,0 +1,22 @@
+from app.utils.selection_set import is_selected, sub_selection
+
+
+def test_is_selected():
+    selection_set = ['userId', 'photo', 'photo/url']
+    assert is_selected(selection_set, 'userId')
+    assert is_selected(selection_set, 'photo/url')
+    assert is_selected(selection_set, 'username', 'photo')
+    assert not is_selected(selection_set, 'username')
+    assert not is_selected(selection_set, 'url')
+    assert not is_selected([], 'userId')
+    assert is_selected(None, 'anything')
+
+
+def test_sub_selection():
+    selection_set = ['postId', 'postedBy', 'postedBy/userId', 'postedBy/photo', 'postedBy/photo/url', 'album']
+    assert sub_selection(selection_set, 'postedBy') == ['userId', 'photo', 'photo/url']
+    assert sub_selection(selection_set, 'postedBy/photo') == ['url']
+    assert sub_selection(selection_set, 'album') == []
+    assert sub_selection(selection_set, 'post') == []
+    assert sub_selection(['a/x', 'b/y', 'c/z'], 'a', 'b') == ['x', 'y']
+    assert sub_selection(None, 'postedBy') is None
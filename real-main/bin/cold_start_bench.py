@@ -0,0 +1,100 @@
+#!/usr/bin/env python
+"""
+Cold start benchmark for the lambda handler entry points.
+
+Each entry point module is imported in a fresh interpreter, as lambda does on a cold start, and the time
+split between importing the app's shared packages (`app.clients`, `app.models`) and the rest of the
+handler module's import, which includes building its clients and managers.
+
+    python -m bin.cold_start_bench
+    python -m bin.cold_start_bench appsync s3 -n 20
+
+No AWS calls are made, the app is configured with placeholder values from the environment.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+# entry point name -> handler module, as configured in serverless.yml
+ENTRY_POINTS = {
+    'appsync': 'app.handlers.appsync.dispatch',
+    'cognito': 'app.handlers.cognito',
+    'cron': 'app.handlers.cron',
+    'dynamo': 'app.handlers.dynamo.handlers',
+    's3': 'app.handlers.s3',
+    'work_queue': 'app.handlers.work_queue',
+}
+
+# the environment the app is configured from at import, with placeholders for everything clients require
+LOCAL_ENV = {
+    'AWS_DEFAULT_REGION': 'us-east-1',
+    'AWS_ACCESS_KEY_ID': 'testing',
+    'AWS_SECRET_ACCESS_KEY': 'testing',
+    'AWS_XRAY_SDK_ENABLED': 'false',
+    'APPSYNC_GRAPHQL_URL': 'https://appsync.bench/graphql',
+    'CLOUDFRONT_UPLOADS_DOMAIN': 'cloudfront.bench',
+    'COGNITO_USER_POOL_ID': 'us-east-1_bench',
+    'COGNITO_USER_POOL_BACKEND_CLIENT_ID': 'cognito-bench',
+    'DYNAMO_TABLE': 'main-table',
+    'DYNAMO_FEED_TABLE': 'feed-table',
+    'ELASTICSEARCH_DOMAIN': 'elasticsearch.bench',
+    'MEDIACONVERT_ROLE_ARN': 'arn:aws:iam::123456789012:role/bench',
+    'PINPOINT_APPLICATION_ID': 'pinpoint-bench',
+    'S3_PLACEHOLDER_PHOTOS_BUCKET': 'placeholder-photos-bucket',
+    'S3_UPLOADS_BUCKET': 'uploads-bucket',
+}
+
+# run in the fresh interpreter, prints the timings as json
+MEASURE = '''
+import importlib, json, sys, time
+start = time.perf_counter()
+import app.clients, app.models
+shared = time.perf_counter()
+importlib.import_module(sys.argv[1])
+end = time.perf_counter()
+print(json.dumps({'shared': shared - start, 'handler': end - shared}))
+'''
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='Measure import and init time of the lambda entry points')
+    parser.add_argument('entry_points', nargs='*', help=f'Any of {", ".join(ENTRY_POINTS)}. Default: all of them')
+    parser.add_argument('-n', dest='runs', type=int, default=10, help='Cold starts per entry point')
+    return parser.parse_args()
+
+
+def measure(module, runs):
+    env = {**LOCAL_ENV, **os.environ}
+    timings = []
+    for _ in range(runs):
+        proc = subprocess.run(
+            [sys.executable, '-c', MEASURE, module], env=env, capture_output=True, text=True, check=False
+        )
+        if proc.returncode != 0:
+            raise Exception(f'Importing `{module}` failed:\n{proc.stderr}')
+        timings.append(json.loads(proc.stdout.strip().splitlines()[-1]))
+    return timings
+
+
+def main():
+    args = parse_args()
+    names = args.entry_points or list(ENTRY_POINTS)
+    unknown = set(names) - set(ENTRY_POINTS)
+    if unknown:
+        sys.exit(f'Unknown entry points: {", ".join(sorted(unknown))}')
+    print(f'{"entry point":<12} {"shared ms":>10} {"handler ms":>11} {"total ms":>9} {"min ms":>7}')
+    for name in names:
+        timings = measure(ENTRY_POINTS[name], args.runs)
+        shared = statistics.median(t['shared'] * 1000 for t in timings)
+        handler = statistics.median(t['handler'] * 1000 for t in timings)
+        totals = [(t['shared'] + t['handler']) * 1000 for t in timings]
+        print(
+            f'{name:<12} {shared:>10.1f} {handler:>11.1f} {statistics.median(totals):>9.1f} {min(totals):>7.1f}'
+        )
+
+
+if __name__ == '__main__':
+    main()
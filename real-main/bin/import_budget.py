@@ -0,0 +1,99 @@
+#!/usr/bin/env python
+"""
+Import time budget for the lambda handler entry points.
+
+Each entry point module is imported in a fresh interpreter under `python -X importtime`. The cumulative
+import time of the module is reported along with the top level packages that account for most of it.
+Exits non-zero if any entry point goes over budget, so it can be run in CI.
+
+    python -m bin.import_budget
+    python -m bin.import_budget cron cognito --budget-ms 400 -n 5
+"""
+import argparse
+import collections
+import os
+import re
+import statistics
+import subprocess
+import sys
+
+from bin.cold_start_bench import ENTRY_POINTS, LOCAL_ENV
+
+# ex: 'import time:       409 |     479922 |   app.models'
+IMPORTTIME_LINE = re.compile(r'^import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)$')
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='Check the import time of the lambda entry points')
+    parser.add_argument('entry_points', nargs='*', help=f'Any of {", ".join(ENTRY_POINTS)}. Default: all of them')
+    parser.add_argument('--budget-ms', type=float, default=1000, help='Max import time of each entry point')
+    parser.add_argument(
+        '-n', dest='runs', type=int, default=3, help='Imports per entry point, the median is used'
+    )
+    parser.add_argument('--top', type=int, default=8, help='Number of top level packages to list')
+    return parser.parse_args()
+
+
+def parse_importtime(stderr, module):
+    """
+    Parse the output of `-X importtime -c 'import <module>'` into the cumulative import time of
+    `module` in microseconds, and a {top level package: self time in microseconds} dict of its imports.
+    The interpreter's own startup imports are excluded.
+    """
+    subtree = collections.Counter()
+    for line in stderr.splitlines():
+        match = IMPORTTIME_LINE.match(line)
+        if not match:
+            continue
+        self_us, cumulative_us, indent, name = match.groups()
+        subtree[name.split('.')[0]] += int(self_us)
+        # a module's own line comes after those of everything it imported
+        if len(indent) == 1:
+            if name == module:
+                return int(cumulative_us), subtree
+            subtree = collections.Counter()
+    raise Exception(f'No import time reported for `{module}`')
+
+
+def measure(module, runs):
+    env = {**LOCAL_ENV, **os.environ}
+    results = []
+    for _ in range(runs):
+        proc = subprocess.run(
+            [sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+            env=env,
+            capture_output=True,
+            text=True,
+            check=False,
+        )
+        if proc.returncode != 0:
+            raise Exception(f'Importing `{module}` failed:\n{proc.stderr}')
+        results.append(parse_importtime(proc.stderr, module))
+    return results
+
+
+def main():
+    args = parse_args()
+    names = args.entry_points or list(ENTRY_POINTS)
+    unknown = set(names) - set(ENTRY_POINTS)
+    if unknown:
+        sys.exit(f'Unknown entry points: {", ".join(sorted(unknown))}')
+
+    over_budget = []
+    for name in names:
+        results = measure(ENTRY_POINTS[name], args.runs)
+        total_ms = statistics.median(total for total, _ in results) / 1000
+        packages = sum((packages for _, packages in results), collections.Counter())
+        status = 'OVER BUDGET' if total_ms > args.budget_ms else 'ok'
+        print(f'{name:<12} {total_ms:>8.1f} ms  {status}')
+        for package, self_us in packages.most_common(args.top):
+            print(f'    {package:<28} {self_us / len(results) / 1000:>8.1f} ms')
+        if total_ms > args.budget_ms:
+            over_budget.append(name)
+
+    if over_budget:
+        sys.exit(f'Over the {args.budget_ms:.0f} ms import budget: {", ".join(over_budget)}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,487 @@
+#!/usr/bin/env python
+"""
+Capture and replay benchmark for the dynamo stream handler.
+
+Stream batches are stored as NDJSON fixtures: one lambda event of {"Records": [...]} per line,
+optionally preceded by lines of {"Items": [...]} with typed items to seed the table with.
+
+    # record batches from the stream of a real table
+    python -m bin.stream_bench capture -t <table name> -o captured.ndjson -n 1000
+
+    # generate a synthetic workload
+    python -m bin.stream_bench generate likes -o likes.ndjson --scale 500
+
+    # replay a fixture through process_records against moto, with fake appsync, elasticsearch & pinpoint clients
+    python -m bin.stream_bench replay likes.ndjson --appsync-ms 20 --concurrency 4
+
+Replay applies each batch's records to the table before processing it, so listeners see the items as they
+were written. Work queue tasks are worked inline, and counted against the listener that sent them.
+"""
+import argparse
+import contextlib
+import json
+import logging
+import os
+import random
+import sys
+import time
+import types
+import uuid
+from unittest import mock
+
+import boto3
+import pendulum
+
+WORKLOADS = {}
+
+# the environment the app is configured from at import, for running against moto
+LOCAL_ENV = {
+    'AWS_DEFAULT_REGION': 'us-east-1',
+    'AWS_ACCESS_KEY_ID': 'testing',
+    'AWS_SECRET_ACCESS_KEY': 'testing',
+    'AWS_XRAY_SDK_ENABLED': 'false',
+    'APPSYNC_GRAPHQL_URL': 'https://appsync.bench/graphql',
+    'DYNAMO_TABLE': 'main-table',
+    'DYNAMO_FEED_TABLE': 'feed-table',
+    'ELASTICSEARCH_DOMAIN': 'elasticsearch.bench',
+    'PINPOINT_APPLICATION_ID': 'pinpoint-bench',
+    'S3_UPLOADS_BUCKET': 'uploads-bucket',
+}
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='Capture, generate and replay dynamo stream batches')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    capture = subparsers.add_parser('capture', help='Record batches from the stream of a real table')
+    capture.add_argument('-t', dest='table_name', required=True, help='Name of the table with the stream')
+    capture.add_argument('-o', dest='output', required=True, help='NDJSON fixture to write')
+    capture.add_argument('-n', dest='max_records', type=int, default=1000, help='Stop after this many records')
+    capture.add_argument('--from-start', action='store_true', help='Read from TRIM_HORIZON rather than LATEST')
+
+    generate = subparsers.add_parser('generate', help='Generate a synthetic workload')
+    generate.add_argument('workload', choices=sorted(WORKLOADS))
+    generate.add_argument('-o', dest='output', required=True, help='NDJSON fixture to write')
+    generate.add_argument('--scale', type=int, default=200, help='Number of users / likes / messages')
+    generate.add_argument('--batch-size', type=int, default=100, help='Records per batch, as lambda BatchSize')
+    generate.add_argument('--seed', type=int, default=0, help='Seed for the random number generator')
+
+    replay = subparsers.add_parser('replay', help='Replay a fixture through process_records')
+    replay.add_argument('fixture', help='NDJSON fixture to replay')
+    replay.add_argument('--concurrency', type=int, default=1, help='As DYNAMO_STREAM_CONCURRENCY')
+    replay.add_argument('--appsync-ms', type=float, default=20, help='Latency of each appsync call')
+    replay.add_argument('--elasticsearch-ms', type=float, default=30, help='Latency of each elasticsearch call')
+    replay.add_argument('--pinpoint-ms', type=float, default=20, help='Latency of each pinpoint call')
+    replay.add_argument('--verbose', action='store_true', help='Show log output of the listeners')
+
+    return parser.parse_args()
+
+
+def write_fixture(path, batches, seed_items=None):
+    with open(path, 'w') as fh:
+        if seed_items:
+            fh.write(json.dumps({'Items': seed_items}, default=str) + '\n')
+        for records in batches:
+            fh.write(json.dumps({'Records': records}, default=str) + '\n')
+
+
+def read_fixture(path):
+    "Returns a ([seed_item, ...], [[record, ...], ...]) tuple"
+    seed_items, batches = [], []
+    with open(path) as fh:
+        for line in fh:
+            if not line.strip():
+                continue
+            event = json.loads(line)
+            seed_items.extend(event.get('Items', []))
+            if 'Records' in event:
+                batches.append(event['Records'])
+    return seed_items, batches
+
+
+def chunks(items, size):
+    return [items[start : start + size] for start in range(0, len(items), size)]
+
+
+def capture(table_name, output, max_records, from_start=False):
+    "Read records from each shard of the table's stream until `max_records` have been read, or the stream is idle"
+    stream_arn = boto3.client('dynamodb').describe_table(TableName=table_name)['Table']['LatestStreamArn']
+    streams = boto3.client('dynamodbstreams')
+    shards = streams.describe_stream(StreamArn=stream_arn)['StreamDescription']['Shards']
+    iterator_type = 'TRIM_HORIZON' if from_start else 'LATEST'
+    iterators = [
+        streams.get_shard_iterator(
+            StreamArn=stream_arn, ShardId=shard['ShardId'], ShardIteratorType=iterator_type
+        )['ShardIterator']
+        for shard in shards
+        if 'EndingSequenceNumber' not in shard['SequenceNumberRange'] or from_start
+    ]
+    batches, record_count, idle_polls = [], 0, 0
+    while iterators and record_count < max_records and idle_polls < 10:
+        next_iterators, got_records = [], False
+        for iterator in iterators:
+            resp = streams.get_records(ShardIterator=iterator, Limit=min(100, max_records - record_count))
+            if resp['Records']:
+                batches.append(resp['Records'])
+                record_count += len(resp['Records'])
+                got_records = True
+            if resp.get('NextShardIterator'):
+                next_iterators.append(resp['NextShardIterator'])
+        iterators = next_iterators
+        idle_polls = 0 if got_records else idle_polls + 1
+        if not got_records:
+            time.sleep(1)
+    write_fixture(output, batches)
+    print(f'Captured {record_count} records in {len(batches)} batches to `{output}`')
+
+
+@contextlib.contextmanager
+def local_app():
+    "Configure the app for, and start, moto. Yields the main and feed table DynamoClients"
+    for name, value in LOCAL_ENV.items():
+        os.environ.setdefault(name, value)
+    import moto
+
+    from app import clients
+    from app_tests.dynamodb.table_schema import feed_table_schema, main_table_schema
+
+    with moto.mock_dynamodb2(), moto.mock_s3():
+        boto3.client('s3').create_bucket(Bucket=os.environ['S3_UPLOADS_BUCKET'])
+        yield (
+            clients.DynamoClient(table_name=os.environ['DYNAMO_TABLE'], create_table_schema=main_table_schema),
+            clients.DynamoClient(
+                table_name=os.environ['DYNAMO_FEED_TABLE'], create_table_schema=feed_table_schema
+            ),
+        )
+
+
+class StreamRecorder:
+    """
+    Records the writes made through a DynamoClient as the stream records dynamo would produce for them,
+    by reading each written item before and after the write.
+    """
+
+    write_operations = {'BatchWriteItem', 'DeleteItem', 'PutItem', 'TransactWriteItems', 'UpdateItem'}
+    key_names = ('partitionKey', 'sortKey')
+
+    def __init__(self, dynamo_client):
+        self.table_name = dynamo_client.table_name
+        # a client of its own, so its reads aren't recorded
+        self.reader = boto3.client('dynamodb')
+        self.records = []
+        self.recording = False
+        self.seed_items = []
+        dynamo_client.register_event('provide-client-params.dynamodb', self.on_provide_client_params)
+        dynamo_client.register_event('after-call.dynamodb', self.on_after_call)
+
+    def start(self):
+        "Start recording, with what is in the table by then as the seed"
+        self.seed_items = self.scan_items()
+        self.recording = True
+
+    def written_keys(self, operation, params):
+        if operation in ('PutItem', 'UpdateItem', 'DeleteItem'):
+            writes = [(params['TableName'], params.get('Key') or params.get('Item'))]
+        elif operation == 'TransactWriteItems':
+            writes = [
+                (write['TableName'], write.get('Key') or write.get('Item'))
+                for transact_item in params['TransactItems']
+                for op, write in transact_item.items()
+                if op != 'ConditionCheck'
+            ]
+        else:
+            writes = [
+                (table_name, (request.get('PutRequest') or {}).get('Item') or request['DeleteRequest']['Key'])
+                for table_name, requests in params['RequestItems'].items()
+                for request in requests
+            ]
+        # keys are strings, typed already unless the call is through a Table resource
+        return [
+            {name: item[name] if isinstance(item[name], dict) else {'S': item[name]} for name in self.key_names}
+            for table_name, item in writes
+            if table_name == self.table_name
+        ]
+
+    def get_item(self, key):
+        return self.reader.get_item(TableName=self.table_name, Key=key, ConsistentRead=True).get('Item')
+
+    def on_provide_client_params(self, model, params, context, **kwargs):
+        if not self.recording or model.name not in self.write_operations:
+            return
+        context['streamRecorderWrites'] = [
+            (key, self.get_item(key)) for key in self.written_keys(model.name, params)
+        ]
+
+    def on_after_call(self, context, **kwargs):
+        for key, old_image in context.pop('streamRecorderWrites', []):
+            new_image = self.get_item(key)
+            if new_image == old_image:
+                # ex: a failed condition
+                continue
+            event_name = 'MODIFY' if old_image and new_image else 'INSERT' if new_image else 'REMOVE'
+            dynamodb = {'Keys': key, 'SequenceNumber': str(len(self.records) + 1).zfill(21)}
+            if old_image:
+                dynamodb['OldImage'] = old_image
+            if new_image:
+                dynamodb['NewImage'] = new_image
+            self.records.append({'eventID': uuid.uuid4().hex, 'eventName': event_name, 'dynamodb': dynamodb})
+
+    def scan_items(self):
+        "All the items in the table, typed"
+        paginator = self.reader.get_paginator('scan')
+        return [item for page in paginator.paginate(TableName=self.table_name) for item in page['Items']]
+
+
+def workload(func):
+    WORKLOADS[func.__name__] = func
+    return func
+
+
+def add_users(dynamos, count):
+    user_ids = [str(uuid.uuid4()) for _ in range(count)]
+    for user_id in user_ids:
+        dynamos['user'].add_user(user_id, f'u{user_id[:12]}')
+    return user_ids
+
+
+@workload
+def followers(dynamos, recorder, rnd, scale):
+    """
+    A power-law follower graph: the i-th user has about `scale / i` followers. Then the most followed users
+    each complete a post, which fans out to their followers' feeds.
+    """
+    from app.models.follower.enums import FollowStatus
+    from app.models.post.enums import PostStatus, PostType
+
+    user_ids = add_users(dynamos, scale)
+    follows = []
+    for rank, followed_user_id in enumerate(user_ids, start=1):
+        follower_count = min(scale - 1, max(1, round(scale / rank)))
+        others = [user_id for user_id in user_ids if user_id != followed_user_id]
+        follows.extend(
+            (follower_user_id, followed_user_id) for follower_user_id in rnd.sample(others, follower_count)
+        )
+    rnd.shuffle(follows)
+
+    recorder.start()
+    for follower_user_id, followed_user_id in follows:
+        dynamos['follower'].add_following(follower_user_id, followed_user_id, FollowStatus.FOLLOWING)
+    for user_id in user_ids[:5]:
+        post_item = dynamos['post'].add_pending_post(user_id, str(uuid.uuid4()), PostType.TEXT_ONLY, text='hi')
+        dynamos['post'].set_post_status(post_item, PostStatus.COMPLETED)
+
+
+@workload
+def likes(dynamos, recorder, rnd, scale):
+    "A like storm: `scale` users like a single post, each like followed by the bump to the post's like count"
+    from app.models.like.enums import LikeStatus
+    from app.models.post.enums import PostStatus, PostType
+
+    poster_user_id, *liker_user_ids = add_users(dynamos, scale + 1)
+    post_item = dynamos['post'].add_pending_post(poster_user_id, str(uuid.uuid4()), PostType.TEXT_ONLY, text='hi')
+    post_item = dynamos['post'].set_post_status(post_item, PostStatus.COMPLETED)
+
+    recorder.start()
+    for user_id in liker_user_ids:
+        if rnd.random() < 0.8:
+            dynamos['like'].add_like(user_id, post_item, LikeStatus.ONYMOUSLY_LIKED)
+            dynamos['post'].increment_onymous_like_count(post_item['postId'])
+        else:
+            dynamos['like'].add_like(user_id, post_item, LikeStatus.ANONYMOUSLY_LIKED)
+            dynamos['post'].increment_anonymous_like_count(post_item['postId'])
+
+
+@workload
+def chat(dynamos, recorder, rnd, scale):
+    """
+    A group chat burst: 20 members send `scale` messages, each bumping the unviewed count of the other
+    members, who now and then catch up on the chat.
+    """
+    from app.models.chat.enums import ChatType
+
+    member_user_ids = add_users(dynamos, 20)
+    chat_id = str(uuid.uuid4())
+    now = pendulum.now('utc')
+    dynamos['chat'].client.transact_write_items(
+        [
+            dynamos['chat'].transact_add(chat_id, ChatType.GROUP, member_user_ids[0], name='bench', now=now),
+            *(dynamos['chat_member'].transact_add(chat_id, user_id, now=now) for user_id in member_user_ids),
+        ]
+    )
+
+    recorder.start()
+    for _ in range(scale):
+        author_user_id = rnd.choice(member_user_ids)
+        now = pendulum.now('utc')
+        dynamos['chat_message'].add_chat_message(str(uuid.uuid4()), chat_id, author_user_id, 'hey', [], now)
+        dynamos['chat'].increment_messages_count(chat_id)
+        for user_id in member_user_ids:
+            if user_id == author_user_id:
+                continue
+            if rnd.random() < 0.1:
+                dynamos['chat_member'].clear_messages_unviewed_count(chat_id, user_id)
+            else:
+                dynamos['chat_member'].increment_messages_unviewed_count(chat_id, user_id)
+
+
+def generate(workload_name, output, scale, batch_size, seed):
+    with local_app() as (dynamo_client, _):
+        from app.models.chat.dynamo import ChatDynamo, ChatMemberDynamo
+        from app.models.chat_message.dynamo import ChatMessageDynamo
+        from app.models.follower.dynamo.base import FollowerDynamo
+        from app.models.like.dynamo import LikeDynamo
+        from app.models.post.dynamo import PostDynamo
+        from app.models.user.dynamo import UserDynamo
+
+        dynamos = {
+            'chat': ChatDynamo(dynamo_client),
+            'chat_member': ChatMemberDynamo(dynamo_client),
+            'chat_message': ChatMessageDynamo(dynamo_client),
+            'follower': FollowerDynamo(dynamo_client),
+            'like': LikeDynamo(dynamo_client),
+            'post': PostDynamo(dynamo_client),
+            'user': UserDynamo(dynamo_client),
+        }
+        recorder = StreamRecorder(dynamo_client)
+        WORKLOADS[workload_name](dynamos, recorder, random.Random(seed), scale)
+
+    write_fixture(output, chunks(recorder.records, batch_size), seed_items=recorder.seed_items)
+    print(f'Generated {len(recorder.records)} records and {len(recorder.seed_items)} seed items to `{output}`')
+
+
+def latency_fakes(appsync_ms, elasticsearch_ms, pinpoint_ms):
+    "Stand-ins for the clients of external services, each call of which just takes the given latency"
+    from app import clients
+
+    class FakeAppSyncClient(clients.AppSyncClient):
+        def send(self, query, variables):
+            time.sleep(appsync_ms / 1000)
+
+    class FakeElasticSearchClient(clients.ElasticSearchClient):
+        def query_users(self, query):
+            time.sleep(elasticsearch_ms / 1000)
+            return {'hits': {'hits': []}}
+
+        def put_user(self, user_id, username, full_name):
+            time.sleep(elasticsearch_ms / 1000)
+
+        def delete_user(self, user_id):
+            time.sleep(elasticsearch_ms / 1000)
+
+    class FakePinpointClient(clients.PinpointClient):
+        def __init__(self, *args, **kwargs):
+            super().__init__(*args, **kwargs)
+            # answer every call of the boto3 client without sending it, after other hooks have seen it
+            self.client.meta.events.register_last('before-call', self.on_before_call)
+
+        def on_before_call(self, **kwargs):
+            time.sleep(pinpoint_ms / 1000)
+            return types.SimpleNamespace(status_code=200), {}
+
+    return {
+        'AppSyncClient': FakeAppSyncClient,
+        'ElasticSearchClient': FakeElasticSearchClient,
+        'PinpointClient': FakePinpointClient,
+    }
+
+
+def apply_records(dynamo_client, records):
+    "Bring the table to the state it was in once the records had been written"
+    for record in records:
+        if 'NewImage' in record['dynamodb']:
+            dynamo_client.boto3_client.put_item(
+                TableName=dynamo_client.table_name, Item=record['dynamodb']['NewImage']
+            )
+        else:
+            dynamo_client.boto3_client.delete_item(
+                TableName=dynamo_client.table_name, Key=record['dynamodb']['Keys']
+            )
+
+
+def replay(fixture, concurrency, appsync_ms, elasticsearch_ms, pinpoint_ms, verbose=False):
+    seed_items, batches = read_fixture(fixture)
+    if not verbose:
+        logging.getLogger().addHandler(logging.NullHandler())
+
+    with local_app() as (dynamo_client, _):
+        from app import clients
+        from app.handlers.dynamo import metrics
+
+        # clients are created on first use, so the fakes must be in place for the whole replay
+        with mock.patch.multiple(clients, **latency_fakes(appsync_ms, elasticsearch_ms, pinpoint_ms)):
+            from app.handlers.dynamo import handlers
+
+            for items in chunks(seed_items, 25):
+                requests = [{'PutRequest': {'Item': item}} for item in items]
+                dynamo_client.boto3_client.batch_write_item(RequestItems={dynamo_client.table_name: requests})
+
+            # one set of metrics for the whole replay
+            totals = metrics.ListenerMetrics()
+            failed_count, elapsed = 0, 0
+            with mock.patch.object(handlers, 'ListenerMetrics', return_value=totals), mock.patch.object(
+                totals, 'emit'
+            ), mock.patch.object(handlers, 'DYNAMO_STREAM_CONCURRENCY', concurrency):
+                for records in batches:
+                    apply_records(dynamo_client, records)
+                    start = time.perf_counter()
+                    resp = handlers.process_records({'Records': records}, None)
+                    elapsed += time.perf_counter() - start
+                    failed_count += len(resp['batchItemFailures'])
+
+    report(totals, sum(map(len, batches)), len(batches), elapsed, failed_count)
+
+
+def report(totals, record_count, batch_count, elapsed, failed_count):
+    print(
+        f'Replayed {record_count} records in {batch_count} batches in {elapsed:.2f}s: '
+        f'{record_count / elapsed if elapsed else 0:.1f} records/s, {failed_count} batch item failures'
+    )
+    summary = totals.summary()
+    columns = [
+        'calls',
+        'errors',
+        'durationMs',
+        'maxDurationMs',
+        'dynamo',
+        'appsync',
+        'elasticsearch',
+        'pinpoint',
+        's3',
+    ]
+    headers = ['calls', 'errors', 'total ms', 'max ms', 'dynamo', 'appsync', 'es', 'pinpoint', 's3']
+    rows = [
+        (f'{stats["listener"]} {stats["eventName"]}', *(stats[column] for column in columns))
+        for stats in summary['listeners']
+    ]
+    width = max([len('listener')] + [len(row[0]) for row in rows])
+    print()
+    print('listener'.ljust(width), *(header.rjust(9) for header in headers))
+    for name, *values in rows:
+        print(name.ljust(width), *(str(value).rjust(9) for value in values))
+    print()
+    print('slowest calls:')
+    for slow in summary['slowest']:
+        print(
+            f'  {slow["durationMs"]:>9} ms  {slow["listener"]} {slow["eventName"]}  `{slow["pk"]}` / `{slow["sk"]}`'
+        )
+
+
+def main():
+    args = parse_args()
+    if args.command == 'capture':
+        capture(args.table_name, args.output, args.max_records, from_start=args.from_start)
+    if args.command == 'generate':
+        generate(args.workload, args.output, args.scale, args.batch_size, args.seed)
+    if args.command == 'replay':
+        replay(
+            args.fixture,
+            args.concurrency,
+            args.appsync_ms,
+            args.elasticsearch_ms,
+            args.pinpoint_ms,
+            verbose=args.verbose,
+        )
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,48 @@
+import json
+import os
+import subprocess
+import sys
+
+import pytest
+
+# the repo root, as the bench is run as `python -m bin.stream_bench`
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def stream_bench(*args):
+    # in a process of its own, as the bench configures the app from the environment and starts moto
+    env = {
+        k: v for k, v in os.environ.items() if k not in ('DYNAMO_TABLE', 'DYNAMO_FEED_TABLE', 'WORK_QUEUE_URL')
+    }
+    proc = subprocess.run(
+        [sys.executable, '-m', 'bin.stream_bench', *args],
+        cwd=ROOT,
+        env=env,
+        capture_output=True,
+        text=True,
+        timeout=120,
+        check=False,
+    )
+    assert proc.returncode == 0, proc.stderr
+    return proc.stdout
+
+
+@pytest.mark.parametrize('workload', ['likes', 'followers', 'chat'])
+def test_generate_and_replay(tmp_path, workload):
+    fixture = str(tmp_path / f'{workload}.ndjson')
+    stdout = stream_bench('generate', workload, '-o', fixture, '--scale', '3', '--batch-size', '5')
+    assert f'to `{fixture}`' in stdout
+
+    with open(fixture) as fh:
+        events = [json.loads(line) for line in fh]
+    assert 'Items' in events[0]
+    batches = [event['Records'] for event in events[1:]]
+    assert batches
+    assert all(0 < len(records) <= 5 for records in batches)
+
+    latencies = ['--appsync-ms', '0', '--elasticsearch-ms', '0', '--pinpoint-ms', '0']
+    stdout = stream_bench('replay', fixture, '--concurrency', '2', *latencies)
+    record_count = sum(map(len, batches))
+    assert f'Replayed {record_count} records in {len(batches)} batches' in stdout
+    assert ', 0 batch item failures' in stdout
+    assert 'slowest calls:' in stdout